@@ -1,5 +1,5 @@
 """Order to send to the broker"""
-import uuid
+import itertools
 
 from zipbird.basic.stop import StopOrder
 from zipbird.basic.types import OpenClose, LongShort
@@ -7,6 +7,9 @@ from zipbird.basic.types import OpenClose, LongShort
 class NoOppositeOrderError(Exception):
     pass
 
+# ids of orders, unique within a process
+_order_ids = itertools.count()
+
 class Order:
     stock: str
     open_close: OpenClose
@@ -16,9 +19,10 @@ class Order:
     # the price reaches the limit price on next session.
     limit_price: float | None
     stop: StopOrder | None
+    __slots__ = ('order_id', 'stock', 'open_close', 'long_short', 'limit_price', 'stop', 'bar_count')
     
     def __init__(self, stock, open_close:OpenClose, long_short:LongShort, limit_price:float=None):
-        self.uuid = uuid.uuid4()
+        self.order_id = next(_order_ids)
         self.stock = stock
         self.open_close = open_close
         self.long_short = long_short
@@ -49,13 +53,13 @@ class Order:
         else:
             raise NoOppositeOrderError(f'No opposite order for {self.open_close}')
         
-        order = Order(
+        order = self.__class__(
             self.stock, 
             open_close,
             self.long_short,
-            self.limit_price)
+            limit_price=self.limit_price)
         order.bar_count = self.bar_count
-        order.uuid = self.uuid
+        order.order_id = self.order_id
         if keep_stop:
             order.stop = self.stop
         if not keep_limit:
@@ -105,6 +109,7 @@ class Order:
 
 class ShareOrder(Order):
     amount: int
+    __slots__ = ('amount',)
 
     def __init__(self, stock, open_close:OpenClose, long_short:LongShort, limit_price:float=None, amount:int=None):
         super().__init__(stock, open_close, long_short, limit_price)
@@ -159,6 +164,7 @@ class ShareOrder(Order):
 
 class PercentOrder(Order):
     target_percent: float
+    __slots__ = ('target_percent',)
 
     def __init__(self,
                  stock,
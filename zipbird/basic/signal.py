@@ -6,7 +6,13 @@ Signal only contains:
   open or close
   long or short
   limit price if to open at a specific price
+
+SignalBatch holds the signals of a session as arrays over the pipeline index,
+strategies may return it instead of a list of Signal.
 """
+import numpy as np
+import pandas as pd
+
 from zipbird.basic.types import OpenClose, LongShort
 
 class Signal:
@@ -17,6 +23,7 @@ class Signal:
     # There are signals that only open a position when
     # the price reaches the limit price on next session.
     limit_price: float | None
+    __slots__ = ('stock', 'open_close', 'long_short', 'limit_price')
 
     def __init__(self, stock, open_close:OpenClose, long_short:LongShort, limit_price:float=None):
         self.stock = stock
@@ -55,3 +62,135 @@ class Signal:
     def __repr__(self):
         return (f"Signal(stock='{self.stock}', open_close={self.open_close}, "
                 f"long_short={self.long_short}, limit_price={self.limit_price})")
+
+
+_OPEN_CLOSES = np.array([None] + list(OpenClose), dtype=object)
+_LONG_SHORTS = np.array([None] + list(LongShort), dtype=object)
+
+
+class SignalBatch:
+    """Signals of a session as arrays over the assets of the pipeline index
+
+    rows are the positions of the signalled assets in index, in the order of
+    the signals. open_close and long_short hold the values of OpenClose and
+    LongShort, limit_price is NaN for signals without a limit price.
+    """
+    __slots__ = ('index', 'rows', 'open_close', 'long_short', 'limit_price')
+
+    def __init__(self,
+                 index:pd.Index,
+                 rows:np.ndarray,
+                 open_close:np.ndarray,
+                 long_short:np.ndarray,
+                 limit_price:np.ndarray):
+        self.index = index
+        self.rows = rows
+        self.open_close = open_close
+        self.long_short = long_short
+        self.limit_price = limit_price
+
+    @staticmethod
+    def from_assets(index:pd.Index,
+                    assets:list,
+                    open_close:OpenClose,
+                    long_short:LongShort,
+                    limit_price:np.ndarray | pd.Series=None) -> 'SignalBatch':
+        """Signals of the assets in order, limit_price is aligned to index"""
+        rows = _get_rows(index, assets)
+        return SignalBatch._make(index, rows, open_close, long_short, limit_price)
+
+    @staticmethod
+    def from_mask(index:pd.Index,
+                  mask:np.ndarray,
+                  open_close:OpenClose,
+                  long_short:LongShort,
+                  score:np.ndarray=None,
+                  limit_price:np.ndarray | pd.Series=None) -> 'SignalBatch':
+        """Signals of the assets where mask is True, by ascending score
+        if given, mask, score and limit_price are aligned to index"""
+        rows = np.flatnonzero(np.asarray(mask))
+        if score is not None:
+            rows = rows[np.argsort(np.asarray(score)[rows], kind='stable')]
+        return SignalBatch._make(index, rows, open_close, long_short, limit_price)
+
+    @staticmethod
+    def _make(index, rows, open_close, long_short, limit_price) -> 'SignalBatch':
+        if limit_price is None:
+            limit_prices = np.full(len(rows), np.nan)
+        else:
+            limit_prices = np.asarray(limit_price, dtype=float)[rows]
+        return SignalBatch(
+            index,
+            rows,
+            np.full(len(rows), open_close.value, dtype=np.int8),
+            np.full(len(rows), long_short.value, dtype=np.int8),
+            limit_prices)
+
+    @staticmethod
+    def from_signals(signals:list[Signal], index:pd.Index) -> 'SignalBatch':
+        """Adapter of a list of Signal"""
+        return SignalBatch(
+            index,
+            _get_rows(index, [s.stock for s in signals]),
+            np.array([s.open_close.value for s in signals], dtype=np.int8),
+            np.array([s.long_short.value for s in signals], dtype=np.int8),
+            np.array([np.nan if s.limit_price is None else s.limit_price for s in signals],
+                     dtype=float))
+
+    @staticmethod
+    def concat(batches:list['SignalBatch']) -> 'SignalBatch':
+        """Signals of batches over the same index, one after the other"""
+        return SignalBatch(
+            batches[0].index,
+            np.concatenate([b.rows for b in batches]),
+            np.concatenate([b.open_close for b in batches]),
+            np.concatenate([b.long_short for b in batches]),
+            np.concatenate([b.limit_price for b in batches]))
+
+    def select(self, mask:np.ndarray) -> 'SignalBatch':
+        return SignalBatch(self.index, self.rows[mask], self.open_close[mask],
+                           self.long_short[mask], self.limit_price[mask])
+
+    def is_open_close(self, open_close:OpenClose) -> np.ndarray:
+        return self.open_close == open_close.value
+
+    @property
+    def assets(self) -> pd.Index:
+        return self.index[self.rows]
+
+    def get_open_closes(self) -> np.ndarray:
+        return _OPEN_CLOSES[self.open_close]
+
+    def get_long_shorts(self) -> np.ndarray:
+        return _LONG_SHORTS[self.long_short]
+
+    def get_limit_prices(self) -> list[float | None]:
+        return [None if price != price else price for price in self.limit_price.tolist()]
+
+    def values(self, column:pd.Series) -> np.ndarray:
+        """Values of the column, a pipeline column, for the signals"""
+        if column.index.equals(self.index):
+            return column.to_numpy()[self.rows]
+        return column.loc[self.assets].to_numpy()
+
+    def to_signals(self) -> list[Signal]:
+        return [Signal(stock, open_close, long_short, limit_price)
+                for stock, open_close, long_short, limit_price in zip(
+                    self.assets,
+                    self.get_open_closes(),
+                    self.get_long_shorts(),
+                    self.get_limit_prices())]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __repr__(self):
+        return f'SignalBatch({len(self)} signals: {", ".join(str(a) for a in self.assets)})'
+
+
+def _get_rows(index:pd.Index, assets:list) -> np.ndarray:
+    rows = index.get_indexer(assets)
+    if (rows < 0).any():
+        missing = [asset for asset, row in zip(assets, rows) if row < 0]
+        raise KeyError(f'Signals of assets not in pipeline data: {missing}')
+    return rows
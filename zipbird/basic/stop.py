@@ -13,6 +13,7 @@ class MismatchLongShortError(Exception):
     """Mismatch long short error"""
 
 class ProfitTarget:
+    __slots__ = ('target_price', 'long_or_short')
 
     def __init__(self, long_or_short):
         self.target_price = None
@@ -43,6 +44,7 @@ class ProfitTarget:
 
 class PercentProfitTarget(ProfitTarget):
     """Profit target that is certain percentage away from opening price"""
+    __slots__ = ('target_percent',)
 
     def __init__(self, long_or_short: LongShort, target_percent: float):
         super().__init__(long_or_short)
@@ -57,6 +59,7 @@ class PercentProfitTarget(ProfitTarget):
 
 class FixProfitTarget(ProfitTarget):
     """Profit target that is certain price away from opening class"""
+    __slots__ = ('diff',)
     def __init__(self, long_or_short: LongShort, diff: float):
         super().__init__(long_or_short)
         self.diff = diff
@@ -70,6 +73,7 @@ class FixProfitTarget(ProfitTarget):
 
 class Stop:
     """A stop price"""
+    __slots__ = ('stop_price', 'long_or_short', 'activated')
 
     def __init__(self, long_or_short):
         self.stop_price = None
@@ -108,6 +112,7 @@ MAX_STOP_PERCENT = 0.5
 
 class FixStop(Stop):
     """Fix point stop"""
+    __slots__ = ('diff_price',)
 
     def __init__(self, long_or_short: LongShort, diff_price: float):
         super().__init__(long_or_short)
@@ -126,6 +131,7 @@ class FixStop(Stop):
 
 class TrailingStop(Stop):
     """Used as price point for trailing stop"""
+    __slots__ = ('enter_price',)
     def __init__(self, long_or_short, enter_price:float):
         super().__init__(long_or_short)
         self.activated = False
@@ -140,6 +146,7 @@ class TrailingStop(Stop):
 
 
 class PercentTrailingStop(TrailingStop):
+    __slots__ = ('trailing_percent',)
 
     def __init__(self, long_or_short: LongShort, enter_price: float, trailing_percent: float):
         super().__init__(long_or_short, enter_price)
@@ -162,6 +169,7 @@ class PercentTrailingStop(TrailingStop):
 
 
 class ATRTrailingStop(TrailingStop):
+    __slots__ = ('trailing_atr_multiple',)
 
     def __init__(self, long_or_short: LongShort, enter_price: float, trailing_atr_multiple: float):
         super().__init__(long_or_short, enter_price)
@@ -208,6 +216,8 @@ class StopOrder:
     Though 2 is usually for trend following strategies, 3 and 4 are for mean reversion
     strategies.
     """
+    __slots__ = ('initial_stop', 'time_stop', 'profit_target', 'trailing_stop',
+                 'trail_after_profit', 'bar_count')
 
     def __init__(
         self,
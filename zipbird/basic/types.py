@@ -38,6 +38,7 @@ class Equity:
     auto_close_date: datetime.date
     sid: int
     _next_sid = 0
+    __slots__ = ('symbol', 'auto_close_date', 'sid')
 
     def __init__(self, symbol:str, auto_close_date:datetime.date=None):
         self.symbol = symbol
@@ -67,14 +68,18 @@ class Position:
     amount: int
     start_date: datetime.date
     cost_basis: float
+    last_sale_price: float
+    __slots__ = ('asset', 'amount', 'cost_basis', 'last_sale_price')
 
     def __init__(self,
                  asset:Equity,
                  amount:int,
-                 cost_basis:float=0.0):
+                 cost_basis:float=0.0,
+                 last_sale_price:float=0.0):
         self.asset = asset
         self.amount = amount
         self.cost_basis = cost_basis
+        self.last_sale_price = last_sale_price
 
 
 Positions = dict[Equity, Position]
@@ -0,0 +1,74 @@
+import argparse
+import pandas as pd
+
+from zipbird.notebook import performance_summary
+import zipbird.strategies.models as se_models
+from zipbird.strategy.daily_simulator import run_fast_simulations
+from zipbird.strategy.strategy_executor import StrategyExecutor
+from zipbird.utils import logger_util, utils
+from zipbird.utils.runner_util import supress_warnings, timing
+
+supress_warnings()
+
+def run():
+    parser = argparse.ArgumentParser(
+        prog='MultiStrategyRunner',
+        description='Runs back test strategies side by side in one pass')
+    parser.add_argument('strategy_names', nargs='+')
+    parser.add_argument('-s', '--start', default='2015-01-01')
+    parser.add_argument('-e', '--end', default='2015-12-31')
+    parser.add_argument('-d', '--debug_level', default=1)
+    parser.add_argument('-c', '--capital', default=100_000)
+    parser.add_argument('-b', '--bundle', default='quandl')
+    parser.add_argument('-l', '--label', default='')
+    parser.add_argument('--replay_csv', action='store_true',
+                        help='Also export the replay orders as csv')
+
+    args = parser.parse_args()
+
+    if len(set(args.strategy_names)) < len(args.strategy_names):
+        print('Strategy names must not repeat, they share one executor')
+        return
+    for strategy_name in args.strategy_names:
+        if not isinstance(se_models.STRATEGY_FUNC_MAP.get(strategy_name), StrategyExecutor):
+            print('Strategy name {} unknown, choose from: {}'.format(
+                strategy_name, se_models.STRATEGY_FUNC_MAP.keys()))
+            return
+    strategies = [se_models.STRATEGY_FUNC_MAP[name] for name in args.strategy_names]
+    start_time = pd.Timestamp(args.start)
+    end_time = pd.Timestamp(args.end)
+    print(f'bundle: {args.bundle}')
+    print(f'start: {args.start}')
+    print(f'end: {args.end}')
+
+    perfs = run_internal(start_time, end_time, strategies, float(args.capital),
+                         int(args.debug_level), args.bundle)
+
+    # same outputs as a runner.py run of each strategy
+    for strategy_name, strategy, perf in zip(args.strategy_names, strategies, perfs):
+        print(f'========== {strategy_name} ==========')
+        utils.print_stats(None, perf)
+        utils.dump_pickle(strategy_name, start_time, end_time, perf, strategy, args.label)
+        utils.dump_replay_orders(strategy_name, start_time, end_time, strategy, args.label,
+                                 export_csv=args.replay_csv)
+        performance_summary.output_performance(
+            prefix=strategy_name,
+            start_date=start_time,
+            end_date=end_time,
+            strategy_name=strategy.strategy.get_name(),
+            strategy_params={},
+            perf=perf,
+            label=args.label,
+            bundle=args.bundle,
+            replay_orders=strategy.replay_order_container,
+        )
+
+@timing
+def run_internal(start_time, end_time, strategies, capital, debug_level, bundle):
+    for strategy in strategies:
+        strategy.init(logger_util.DebugLogger(debug_level=debug_level))
+    return run_fast_simulations(strategies, bundle, start_time, end_time, capital)
+
+
+if __name__ == '__main__':
+    run()
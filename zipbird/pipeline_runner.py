@@ -1,5 +1,8 @@
 
+from concurrent.futures import ProcessPoolExecutor
 from functools import partial
+import os
+import shutil
 import sqlite3
 import pandas as pd
 import argparse
@@ -7,26 +10,49 @@ import zipline
 import zipline.api as zipline_api
 from zipline.pipeline import Pipeline
 from zipline.pipeline.data import USEquityPricing
+from zipline.utils.calendar_utils import get_calendar
 
 import zipbird.strategies.models as se_models
 from zipbird.strategy.strategy_zipline_funcs import before_trading_start_use_loader, load_initialize_zipline_use_loader
 from zipbird.utils import logger_util, utils
 from zipbird.utils.runner_util import supress_warnings, timing
 from zipbird.utils.timer_context import TimerContext
-from zipbird.strategy.pipeline_saver import PipelineSaver
+from zipbird.strategy.pipeline_saver import UNIVERSE_WINDOW_LENGTH, PipelineSaver
 from zipbird.strategy.pipeline_loader import PipelineLoader
+from zipbird.strategy.pipeline_engine_dump import dump_with_engine, make_bundle_engine
+from zipbird.strategy.pipeline_maker import PipelineMaker
+from zipbird.strategy.pipeline_shards import DumpShard, plan_shards
+from zipbird.strategy.pipeline_store import (CompactSqlitePipelineStore, NpyPipelineStore,
+                                             PipelineStore, SqlitePipelineStore)
 from zipbird.strategy.pipleine_const import has_db_file
 
 supress_warnings()
 
+def _make_store(store_name:str,
+                db_name:str,
+                read_only:bool=False,
+                mmap:bool=False) -> tuple[PipelineStore, sqlite3.Connection | None]:
+    """Returns the store, and its db connection to close for sqlite stores"""
+    if store_name == 'npy':
+        return NpyPipelineStore(db_name, mmap=mmap), None
+    if read_only:
+        db_conn = sqlite3.connect(f'file:/{db_name}?mode=ro', uri=True)
+    else:
+        db_conn = sqlite3.connect(db_name)
+    if store_name == 'compact':
+        return CompactSqlitePipelineStore(db_conn), db_conn
+    return SqlitePipelineStore(db_conn), db_conn
+
+
 def run():
     """
     This has two commands, "dump" dump all indicators defined in stratgies to a sqlite
     db, to be used later
     "load" runs a strategy using the data dumped in sqlite db.
 
-    This is a failed experiment to improve run speed. Turns out this is not faster than
-    zipline's pipeline.
+    With the sqlite store this is a failed experiment to improve run speed, it is
+    not faster than zipline's pipeline. The npy store keeps each indicator as a
+    trade day x sid matrix, loading a trade day is a row slice without pivoting.
     """
     parser = argparse.ArgumentParser(
         prog='StrategyRunner',
@@ -39,9 +65,25 @@ def run():
     parser.add_argument('-l', '--label', default='',
                         help='label for output files')
     parser.add_argument('--db_name', default='results/pipeline-data.db',
-                        help='database file name')
+                        help='database file name, or directory for the npy store')
+    parser.add_argument('--store', default='sqlite', choices=['sqlite', 'compact', 'npy'],
+                        help='storage backend of the pipeline data')
+    parser.add_argument('--mmap', default=False, action='store_true',
+                        help='load: memory map the npy store instead of reading it')
     parser.add_argument('--start_fresh_db', default=False,
                         help='If true erase existing db table and start fresh')
+    parser.add_argument('--sharded', default=False, action='store_true',
+                        help='dump: run year shards in parallel and merge them. '
+                             'The range may extend the stored range')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='dump: number of processes for --sharded')
+    parser.add_argument('--append', default=False, action='store_true',
+                        help='dump: only the trade days after the stored end day, up to --end')
+    parser.add_argument('--new_columns', default=False, action='store_true',
+                        help='dump: only columns not stored yet, over the stored range, '
+                             'with the pipeline engine and no trading simulation')
+    parser.add_argument('--replay_csv', default=False, action='store_true',
+                        help='load: also export the replay orders as csv')
     parser.add_argument('--strategies', 
                         nargs='+',
                         type=str,
@@ -66,20 +108,52 @@ def run():
 
     db_conn:sqlite3.Connection = None
     try:
-        if args.command == 'dump':
-            db_conn = sqlite3.connect(args.db_name)
-            pipeline_saver = PipelineSaver(
-                strategies,
-                db_conn,
-                start_fresh=args.start_fresh_db)
-            
-            run_dump_internal(
+        if args.command == 'dump' and args.sharded:
+            run_sharded_dump(
                 timer_context,
                 start_time,
                 end_time,
-                pipeline_saver,
+                strategy_names,
+                args.store,
+                args.db_name,
+                args.start_fresh_db,
+                args.workers,
                 int(args.debug_level),
                 args.bundle)
+
+        elif args.command == 'dump':
+            if args.start_fresh_db and (args.append or args.new_columns):
+                print('--start_fresh_db would erase the stored data that --append and --new_columns extend')
+                return
+            store, db_conn = _make_store(args.store, args.db_name)
+            pipeline_saver = PipelineSaver(
+                strategies,
+                start_fresh=args.start_fresh_db,
+                store=store)
+            
+            if args.new_columns:
+                if not run_new_columns_dump(
+                        timer_context,
+                        pipeline_saver,
+                        int(args.debug_level),
+                        args.bundle):
+                    return
+            elif args.append:
+                if not run_append_dump(
+                        timer_context,
+                        end_time,
+                        pipeline_saver,
+                        int(args.debug_level),
+                        args.bundle):
+                    return
+            else:
+                run_dump_internal(
+                    timer_context,
+                    start_time,
+                    end_time,
+                    pipeline_saver,
+                    int(args.debug_level),
+                    args.bundle)
             with timer_context.timer('create index'):
                 pipeline_saver.create_index()
 
@@ -88,14 +162,16 @@ def run():
                 print('Can load only one strategy')
                 return
             
-            if not has_db_file(args.db_name):
+            if args.store == 'npy' and not os.path.isdir(args.db_name):
+                print(f'No npy store found for {args.db_name}')
+                return
+            if args.store != 'npy' and not has_db_file(args.db_name):
                 print(f'No database found for {args.db_name}')
                 return
-            
-            db_conn = sqlite3.connect(f'file:/{args.db_name}?mode=ro', uri=True)
-            pipeline_loader = PipelineLoader(
-                strategies[0],
-                db_conn)
+
+            store, db_conn = _make_store(
+                args.store, args.db_name, read_only=True, mmap=args.mmap)
+            pipeline_loader = PipelineLoader(strategies[0], store=store)
             
             run_load_internal(
                 timer_context,
@@ -110,7 +186,8 @@ def run():
                 start_time,
                 end_time,
                 strategies[0],
-                args.label
+                args.label,
+                export_csv=args.replay_csv,
             )
         else:
             raise ValueError(f'Unknown command {args.command}')
@@ -130,11 +207,20 @@ def run_dump_internal(
         end_time:pd.Timestamp,
         pipeline_saver:PipelineSaver,
         debug_level:int,
-        bundle:str):
-    debug_logger = logger_util.DebugLogger(debug_level=debug_level)
-    pipeline_saver.init(debug_logger, start_time, end_time)
+        bundle:str,
+        warmup_start_time:pd.Timestamp=None,
+        exclude_columns:list[str]=(),
+        init_saver:bool=True,
+        debug_logger:logger_util.DebugLogger=None):
+    """Dumps start_time to end_time. With warmup_start_time, zipline starts
+    earlier but the days before start_time are not recorded. Without
+    init_saver, pipeline_saver is already prepared, e.g. by init_append,
+    with debug_logger."""
+    debug_logger = debug_logger or logger_util.DebugLogger(debug_level=debug_level)
+    if init_saver:
+        pipeline_saver.init(debug_logger, start_time, end_time, exclude_columns=exclude_columns)
     return zipline.run_algorithm(
-        start=start_time,
+        start=warmup_start_time or start_time,
         end=end_time,
         initialize=partial(dump_initialize_zipline, pipeline_saver, timer_context, debug_logger),
         before_trading_start=partial(dump_before_trading_start_zipline, pipeline_saver, timer_context),
@@ -171,8 +257,149 @@ def dump_before_trading_start_zipline(pipeline_saver:PipelineSaver,
         pipeline_data = zipline_api.pipeline_output(_PIPELINE_NAME)
 
     with timer_context.timer('record_pipeline_data'):
-        pipeline_saver.record_pipeline_data(
+        recorded = pipeline_saver.record_pipeline_data(
             trade_day=today, pipeline_data=pipeline_data)
+    timer_context.add_count('record_pipeline_data', recorded)
+
+
+def run_append_dump(
+        timer_context: TimerContext,
+        end_time:pd.Timestamp,
+        pipeline_saver:PipelineSaver,
+        debug_level:int,
+        bundle:str) -> bool:
+    """Dumps the trade days after the stored end day, returns False if there are none"""
+    debug_logger = logger_util.DebugLogger(debug_level=debug_level)
+    start_time = pipeline_saver.init_append(debug_logger, end_time)
+    if start_time is None:
+        return False
+    stored_start_time = pd.Timestamp(pipeline_saver.store.get_metadata('start_day'))
+    lookback = pipeline_saver.pipeline_maker.max_window_length()
+    run_dump_internal(
+        timer_context,
+        start_time,
+        end_time,
+        pipeline_saver,
+        debug_level,
+        bundle,
+        warmup_start_time=_warmup_start_time(start_time, stored_start_time, lookback),
+        init_saver=False,
+        debug_logger=debug_logger)
+    return True
+
+
+@timing
+def run_new_columns_dump(
+        timer_context: TimerContext,
+        pipeline_saver:PipelineSaver,
+        debug_level:int,
+        bundle:str) -> bool:
+    """Dumps the columns not stored yet, returns False if there are none"""
+    debug_logger = logger_util.DebugLogger(debug_level=debug_level)
+    date_range = pipeline_saver.init_new_columns(debug_logger)
+    if date_range is None:
+        return False
+    start_time, end_time = date_range
+    dump_with_engine(
+        make_bundle_engine(bundle),
+        pipeline_saver.make_pipeline(),
+        pipeline_saver,
+        start_time,
+        end_time,
+        timer_context)
+    return True
+
+
+def _shard_store_name(db_name:str, shard:DumpShard) -> str:
+    return os.path.join(db_name + '.shards', shard.name)
+
+
+def _dump_shard(strategy_names:list[str],
+                store_name:str,
+                db_name:str,
+                shard:DumpShard,
+                warmup_start_time:pd.Timestamp,
+                debug_level:int,
+                bundle:str) -> str:
+    """Dumps one shard into its own store, runs in a worker process"""
+    strategies = [se_models.STRATEGY_FUNC_MAP[name] for name in strategy_names]
+    shard_db_name = _shard_store_name(db_name, shard)
+    os.makedirs(os.path.dirname(shard_db_name), exist_ok=True)
+    store, db_conn = _make_store(store_name, shard_db_name)
+    try:
+        pipeline_saver = PipelineSaver(strategies, start_fresh=True, store=store)
+        run_dump_internal(
+            TimerContext(),
+            shard.start_day,
+            shard.end_day,
+            pipeline_saver,
+            debug_level,
+            bundle,
+            warmup_start_time=warmup_start_time,
+            exclude_columns=shard.exclude_columns)
+        pipeline_saver.create_index()
+    finally:
+        if db_conn:
+            db_conn.close()
+    return shard_db_name
+
+
+def _warmup_start_time(start_time:pd.Timestamp, dump_start_time:pd.Timestamp, lookback:int) -> pd.Timestamp:
+    """Start of a zipline run recording from start_time: lookback sessions
+    earlier, but not before the start of the whole dump, like a single run would"""
+    calendar = get_calendar('XNYS')
+    first_session = calendar.date_to_session(start_time, direction='next')
+    warmup_start = calendar.sessions_window(first_session, -(lookback + 1))[0]
+    return max(warmup_start, dump_start_time)
+
+
+@timing
+def run_sharded_dump(
+        timer_context: TimerContext,
+        start_time:pd.Timestamp,
+        end_time:pd.Timestamp,
+        strategy_names:list[str],
+        store_name:str,
+        db_name:str,
+        start_fresh:bool,
+        workers:int,
+        debug_level:int,
+        bundle:str):
+    """Dumps year shards in a process pool, then merges them into db_name"""
+    store, db_conn = _make_store(store_name, db_name)
+    try:
+        store.prepare(start_fresh)
+        pipeline_maker = PipelineMaker()
+        for name in strategy_names:
+            se_models.STRATEGY_FUNC_MAP[name].prepare_pipeline_columns(pipeline_maker)
+        shards, metadata = plan_shards(
+            store, list(pipeline_maker.get_columns()), start_time, end_time)
+        dump_start_time = pd.Timestamp(metadata['start_day'])
+        # the universe filter looks back too, see PipelineSaver
+        lookback = max(pipeline_maker.max_window_length(), UNIVERSE_WINDOW_LENGTH)
+        print(f'Dumping {len(shards)} shards: {shards}')
+
+        with timer_context.timer('dump shards'), ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(_dump_shard, strategy_names, store_name, db_name, shard,
+                            _warmup_start_time(shard.start_day, dump_start_time, lookback),
+                            debug_level, bundle)
+                for shard in shards]
+            # merge in shard order, wait for all before touching the store
+            shard_db_names = [future.result() for future in futures]
+
+        with timer_context.timer('merge shards'):
+            for shard_db_name in shard_db_names:
+                shard_store, shard_db_conn = _make_store(store_name, shard_db_name)
+                store.merge_from(shard_store)
+                if shard_db_conn:
+                    shard_db_conn.close()
+            store.upsert_metadata(metadata)
+            store.finish()
+        shutil.rmtree(db_name + '.shards', ignore_errors=True)
+    finally:
+        if db_conn:
+            db_conn.close()
 
 
 ##############################
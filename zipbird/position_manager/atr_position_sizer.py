@@ -2,9 +2,9 @@ import pandas as pd
 import numpy as np
 
 from zipbird.basic.order import Order, ShareOrder
-from zipbird.basic.signal import Signal
+from zipbird.basic.signal import Signal, SignalBatch
 from zipbird.basic.stop import FixStop, PercentProfitTarget, PercentTrailingStop, StopOrder, FixProfitTarget
-from zipbird.basic.types import Equity, Portfolio
+from zipbird.basic.types import LongShort, Portfolio
 from zipbird.strategy import pipeline_column_names as colume_names
 from zipbird.position_manager.position_sizer import PositionSizer
 
@@ -12,68 +12,89 @@ class ATRPositionSizer(PositionSizer):
     
     def get_orders(self,
                    portfolio: Portfolio,
-                   signals: list[Signal], 
+                   signals: list[Signal] | SignalBatch, 
                    pipeline_data: pd.DataFrame) -> list[Order]:
         """Returns orders and stops with proper size"""
         # super make sure all signals are open signals
         super().get_orders(portfolio, signals, pipeline_data)
+        if not isinstance(signals, SignalBatch):
+            signals = SignalBatch.from_signals(signals, pipeline_data.index)
+        amounts, stop_loss_diffs, target_diffs, last_closes = self._get_sizes(
+            portfolio, signals, pipeline_data)
+        return self._make_orders(signals, amounts, stop_loss_diffs, target_diffs, last_closes)
+
+    def _get_sizes(self,
+                   portfolio: Portfolio,
+                   signals: SignalBatch,
+                   pipeline_data: pd.DataFrame) -> tuple[np.ndarray, ...]:
+        """Amounts, stop loss diffs, profit target diffs and last closes of the signals"""
+        last_closes = signals.values(pipeline_data['close']).astype(float)
+        atrs = signals.values(self._get_atr_column(pipeline_data)).astype(float)
+        # calculate amount based on risk and max equity per position
+        stop_loss_diffs = self._get_stop_loss_diffs(last_closes, atrs)
+        risk_amounts = portfolio.portfolio_value * self.get_max_fraction_risk() / stop_loss_diffs
+        equity_amounts = portfolio.portfolio_value * self.get_max_equity_per_position() / last_closes
+        amounts = np.minimum(risk_amounts, equity_amounts)
+        invalid = ~np.isfinite(amounts)
+        if invalid.any():
+            raise ValueError(f'Cannot size orders of {signals.assets[invalid].tolist()}, '
+                             'close or stop loss is not a number')
+        amounts = np.trunc(amounts).astype(np.int64)
+        target_diffs = self.params.get('price_target_atr_multiple', 0) * atrs
+        return amounts, stop_loss_diffs, target_diffs, last_closes
+
+    def _make_orders(self,
+                     signals: SignalBatch,
+                     amounts: np.ndarray,
+                     stop_loss_diffs: np.ndarray,
+                     target_diffs: np.ndarray,
+                     last_closes: np.ndarray,
+                     with_target: bool=True) -> list[Order]:
         orders = []
-        for signal in signals:
-            # calculate amount based on risk and max equity per position
-            amount = self._get_amount(signal.stock, portfolio.portfolio_value, pipeline_data)
-            order = ShareOrder(signal.stock,
-                            signal.open_close,
-                            signal.long_short,
+        for (stock, open_close, long_short, limit_price, amount,
+             stop_loss_diff, target_diff, last_close) in zip(
+                signals.assets, signals.get_open_closes(), signals.get_long_shorts(),
+                signals.get_limit_prices(), amounts.tolist(),
+                stop_loss_diffs.tolist(), target_diffs.tolist(), last_closes.tolist()):
+            order = ShareOrder(stock,
+                            open_close,
+                            long_short,
                             amount=amount,
-                            limit_price=signal.limit_price)
+                            limit_price=limit_price)
             
             # Attach stop loss
             order.add_stop(StopOrder(
-                initial_stop=FixStop(
-                    signal.long_short,
-                    self._get_stop_loss_diff(signal.stock, pipeline_data)),
+                initial_stop=FixStop(long_short, stop_loss_diff),
                 time_stop=self.params.get('stop_loss_days', 0),
-                profit_target=self._get_profit_target(signal, pipeline_data),
-                trailing=self._get_tailing_stop(signal, pipeline_data['close'][signal.stock])))
+                profit_target=self._get_profit_target(long_short, target_diff) if with_target else None,
+                trailing=self._get_tailing_stop(long_short, last_close)))
             orders.append(order)                          
         return orders
                     
-    def _get_atr(self, stock:Equity, pipeline_data:pd.DataFrame):
-        atr_name = colume_names.atr_name(self.params['atr_period'])
-        return pipeline_data[atr_name][stock]
-    
-    def _get_stop_loss_diff(self, stock:Equity, pipeline_data:pd.DataFrame):
-        atr = self._get_atr(stock, pipeline_data)    
-        if np.isnan(atr):
-            # if no atr, assume 50% risk
-            return pipeline_data['close'][stock] * 0.5
-        else:
-            return self.params['stop_loss_atr_multiple'] * atr
+    def _get_atr_column(self, pipeline_data:pd.DataFrame) -> pd.Series:
+        return pipeline_data[colume_names.atr_name(self.params['atr_period'])]
 
-    def _get_amount(self, stock:Equity, portfolio_value:float, pipeline_data:pd.DataFrame):
-        price = pipeline_data['close'][stock]
-        risk = self._get_stop_loss_diff(stock, pipeline_data)
-        return min(
-            int(portfolio_value * self.get_max_fraction_risk() / risk),
-            int(portfolio_value * self.get_max_equity_per_position() / price))
-    
-    def _get_profit_target(self, signal, pipeline_data:pd.DataFrame):
+    def _get_stop_loss_diffs(self, last_closes:np.ndarray, atrs:np.ndarray) -> np.ndarray:
+        # if no atr, assume 50% risk
+        return np.where(np.isnan(atrs),
+                        last_closes * 0.5,
+                        self.params['stop_loss_atr_multiple'] * atrs)
+
+    def _get_profit_target(self, long_short:LongShort, target_diff:float):
         
         target_percent = self.params.get('price_target_percent', 0)
         if target_percent:
-            return PercentProfitTarget(signal.long_short, target_percent)
+            return PercentProfitTarget(long_short, target_percent)
         
-        target_atr = self.params.get('price_target_atr_multiple', 0)
-        if target_atr:
-            return FixProfitTarget(signal.long_short,
-                                   target_atr * self._get_atr(signal.stock, pipeline_data))
+        if self.params.get('price_target_atr_multiple', 0):
+            return FixProfitTarget(long_short, target_diff)
         return None
         
-    def _get_tailing_stop(self, signal, last_close:float):
+    def _get_tailing_stop(self, long_short:LongShort, last_close:float):
         trailing_percent = self.params.get('trailing_stop_percent', 0)
         if trailing_percent:
             return PercentTrailingStop(
-                signal.long_short,
+                long_short,
                 # last close is not exactly entering price, but this is close enough
                 enter_price=last_close,
                 trailing_percent=trailing_percent)
@@ -2,11 +2,13 @@ import datetime
 from zipbird.basic.order import Order, PercentOrder
 from zipbird.basic.types import Equity, OpenClose, Positions, StopOrderStatus
 
+import numpy as np
 import pandas as pd
 
 from zipline import api as zipline_api
 from zipline.finance import execution as zipline_execution
 
+from zipbird.position_manager.stop_engine import StopEngine
 from zipbird.replay.order_collector import OrderCollector
 from zipbird.basic.types import LongShort
 
@@ -80,6 +82,8 @@ class PositionManager:
     """
     pending_orders: dict[str, PendingOrder]
     managed_orders: dict[str, Order]
+    # asset => ids of its managed orders, kept in sync with managed_orders
+    managed_order_ids: dict[Equity, list[str]]
 
     def __init__(self, debug_logger, replay_container:OrderCollector):
         # Pending orders are orders entered in last session
@@ -92,12 +96,38 @@ class PositionManager:
         # When a pending order is filled, it will be moved from pending
         # orders to managed orders.
         self.managed_orders = {}
+        # stops of the managed orders, updated and checked in bulk
+        self.stop_engine = StopEngine()
         self.order_api = zipline_api
         self.debug_logger = debug_logger
         self.replay_container = replay_container
 
+    @property
+    def managed_orders(self) -> dict[str, Order]:
+        return self._managed_orders
+
+    @managed_orders.setter
+    def managed_orders(self, managed_orders:dict[str, Order]):
+        self._managed_orders = {}
+        self.managed_order_ids = {}
+        for order_id, order in managed_orders.items():
+            self._add_managed_order(order_id, order)
+
+    def _add_managed_order(self, order_id:str, order:Order):
+        self._managed_orders[order_id] = order
+        self.managed_order_ids.setdefault(order.stock, []).append(order_id)
+
+    def _pop_managed_order(self, order_id:str) -> Order:
+        order = self._managed_orders.pop(order_id)
+        order_ids = self.managed_order_ids[order.stock]
+        order_ids.remove(order_id)
+        if not order_ids:
+            del self.managed_order_ids[order.stock]
+        return order
+
     def _find_managed_orders(self, asset:Equity) -> list[Order]:
-        return [o for o in self.managed_orders.values() if o.stock == asset]
+        return [self._managed_orders[order_id]
+                for order_id in self.managed_order_ids.get(asset, [])]
     
     def get_day_count(self, asset:Equity, amount:int):
         orders = self._find_managed_orders(asset)
@@ -135,14 +165,14 @@ class PositionManager:
                 5, 
                 'Pending order filled %s %d: pending order id %s' % (asset, amount, order.id))
             if pending_order.order.open_close == OpenClose.Close:
-                self.managed_orders.pop(pending_order.orginal_order_id)
+                self._pop_managed_order(pending_order.orginal_order_id)
                 # add order for replay
                 self.replay_container.add_close_order(
                     order=pending_order.order,
                     close_date=today,
                     close_price=price)
             else:
-                self.managed_orders[order.id] = pending_order.order
+                self._add_managed_order(order.id, pending_order.order)
                 # add order for replay
                 self.replay_container.add_open_order(
                     open_date=today,
@@ -186,21 +216,17 @@ class PositionManager:
 
         Record the positions as closed one day before auto close day.
         """
-        all_assets_in_position = {}
-        for id, order in self.managed_orders.items():
-            all_assets_in_position.setdefault(order.stock, []).append(id)
-        
         yesterday = pd.Timestamp(today) - pd.Timedelta(1)
         assets_about_to_auto_close = [
             asset
-            for asset in all_assets_in_position.keys()
+            for asset in self.managed_order_ids.keys()
             if (asset.auto_close_date and 
                 asset.auto_close_date <= yesterday)]
         for asset in assets_about_to_auto_close:
             # record the auto close positions
             # This is an estimate of closing price
             last_close = pipeline_data['close'][asset]
-            for order_id in all_assets_in_position[asset]:
+            for order_id in self.managed_order_ids[asset]:
                 order = self.managed_orders[order_id]
                 self.replay_container.add_close_order(
                         order=order,
@@ -208,23 +234,19 @@ class PositionManager:
                         close_price=last_close)
                 
     def _remove_expired_positions(self, today:datetime.date, positions:Positions):
-        all_assets_in_position = {}
-        for id, order in self.managed_orders.items():
-            all_assets_in_position.setdefault(order.stock, []).append(id)
-
-        assets_to_remove = self._get_expired_assets(today, all_assets_in_position.keys())
+        assets_to_remove = self._get_expired_assets(today, list(self.managed_order_ids.keys()))
         for asset in assets_to_remove:
             if asset not in positions:
                 self.debug_logger.debug_print(
                     3, 
                     'Position %s has passed auto_close_date, removing' % asset)
-                for id in all_assets_in_position[asset]:
-                    self.managed_orders.pop(id)
+                for id in list(self.managed_order_ids[asset]):
+                    self._pop_managed_order(id)
 
     def _verify_managed_orders(self, today:datetime.date, positions:Positions):
         # remove positions has passed auto_close_date
         self._remove_expired_positions(today, positions)
-        managed_orders = sorted(set(o.stock for o in self.managed_orders.values()))
+        managed_orders = sorted(self.managed_order_ids.keys())
         position_assets = sorted(set(positions.keys()))
         if managed_orders != position_assets:
             raise MismatchedManagedOrders(
@@ -250,12 +272,11 @@ class PositionManager:
     def send_orders(self, orders:list[Order]):
         for order in orders:
             if order.open_close == OpenClose.Close:
-                # copy over managed order's uuid
-                for org_order_id, managed_order in self.managed_orders.items():
-                    if managed_order.stock == order.stock:                    
-                        order.uuid = managed_order.uuid
-                        self._make_and_send_pending_order(
-                            order, is_stop_order=False, orginal_order_id=org_order_id)
+                # copy over managed order's id
+                for org_order_id in self.managed_order_ids.get(order.stock, []):
+                    order.order_id = self.managed_orders[org_order_id].order_id
+                    self._make_and_send_pending_order(
+                        order, is_stop_order=False, orginal_order_id=org_order_id)
             else:
                 self._make_and_send_pending_order(order, is_stop_order=False)
 
@@ -290,20 +311,15 @@ class PositionManager:
         self.pending_orders = {}  # reset pending orders
 
     def _adjust_stop_orders(self, positions:Positions, data:pd.DataFrame):
-        for order_id, managed_order in self.managed_orders.items():
-            if not managed_order.stop:
-                continue
-            asset = managed_order.stock
-            position = positions[asset]
-            managed_order.stop.do_maintenance(position.cost_basis, data.loc[asset])
+        self.stop_engine.sync(self.managed_orders)
+        open_prices = [positions[asset].cost_basis for asset in self.stop_engine.assets]
+        self.stop_engine.do_maintenance(np.array(open_prices, dtype=float), data)
 
     def _close_out_positions(self, positions:Positions, data:pd.DataFrame) -> list[str]:
         closed_order_ids = []
-        for org_order_id, managed_order in self.managed_orders.items():
-            asset = managed_order.stock
-            if not managed_order.stop:
-                continue
-            stop_order_status = managed_order.stop.get_status(data.loc[asset])
+        self.stop_engine.sync(self.managed_orders)
+        for org_order_id, stop_order_status in self.stop_engine.get_triggered(data):
+            managed_order = self.managed_orders[org_order_id]
             if stop_order_status in (StopOrderStatus.INITIAL_STOP, 
                                      StopOrderStatus.TRAILING_STOP):
                 self.debug_logger.debug_print(
@@ -331,9 +347,6 @@ class PositionManager:
                     is_stop_order=False,
                     orginal_order_id=org_order_id)
                 closed_order_ids.append(org_order_id)
-            else:
-                self.debug_logger.debug_print(
-                    5, 'Position not closed out %s' % managed_order.stock)
         return closed_order_ids
 
     def _send_out_stop_orders(self, closed_order_ids:list[str]):
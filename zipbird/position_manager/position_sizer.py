@@ -3,7 +3,7 @@
 import pandas as pd
 
 from zipbird.basic.types import ClosingInPositionSizerException, OpenClose, Portfolio
-from zipbird.basic.signal import Signal
+from zipbird.basic.signal import Signal, SignalBatch
 from zipbird.basic.order import Order
 
 
@@ -22,9 +22,16 @@ class PositionSizer:
     def get_orders(
             self,
             portfolio: Portfolio,
-            signals: list[Signal], 
+            signals: list[Signal] | SignalBatch, 
             pipeline_data: pd.DataFrame) -> list[Order]:
         """Returns orders and stops with proper size"""
-        for signal in signals:
-            if signal.open_close == OpenClose.Close:
-                raise ClosingInPositionSizerException('Should not close position in position sizer')
\ No newline at end of file
+        self.check_no_closing(signals)
+
+    def check_no_closing(self, signals: list[Signal] | SignalBatch):
+        """Raises if any signal closes a position, position sizers only open"""
+        if isinstance(signals, SignalBatch):
+            closing = signals.is_open_close(OpenClose.Close).any()
+        else:
+            closing = any(signal.open_close == OpenClose.Close for signal in signals)
+        if closing:
+            raise ClosingInPositionSizerException('Should not close position in position sizer')
\ No newline at end of file
@@ -5,7 +5,7 @@ import pandas as pd
 
 from zipbird.strategy import pipeline_column_names as columen_names
 from zipbird.basic.order import PercentOrder, Order, ShareOrder
-from zipbird.basic.signal import OpenClose, Signal
+from zipbird.basic.signal import OpenClose, Signal, SignalBatch
 from zipbird.basic.types import Equity, Portfolio
 from zipbird.position_manager.position_sizer import PositionSizer
 class RotationPositionSizer(PositionSizer):
@@ -18,14 +18,13 @@ class RotationPositionSizer(PositionSizer):
                      portfolio_value: float):
         VOL = columen_names.vol_name(self.params['vol_window'])
         if self.params['rebalance_by_vol']:
-            new_portfolio = list(set(kept_positions + buy_list))
+            new_portfolio = list(dict.fromkeys(kept_positions + buy_list))
             # Calculate inverse volatility for stocks,
             # and make target position weights        
-            vola_table = pipeline_output[VOL][new_portfolio]
+            vola_table = pipeline_output[VOL].loc[new_portfolio].to_numpy(dtype=float)
             inv_vola_table = 1/vola_table
-            sum_inv_vola = np.sum(inv_vola_table)
-            vola_target_weights = inv_vola_table / sum_inv_vola
-            return vola_target_weights
+            vola_target_weights = inv_vola_table / np.sum(inv_vola_table)
+            return dict(zip(new_portfolio, vola_target_weights.tolist()))
         elif buy_list:
             weight = free_cash / len(buy_list) / portfolio_value
             return dict((s, weight) for s in buy_list)
@@ -35,7 +34,7 @@ class RotationPositionSizer(PositionSizer):
     def get_orders(
             self,
             portfolio: Portfolio,
-            signals: list[Signal], 
+            signals: list[Signal] | SignalBatch, 
             pipeline_data: pd.DataFrame) -> list[Order]:
         """Returns orders and stops with proper size
         
@@ -48,8 +47,12 @@ class RotationPositionSizer(PositionSizer):
             # Otherwise, balance every day
             return []
         
-        buy_stock_list = [s.stock for s in signals if s.open_close == OpenClose.Open]
-        kept_stock_list = [s.stock for s in signals if s.open_close == OpenClose.Adjust]
+        if isinstance(signals, SignalBatch):
+            buy_stock_list = signals.assets[signals.is_open_close(OpenClose.Open)].tolist()
+            kept_stock_list = signals.assets[signals.is_open_close(OpenClose.Adjust)].tolist()
+        else:
+            buy_stock_list = [s.stock for s in signals if s.open_close == OpenClose.Open]
+            kept_stock_list = [s.stock for s in signals if s.open_close == OpenClose.Adjust]
 
         weights = self._get_weights(
             pipeline_output=pipeline_data,
@@ -57,8 +60,9 @@ class RotationPositionSizer(PositionSizer):
             buy_list=buy_stock_list,
             free_cash=portfolio.get_cash_after_close(),
             portfolio_value=portfolio.portfolio_value)
+        kept_stocks = set(kept_stock_list)
         return [
-            PercentOrder.make_open_long(stock, pct, stock in kept_stock_list) 
+            PercentOrder.make_open_long(stock, pct, stock in kept_stocks) 
             for stock, pct in weights.items()
         ]
         
\ No newline at end of file
@@ -1,31 +1,29 @@
 import pandas as pd
 
 from zipbird.basic.order import Order
-from zipbird.basic.signal import Signal
+from zipbird.basic.signal import Signal, SignalBatch
 from zipbird.basic.types import Portfolio
 from zipbird.position_manager.atr_position_sizer import ATRPositionSizer
 
 
 class SplitTargetPositionSizer(ATRPositionSizer):
-    """Position Sizer that split the order into two, one with a target, one with 
+    """Position Sizer that split the order into two, one with a target, one with
     a trailing stop
     """
     def get_orders(self,
                    portfolio: Portfolio,
-                   signals: list[Signal], 
+                   signals: list[Signal] | SignalBatch,
                    pipeline_data: pd.DataFrame) -> list[Order]:
-        org_orders = super().get_orders(portfolio, signals, pipeline_data)
-        orders = []
-        for order in org_orders:
-            # order 1 no profit target
-            new_order1 = order.copy()
-            new_order1.amount = (new_order1.amount // 3) 
-            new_order1.stop.profit_target = None
-
-            # order 2 has profit target
-            new_order2 = order.copy()
-            new_order2.amount = (new_order2.amount // 3) * 2
-            
-            orders.append(new_order1)
-            orders.append(new_order2)
-        return orders
\ No newline at end of file
+        self.check_no_closing(signals)
+        if not isinstance(signals, SignalBatch):
+            signals = SignalBatch.from_signals(signals, pipeline_data.index)
+        amounts, stop_loss_diffs, target_diffs, last_closes = self._get_sizes(
+            portfolio, signals, pipeline_data)
+        amounts1 = amounts // 3
+        # order 1 no profit target
+        orders1 = self._make_orders(signals, amounts1, stop_loss_diffs, target_diffs,
+                                    last_closes, with_target=False)
+        # order 2 has profit target
+        orders2 = self._make_orders(signals, amounts1 * 2, stop_loss_diffs, target_diffs,
+                                    last_closes)
+        return [order for pair in zip(orders1, orders2) for order in pair]
@@ -0,0 +1,227 @@
+"""Stops of all managed orders evaluated together.
+
+The stop parameters of the managed orders are laid out in numpy arrays, one
+row per order, so each session the stops of every position are updated and
+checked in a few array operations instead of one data.loc lookup and method
+call per order. The results follow the semantics of basic/stop.py.
+
+The stop objects stay the source of truth, as strategies and stop orders
+read their prices: the state of the stops is read from them before each
+batch and written back after maintenance. Stops of other classes than the
+ones below are handled one at a time by their own methods.
+"""
+import numpy as np
+import pandas as pd
+
+from zipbird.basic.order import Order
+from zipbird.basic.stop import (
+    COL_ATR, COL_CLOSE, MAX_STOP_PERCENT,
+    ATRTrailingStop, FixProfitTarget, FixStop, PercentProfitTarget, PercentTrailingStop, StopOrder)
+from zipbird.basic.types import Equity, LongShort, StopOrderStatus
+
+# kinds of profit targets and trailing stops
+_NONE = 0
+_PERCENT = 1
+_FIX = 2
+_ATR = 3
+
+_TARGET_KINDS = {PercentProfitTarget: _PERCENT, FixProfitTarget: _FIX}
+_TRAILING_KINDS = {PercentTrailingStop: _PERCENT, ATRTrailingStop: _ATR}
+
+
+class StopEngine:
+    """Stops of the managed orders of a PositionManager"""
+    order_ids: list[str]
+    stops: list[StopOrder]
+    assets: list[Equity]
+
+    def __init__(self):
+        self._layout({}, {})
+
+    def sync(self, orders:dict[str, Order]):
+        """Lays out the stops of the orders, if they changed since the last sync"""
+        stops = {order_id: order.stop for order_id, order in orders.items() if order.stop}
+        if list(stops.items()) != list(self._stops.items()):
+            self._layout(orders, stops)
+
+    def _layout(self, orders:dict[str, Order], stops:dict[str, StopOrder]):
+        self._stops = stops
+        self.order_ids = list(stops)
+        self.stops = list(stops.values())
+        self.assets = [orders[order_id].stock for order_id in self.order_ids]
+        rows = [_parameters(stop) for stop in self.stops]
+        columns = zip(*rows) if rows else [[]] * 10
+        (self.batched, self.sign, self.time_stop, self.target_kind, self.target_param,
+         self.has_initial, self.initial_diff, self.trailing_kind, self.trailing_param,
+         self.enter_price) = (np.array(column) for column in columns)
+
+    def __len__(self):
+        return len(self.stops)
+
+    def do_maintenance(self, open_prices:np.ndarray, data:pd.DataFrame):
+        """StopOrder.do_maintenance of every stop, open_prices aligned to the rows"""
+        if not self.stops:
+            return
+        self._read_state()
+        closes = self._column(data, COL_CLOSE)
+        is_long = self.sign > 0
+
+        # update_with_open_price
+        self.target_price = np.select(
+            [self.target_kind == _PERCENT, self.target_kind == _FIX],
+            [open_prices * (1 + self.sign * self.target_param),
+             open_prices + self.sign * self.target_param],
+            self.target_price)
+        self.initial_price = np.where(
+            self.has_initial,
+            np.where(is_long,
+                     _max(open_prices - self.initial_diff, open_prices * (1 - MAX_STOP_PERCENT)),
+                     open_prices + self.initial_diff),
+            self.initial_price)
+
+        # update_stops, an unset trailing stop price is 0
+        has_trailing = self.trailing_kind != _NONE
+        self.activated = np.where(
+            has_trailing,
+            np.where(is_long, closes >= self.enter_price, closes <= self.enter_price),
+            self.activated)
+        long_stop = self.trailing_price
+        short_stop = np.where(self.trailing_price == 0, np.inf, self.trailing_price)
+        percent_stop = np.where(
+            is_long,
+            _max(long_stop, closes * (1 - self.trailing_param)),
+            _min(short_stop, closes * (1 + self.trailing_param)))
+        if (self.trailing_kind == _ATR).any():
+            diff_prices = self.trailing_param * self._column(data, COL_ATR)
+            atr_stop = np.where(
+                is_long,
+                _max(_max(long_stop, closes - diff_prices), closes * (1 - MAX_STOP_PERCENT)),
+                _min(short_stop, closes + diff_prices))
+        else:
+            atr_stop = self.trailing_price
+        self.trailing_price = np.select(
+            [self.trailing_kind == _PERCENT, self.trailing_kind == _ATR],
+            [percent_stop, atr_stop],
+            self.trailing_price)
+
+        self.bar_count += 1
+        self._write_state()
+        for row in np.flatnonzero(~self.batched):
+            self.stops[row].do_maintenance(open_prices[row], data.loc[self.assets[row]])
+
+    def get_triggered(self, data:pd.DataFrame) -> list[tuple[str, StopOrderStatus]]:
+        """Order ids and StopOrder.get_status of the stops that are triggered"""
+        if not self.stops:
+            return []
+        self._read_state()
+        closes = self._column(data, COL_CLOSE)
+        is_long = self.sign > 0
+        statuses = np.select(
+            [
+                (self.time_stop > 0) & (self.bar_count >= self.time_stop),
+                (self.target_kind != _NONE) & np.where(
+                    is_long, closes >= self.target_price, closes <= self.target_price),
+                self.has_initial & np.where(
+                    is_long, closes <= self.initial_price, closes >= self.initial_price),
+                self.activated & np.where(
+                    is_long, closes <= self.trailing_price, closes >= self.trailing_price),
+            ],
+            [
+                StopOrderStatus.TIME_STOP.value,
+                StopOrderStatus.TARGET_REACHED.value,
+                StopOrderStatus.INITIAL_STOP.value,
+                StopOrderStatus.TRAILING_STOP.value,
+            ],
+            StopOrderStatus.NOT_TRIGGER.value)
+        for row in np.flatnonzero(~self.batched):
+            statuses[row] = self.stops[row].get_status(data.loc[self.assets[row]]).value
+        return [(self.order_ids[row], StopOrderStatus(statuses[row]))
+                for row in np.flatnonzero(statuses != StopOrderStatus.NOT_TRIGGER.value)]
+
+    def _column(self, data:pd.DataFrame, name:str) -> np.ndarray:
+        rows = data.index.get_indexer(self.assets)
+        if (rows < 0).any():
+            missing = [asset for asset, row in zip(self.assets, rows) if row < 0]
+            raise KeyError(f'No pipeline data for {missing}')
+        return data[name].to_numpy(dtype=float)[rows]
+
+    def _read_state(self):
+        self.bar_count = np.array([stop.bar_count for stop in self.stops], dtype=np.int64)
+        self.target_price = _state([stop.profit_target for stop in self.stops], 'target_price', np.nan)
+        self.initial_price = _state([stop.initial_stop for stop in self.stops], 'stop_price', np.nan)
+        trailing_stops = [stop.trailing_stop for stop in self.stops]
+        self.trailing_price = _state(trailing_stops, 'stop_price', 0)
+        self.activated = np.array([bool(t and t.activated) for t in trailing_stops])
+
+    def _write_state(self):
+        rows = np.flatnonzero(self.batched)
+        columns = zip(rows.tolist(),
+                      self.bar_count[rows].tolist(),
+                      self.target_price[rows].tolist(),
+                      self.initial_price[rows].tolist(),
+                      self.trailing_price[rows].tolist(),
+                      self.activated[rows].tolist())
+        for row, bar_count, target_price, initial_price, trailing_price, activated in columns:
+            stop = self.stops[row]
+            stop.bar_count = bar_count
+            if stop.profit_target:
+                stop.profit_target.target_price = target_price
+            if stop.initial_stop:
+                stop.initial_stop.stop_price = initial_price
+            if stop.trailing_stop:
+                stop.trailing_stop.stop_price = trailing_price
+                stop.trailing_stop.activated = activated
+
+
+def _parameters(stop:StopOrder) -> tuple:
+    """Row of the stop: (batched, sign, time_stop, target_kind, target_param,
+    has_initial, initial_diff, trailing_kind, trailing_param, enter_price)"""
+    initial, target, trailing = stop.initial_stop, stop.profit_target, stop.trailing_stop
+    long_shorts = {c.long_or_short for c in (initial, target, trailing) if c}
+    target_kind = _TARGET_KINDS.get(type(target), _NONE)
+    trailing_kind = _TRAILING_KINDS.get(type(trailing), _NONE)
+    batched = (len(long_shorts) <= 1
+               and (not initial or (type(initial) is FixStop and initial.activated))
+               and (not target or target_kind != _NONE)
+               and (not trailing or trailing_kind != _NONE))
+    if not batched:
+        return (False, 1., 0, _NONE, np.nan, False, np.nan, _NONE, np.nan, np.nan)
+
+    if target_kind == _PERCENT:
+        target_param = target.target_percent
+    elif target_kind == _FIX:
+        target_param = target.diff
+    else:
+        target_param = np.nan
+    if trailing_kind == _PERCENT:
+        trailing_param = trailing.trailing_percent
+    elif trailing_kind == _ATR:
+        trailing_param = trailing.trailing_atr_multiple
+    else:
+        trailing_param = np.nan
+    return (
+        True,
+        -1. if LongShort.Short in long_shorts else 1.,
+        stop.time_stop or 0,
+        target_kind,
+        target_param,
+        initial is not None,
+        initial.diff_price if initial else np.nan,
+        trailing_kind,
+        trailing_param,
+        trailing.enter_price if trailing else np.nan,
+    )
+
+
+def _state(components:list, name:str, unset:float) -> np.ndarray:
+    values = [getattr(c, name) if c else None for c in components]
+    return np.array([unset if v is None else v for v in values], dtype=float)
+
+
+# max and min of two values as the builtins compare them, which matters for NaN
+def _max(a:np.ndarray, b:np.ndarray) -> np.ndarray:
+    return np.where(b > a, b, a)
+
+
+def _min(a:np.ndarray, b:np.ndarray) -> np.ndarray:
+    return np.where(b < a, b, a)
@@ -1,69 +1,167 @@
 from datetime import date
 import math
+import numpy as np
 import pandas as pd
-import uuid
 
 from zipbird.basic.types import LongShort, OpenClose
 from zipbird.basic.order import Order
-from zipbird.replay.replay_order import ReplayOrder
+from zipbird.replay.replay_order import ORDER_COLUMNS, ReplayOrder, orders_dtype, orders_from_array
 
 
 class OrderCollector:
-    def __init__(self, strategy_name):
+    """Round trips of a strategy, kept in growable columnar arrays.
+
+    Symbols and strategy names are stored as codes into their category
+    lists, so to_dataframe and the reports are vectorized over the columns.
+    """
+    def __init__(self, strategy_name, capacity:int=1024):
         self.strategy_name = strategy_name
-        self.orders:dict[ReplayOrder] = {}
+        self.size = 0
+        self.strategy_names = Categories()
+        self.symbols = Categories()
+        self.columns = _empty_columns(capacity)
+        # id of the open order => row of its round trip
+        self._rows = {}
+
+    def __len__(self):
+        return self.size
 
     def add_open_order(self,
                        open_date: date,
                        open_price: float,
                        open_order: Order):
-        self.orders[open_order.uuid] = ReplayOrder.make_from_open_order(
+        self._rows[open_order.order_id] = self._append(
             strategy_name=self.strategy_name,
+            symbol=open_order.stock.symbol,
+            long_short=open_order.long_short,
             open_date=open_date,
             open_price=round_price(open_price, OpenClose.Open, open_order.long_short),
-            open_order=open_order)
+            open_sizer_percent=open_order.get_percent_size(),
+            open_sizer_stop_diff=open_order.get_initial_stop_diff(),
+            close_date=None,
+            close_price=None)
     
     def add_close_order(self, order: Order, close_date: date, close_price:float):
-        replay_order = self.orders[order.uuid]
-        replay_order.add_close_order(
-            close_date,
-            round_price(close_price, OpenClose.Close, order.long_short))
+        row = self._rows[order.order_id]
+        self.columns['close_date'][row] = close_date
+        self.columns['close_price'][row] = round_price(close_price, OpenClose.Close, order.long_short)
+
+    def add_round_trip(self, order: ReplayOrder):
+        # orders are keyed on order's id, it is not needed
+        # when we try to replay the orders
+        self._append(
+            strategy_name=order.strategy_name,
+            symbol=order.symbol,
+            long_short=order.long_short,
+            open_date=order.open_date,
+            open_price=order.open_price,
+            open_sizer_percent=order.open_sizer_percent,
+            open_sizer_stop_diff=order.open_sizer_stop_diff,
+            close_date=order.close_date,
+            close_price=order.close_price)
+
+    def _append(self, strategy_name, symbol, long_short, open_date, open_price,
+                open_sizer_percent, open_sizer_stop_diff, close_date, close_price) -> int:
+        if self.size == len(self.columns['open_date']):
+            self._grow()
+        row = self.size
+        columns = self.columns
+        columns['strategy_code'][row] = self.strategy_names.code(strategy_name)
+        columns['symbol_code'][row] = self.symbols.code(symbol)
+        columns['long_short'][row] = 1 if long_short == LongShort.Long else -1
+        columns['open_date'][row] = open_date
+        columns['open_price'][row] = open_price
+        columns['open_sizer_percent'][row] = np.nan if open_sizer_percent is None else open_sizer_percent
+        columns['open_sizer_stop_diff'][row] = np.nan if open_sizer_stop_diff is None else open_sizer_stop_diff
+        columns['close_date'][row] = close_date if close_date else np.datetime64('NaT')
+        columns['close_price'][row] = np.nan if close_price is None else close_price
+        self.size += 1
+        return row
+
+    def _grow(self):
+        columns = _empty_columns(2 * len(self.columns['open_date']))
+        for name, values in self.columns.items():
+            columns[name][:self.size] = values[:self.size]
+        self.columns = columns
+
+    def column(self, name:str) -> np.ndarray:
+        return self.columns[name][:self.size]
+
+    def to_array(self) -> np.ndarray:
+        """The round trips as the structured array of orders_to_array"""
+        array = np.empty(self.size, dtype=orders_dtype(self.strategy_names.values, self.symbols.values))
+        array['strategy_name'] = self.strategy_names.decode(self.column('strategy_code'))
+        array['symbol'] = self.symbols.decode(self.column('symbol_code'))
+        for name, _ in ORDER_COLUMNS:
+            array[name] = self.column(name)
+        return array
+
+    def get_orders(self) -> list[ReplayOrder]:
+        return orders_from_array(self.to_array())
 
     def write_orders(self, filename:str):
-        orders = sorted(self.orders.values(), key=lambda o: o.open_date)
+        """Writes the orders sorted by open date, as a numpy structured
+        array if filename ends with .npy, as csv otherwise"""
+        orders = self.to_array()
+        orders = orders[np.argsort(orders['open_date'], kind='stable')]
+        if filename.endswith('.npy'):
+            np.save(filename, orders)
+            return
         with open(filename, 'w') as f:
-            for order in orders:
+            for order in orders_from_array(orders):
                 f.write(f'{order.as_csv()}\n')
-    
-    def add_round_trip(self, order: ReplayOrder):
-        # orders are keyed on order's id, it is not needed
-        # when we try to replay the orders, so create a random one
-        order_id = uuid.uuid4()
-        self.orders[order_id] = order
 
     def to_dataframe(self):
-        result = []
-        for order in self.orders.values():
-            if order.close_price is not None:
-                if order.long_short == LongShort.Long:
-                    profit_pct = order.close_price / order.open_price - 1
-                else:
-                    profit_pct = order.open_price / order.close_price - 1
-                result.append({
-                    'symbol': order.symbol,
-                    'year': order.close_date.year,
-                    'open_date': order.open_date,
-                    'open_price': order.open_price,
-                    'close_date': order.close_date,
-                    'close_price': order.close_price,
-                    'long_short': order.long_short,
-
-                    # dervied
-                    'profit_pct': profit_pct,
-                    'trade_days': (order.close_date - order.open_date).days,
-                })
-
-        return pd.DataFrame(result)
+        closed = ~np.isnat(self.column('close_date'))
+        is_long = self.column('long_short')[closed] == 1
+        open_date = self.column('open_date')[closed]
+        open_price = self.column('open_price')[closed]
+        close_date = self.column('close_date')[closed]
+        close_price = self.column('close_price')[closed]
+        return pd.DataFrame({
+            'symbol': pd.Categorical.from_codes(
+                self.column('symbol_code')[closed], categories=self.symbols.values),
+            'year': close_date.astype('datetime64[Y]').astype(int) + 1970,
+            'open_date': open_date,
+            'open_price': open_price,
+            'close_date': close_date,
+            'close_price': close_price,
+            'long_short': _LONG_SHORT[np.where(is_long, 0, 1)],
+
+            # dervied
+            'profit_pct': np.where(is_long, close_price / open_price, open_price / close_price) - 1,
+            'trade_days': (close_date - open_date).astype(int),
+        })
+
+
+_LONG_SHORT = np.array([LongShort.Long, LongShort.Short], dtype=object)
+
+
+def _empty_columns(capacity:int) -> dict[str, np.ndarray]:
+    columns = {
+        'strategy_code': np.empty(capacity, dtype='i4'),
+        'symbol_code': np.empty(capacity, dtype='i4'),
+    }
+    for name, dtype in ORDER_COLUMNS:
+        columns[name] = np.empty(capacity, dtype=dtype)
+    return columns
+
+
+class Categories:
+    """Distinct values, each with the code of its position"""
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+
+    def code(self, value) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def decode(self, codes:np.ndarray) -> np.ndarray:
+        return np.array(self.values or [''])[codes]
             
 
 def round_price(price:float, close_or_open:OpenClose, long_or_short:LongShort):
@@ -0,0 +1,285 @@
+"""Replays saved round trips without running zipline.
+
+Replaying a ReplayStrategy through zipline.run_algorithm simulates every
+session with a pipeline, yet each replay order already knows its open and
+close dates and prices. ReplayEngine only visits the sessions with orders:
+it values the portfolio at the previous close, sizes the opening orders
+with the ReplayStrategy sizers, fills them at their recorded prices, and
+marks the positions to market from a dense close matrix at the end.
+
+Positions are kept in shares adjusted to the last session, so splits
+between the open and the close of a round trip need no event handling.
+Cash dividends are credited on their pay date for the shares held on their
+ex date, as zipline does, including the dividends short positions owe.
+run_batch replays the same orders for many strategy weight vectors at
+once, with the cash, holdings and sizing of every vector as arrays.
+"""
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from zipline.data import bundles
+from zipline.pipeline.domain import US_EQUITIES
+
+from zipbird.basic.types import LongShort
+from zipbird.replay.replay_order import ReplayOrder
+from zipbird.replay.replay_strategy import InvalidOpenOrderException, ReplayStrategy
+from zipbird.strategy.daily_simulator import DEFAULT_COMMISSION_PER_SHARE, load_corporate_actions
+from zipbird.strategy.precompute_engine import adjustment_factors
+
+
+class ReplayEngine:
+    """Replays the orders loaded in a ReplayStrategy over sessions, with
+    closes[i, a] the unadjusted close of assets[a] on sessions[i] and
+    split_factors[i, a] the product of the split ratios effective after
+    sessions[i]. dividends are the cash dividends by ex date, as
+    load_corporate_actions returns them."""
+    def __init__(self,
+                 replayer:ReplayStrategy,
+                 sessions:pd.DatetimeIndex,
+                 assets:list,
+                 closes:np.ndarray,
+                 split_factors:np.ndarray,
+                 commission_per_share:float=DEFAULT_COMMISSION_PER_SHARE,
+                 dividends:dict|None=None):
+        self.replayer = replayer
+        self.sessions = sessions
+        self.assets = list(assets)
+        self.split_factors = split_factors
+        # closes adjusted to the last session, of the last session traded
+        self.adjusted_closes = np.nan_to_num(
+            pd.DataFrame(closes * split_factors).ffill().to_numpy())
+        self.commission_per_share = commission_per_share
+        self._columns = {asset: col for col, asset in enumerate(self.assets)}
+        self._dividends = self._dividend_rows(dividends or {})
+
+    @classmethod
+    def from_bundle(cls,
+                    replayer:ReplayStrategy,
+                    bundle_data,
+                    start_day:pd.Timestamp,
+                    end_day:pd.Timestamp):
+        """Looks up the assets of the replay orders and loads their closes
+        from the session before start_day to end_day"""
+        all_sessions = US_EQUITIES.calendar.sessions
+        start = max(all_sessions.searchsorted(start_day) - 1, 0)
+        sessions = all_sessions[start:all_sessions.searchsorted(end_day, side='right')]
+        finder = bundle_data.asset_finder
+        for day_orders in replayer.orders.values():
+            for order in day_orders:
+                order.asset = finder.lookup_symbol(
+                    order.symbol, as_of_date=pd.Timestamp(order.open_date))
+        assets = sorted({order.asset for day_orders in replayer.orders.values()
+                         for order in day_orders}, key=lambda asset: asset.sid)
+        sids = np.array([asset.sid for asset in assets])
+        closes = bundle_data.equity_daily_bar_reader.load_raw_arrays(
+            ['close'], sessions[0], sessions[-1], sids)[0]
+        split_factors = adjustment_factors(
+            bundle_data.adjustment_reader, ('splits',), sessions, sids)
+        _, dividends = load_corporate_actions(bundle_data.adjustment_reader, sessions)
+        return cls(replayer, sessions, assets, closes, split_factors, dividends=dividends)
+
+    def _dividend_rows(self, dividends:dict) -> dict:
+        """{column: [(ex row, pay row, amount)]} of the dividends of the assets"""
+        columns = {asset.sid: col for col, asset in enumerate(self.assets)}
+        rows = {}
+        for ex_date, payouts in dividends.items():
+            ex_row = self.sessions.searchsorted(ex_date)
+            for sid, amount, pay_date in payouts:
+                if sid in columns:
+                    rows.setdefault(columns[sid], []).append(
+                        (ex_row, self.sessions.searchsorted(pay_date), amount))
+        return rows
+
+    def run(self, capital:float, start_day:pd.Timestamp|None=None) -> pd.DataFrame:
+        """Replays the orders from start_day, returns the perf frame"""
+        def size(order, row, portfolio_values):
+            order.replay_shares = self.replayer.get_open_order_share(
+                order, portfolio_values[0], {'close': {order.asset: self._latest_close(row, order)}})
+            return np.array([order.replay_shares])
+
+        first_row = self._first_row(start_day)
+        ending_cash, long_value, short_value = self._replay(size, capital, first_row, 1)
+        return self._perf(capital, first_row, ending_cash[:, 0], long_value[:, 0], short_value[:, 0])
+
+    def run_batch(self,
+                  capital:float,
+                  weights:np.ndarray,
+                  start_day:pd.Timestamp|None=None) -> np.ndarray:
+        """Replays the orders once for each row of weights, the weights of
+        the replayer strategies in their order. Returns the portfolio values
+        as a (sessions x weight rows) array."""
+        weights = np.atleast_2d(weights)
+        strategy_index = {name: i for i, name in enumerate(self.replayer.strategies)}
+
+        def size(order, row, portfolio_values):
+            return _open_order_shares(
+                self.replayer.strategies[order.strategy_name].position_sizer,
+                order,
+                weights[:, strategy_index[order.strategy_name]],
+                portfolio_values,
+                self._latest_close(row, order))
+
+        ending_cash, long_value, short_value = self._replay(
+            size, capital, self._first_row(start_day), len(weights))
+        return ending_cash + long_value + short_value
+
+    def _first_row(self, start_day:pd.Timestamp|None) -> int:
+        return 1 if start_day is None else max(self.sessions.searchsorted(start_day), 1)
+
+    def _replay(self, size, capital:float, first_row:int, n:int):
+        """Replays the orders for n portfolios, size(order, row,
+        portfolio_values) returning the shares each of them opens.
+        Returns the ending cash, long and short value of every session from
+        first_row, as (sessions x n) arrays."""
+        rows = len(self.sessions)
+        cash_changes = np.zeros((rows, n))
+        long_value = np.zeros((rows, n))
+        short_value = np.zeros((rows, n))
+        holdings = np.zeros((n, len(self.assets)))
+        cash = np.full(n, float(capital))
+        # order, open row and adjusted shares of the round trips opened during the replay
+        opened = {}
+        # (pay row, cash) of the dividends accrued but not paid yet
+        payable = []
+        accrued_row = 0
+
+        def add_value(order, open_row, end_row, adjusted_shares):
+            value = long_value if order.long_short == LongShort.Long else short_value
+            col = self._columns[order.asset]
+            value[open_row:end_row] += np.outer(self.adjusted_closes[open_row:end_row, col], adjusted_shares)
+
+        def accrue_dividends(end_row):
+            """Dividends of the open round trips with ex rows up to end_row,
+            on the shares held before the orders of the ex row"""
+            nonlocal accrued_row
+            for order, open_row, adjusted_shares in opened.values():
+                col = self._columns[order.asset]
+                for ex_row, pay_row, amount in self._dividends.get(col, ()):
+                    if max(accrued_row, open_row) < ex_row <= end_row and pay_row < rows:
+                        payout = adjusted_shares * self.split_factors[ex_row, col] * amount
+                        cash_changes[pay_row] += payout
+                        payable.append((pay_row, payout))
+            accrued_row = end_row
+
+        day_rows = self.sessions.get_indexer(pd.DatetimeIndex(list(self.replayer.orders)))
+        for day, row in sorted(zip(self.replayer.orders, day_rows), key=lambda pair: pair[0]):
+            if row < first_row:
+                continue
+            accrue_dividends(row)
+            cash += sum(payout for pay_row, payout in payable if pay_row <= row)
+            payable = [(pay_row, payout) for pay_row, payout in payable if pay_row > row]
+            portfolio_values = cash + holdings @ self.adjusted_closes[row - 1]
+            for order in self.replayer.orders[day]:
+                col = self._columns[order.asset]
+                factor = self.split_factors[row, col]
+                if order.open_date == day:
+                    shares = size(order, row, portfolio_values) * _sign(order)
+                    if not shares.any():
+                        continue
+                    price = order.open_price
+                    opened[id(order)] = (order, row, shares / factor)
+                elif id(order) in opened:
+                    _, open_row, adjusted_shares = opened.pop(id(order))
+                    add_value(order, open_row, row, adjusted_shares)
+                    shares = -adjusted_shares * factor
+                    price = order.close_price
+                else:
+                    continue
+                change = -shares * price - np.abs(shares) * self.commission_per_share
+                cash += change
+                cash_changes[row] += change
+                holdings[:, col] += shares / factor
+        accrue_dividends(rows - 1)
+        for order, open_row, adjusted_shares in opened.values():
+            add_value(order, open_row, rows, adjusted_shares)
+
+        ending_cash = capital + np.cumsum(cash_changes, axis=0)
+        return ending_cash[first_row:], long_value[first_row:], short_value[first_row:]
+
+    def _latest_close(self, row:int, order:ReplayOrder) -> float:
+        """The close of the session before row, as pipeline_data sees it on row"""
+        col = self._columns[order.asset]
+        return self.adjusted_closes[row - 1, col] / self.split_factors[row, col]
+
+    def _perf(self,
+              capital:float,
+              first_row:int,
+              ending_cash:np.ndarray,
+              long_value:np.ndarray,
+              short_value:np.ndarray) -> pd.DataFrame:
+        portfolio_value = ending_cash + long_value + short_value
+        starting_value = np.concatenate([[capital], portfolio_value[:-1]])
+        perf = pd.DataFrame({
+            'ending_cash': ending_cash,
+            'starting_value': starting_value,
+            'portfolio_value': portfolio_value,
+            'pnl': portfolio_value - starting_value,
+            'returns': portfolio_value / starting_value - 1,
+            'long_value': long_value,
+            'short_value': short_value,
+            'gross_leverage': (long_value - short_value) / portfolio_value,
+        }, index=self.sessions[first_row:].tz_localize('UTC'))
+        perf.index.name = 'period_close'
+        return perf
+
+
+def _sign(order:ReplayOrder) -> int:
+    return 1 if order.long_short == LongShort.Long else -1
+
+
+def _open_order_shares(position_sizer,
+                       order:ReplayOrder,
+                       weights:np.ndarray,
+                       portfolio_values:np.ndarray,
+                       last_close:float) -> np.ndarray:
+    """ReplayStrategy.get_open_order_share for arrays of strategy weights
+    and portfolio values"""
+    if order.open_sizer_percent and order.open_sizer_percent > 0:
+        return np.trunc(order.open_sizer_percent * weights * portfolio_values / last_close)
+    elif order.open_sizer_stop_diff and order.open_sizer_stop_diff > 0:
+        shares_by_percent = np.trunc(
+            position_sizer.get_max_equity_per_position() * weights * portfolio_values / last_close)
+        shares_by_risk = np.trunc(
+            position_sizer.get_max_fraction_risk() * weights * portfolio_values / order.open_sizer_stop_diff)
+        return np.minimum(shares_by_percent, shares_by_risk)
+    else:
+        raise InvalidOpenOrderException(
+            "Order must have either open_sizer_percent or open_sizer_stop_diff")
+
+
+def weight_grid(n_strategies:int, step:float) -> np.ndarray:
+    """All weight vectors of n_strategies in multiples of step that add up to 1"""
+    steps = int(round(1 / step))
+    vectors = [combination for combination in itertools.product(range(steps + 1), repeat=n_strategies)
+               if sum(combination) == steps]
+    return np.array(vectors) / steps
+
+
+def rank_weights(strategy_names:list[str],
+                 weights:np.ndarray,
+                 portfolio_values:np.ndarray) -> pd.DataFrame:
+    """CAGR and max drawdown of each weight vector as utils.get_main_perf
+    computes them, best CAGR to max drawdown first"""
+    max_drawdown = (portfolio_values / np.maximum.accumulate(portfolio_values, axis=0) - 1).min(axis=0)
+    cagr = np.power(portfolio_values[-1] / portfolio_values[0], 252 / len(portfolio_values)) - 1
+    table = pd.DataFrame(weights, columns=strategy_names)
+    table['cagr'] = cagr
+    table['max_drawdown'] = max_drawdown
+    # without drawdown, a gain ranks above any ratio and a loss below
+    with np.errstate(divide='ignore', invalid='ignore'):
+        table['cagr_to_max_drawdown'] = np.select(
+            [max_drawdown < 0, cagr > 0, cagr < 0],
+            [cagr / -max_drawdown, np.inf, -np.inf],
+            0.0)
+    return table.sort_values('cagr_to_max_drawdown', ascending=False, ignore_index=True)
+
+
+def run_replay(replayer:ReplayStrategy,
+               bundle:str,
+               start_day:pd.Timestamp,
+               end_day:pd.Timestamp,
+               capital:float) -> pd.DataFrame:
+    engine = ReplayEngine.from_bundle(replayer, bundles.load(bundle), start_day, end_day)
+    return engine.run(capital, start_day)
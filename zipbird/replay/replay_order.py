@@ -1,4 +1,5 @@
 from datetime import date, datetime
+import numpy as np
 from zipbird.basic.order import Order
 from zipbird.basic.types import Equity, LongShort
 from zipbird.utils import utils
@@ -101,4 +102,88 @@ def to_float(float_str: str) -> float:
     if not float_str:
         return None
     else:
-        return float(float_str)
\ No newline at end of file
+        return float(float_str)
+
+
+# fields of the columns of round trips after strategy_name and symbol
+ORDER_COLUMNS = [
+    ('long_short', 'i1'),
+    ('open_date', 'datetime64[D]'),
+    ('open_price', 'f8'),
+    ('open_sizer_percent', 'f8'),
+    ('open_sizer_stop_diff', 'f8'),
+    ('close_date', 'datetime64[D]'),
+    ('close_price', 'f8'),
+]
+
+
+def orders_dtype(strategy_names:list[str], symbols:list[str]) -> np.dtype:
+    def width(values):
+        return max([len(v) for v in values] + [1])
+
+    return np.dtype([
+        ('strategy_name', f'U{width(strategy_names)}'),
+        ('symbol', f'U{width(symbols)}'),
+    ] + ORDER_COLUMNS)
+
+
+def orders_to_array(orders:list[ReplayOrder]) -> np.ndarray:
+    """Round trips as a numpy structured array, one field per column.
+
+    Missing sizers, close dates and close prices are stored as NaN and NaT.
+    """
+    dtype = orders_dtype([o.strategy_name for o in orders], [o.symbol for o in orders])
+    maybe_nan = lambda a : np.nan if a is None else a
+    return np.array([(
+        o.strategy_name,
+        o.symbol,
+        1 if o.long_short == LongShort.Long else -1,
+        o.open_date,
+        o.open_price,
+        maybe_nan(o.open_sizer_percent),
+        maybe_nan(o.open_sizer_stop_diff),
+        o.close_date if o.close_date else np.datetime64('NaT'),
+        maybe_nan(o.close_price),
+    ) for o in orders], dtype=dtype)
+
+
+def orders_from_array(array:np.ndarray) -> list[ReplayOrder]:
+    """Inverse of orders_to_array"""
+    def maybe_none(values):
+        return [None if v != v else v for v in values.tolist()]
+
+    columns = zip(
+        array['strategy_name'].tolist(),
+        array['symbol'].tolist(),
+        (array['long_short'] == 1).tolist(),
+        # NaT converts to None
+        array['open_date'].tolist(),
+        array['open_price'].tolist(),
+        maybe_none(array['open_sizer_percent']),
+        maybe_none(array['open_sizer_stop_diff']),
+        array['close_date'].tolist(),
+        maybe_none(array['close_price']),
+    )
+    result = []
+    for (strategy_name, symbol, is_long, open_date, open_price, open_sizer_percent,
+         open_sizer_stop_diff, close_date, close_price) in columns:
+        order = ReplayOrder()
+        order.strategy_name = strategy_name
+        order.symbol = symbol
+        order.long_short = LongShort.Long if is_long else LongShort.Short
+        order.open_date = open_date
+        order.open_price = open_price
+        order.open_sizer_percent = open_sizer_percent
+        order.open_sizer_stop_diff = open_sizer_stop_diff
+        order.close_date = close_date
+        order.close_price = close_price
+        result.append(order)
+    return result
+
+
+def load_replay_orders(filename:str) -> list[ReplayOrder]:
+    """Loads the orders of a .npy file written by OrderCollector, or of a csv"""
+    if filename.endswith('.npy'):
+        return orders_from_array(np.load(filename))
+    with open(filename) as f:
+        return [ReplayOrder.from_csv(line) for line in f]
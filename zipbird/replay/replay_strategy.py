@@ -5,7 +5,7 @@ import pandas as pd
 from zipbird.utils.timer_context import TimerContext
 from zipbird.utils.logger_util import DebugLogger
 from zipbird.basic.types import LongShort
-from zipbird.replay.replay_order import ReplayOrder
+from zipbird.replay.replay_order import ReplayOrder, load_replay_orders
 from zipbird.strategy.strategy_executor import StrategyExecutor
 
 import zipline.api as zipline_api
@@ -58,16 +58,8 @@ class ReplayStrategy:
                 with self.timer_context.timer('load symbols'):
                     order.asset = self.zipline_api.symbol(order.symbol)
     
-    def _load_one_file_from_csv(self, filename:str) -> list[ReplayOrder]:
-        result = []
-        with open(filename) as f:
-            for line in f:
-                order = ReplayOrder.from_csv(line)
-                result.append(order)
-        return result
-    
     def load_orders(self, filename:str) -> None:
-        for order in self._load_one_file_from_csv(filename):
+        for order in load_replay_orders(filename):
             self.orders[order.open_date].append(order)
             if order.close_date:
                 self.orders[order.close_date].append(order)
@@ -95,21 +87,26 @@ class ReplayStrategy:
     def send_orders(self, trade_day:date, portfolio_value:float, pipeline_data:pd.DataFrame):
         for order in self.orders[trade_day]:
             if order.open_date == trade_day:
-                if order.open_sizer_percent and order.open_sizer_percent > 0:
-                    order.replay_shares = self.get_open_percent_order_share(
-                        order, portfolio_value, pipeline_data)
-                elif order.open_sizer_stop_diff and order.open_sizer_stop_diff > 0:
-                    order.replay_shares = self.get_open_stop_diff_order_share(
-                        order, portfolio_value, pipeline_data)
-                else:
-                    raise InvalidOpenOrderException(
-                        "Order must have either open_sizer_percent or open_sizer_stop_diff")
+                order.replay_shares = self.get_open_order_share(
+                    order, portfolio_value, pipeline_data)
                 self.send_open_order(order)
             elif order.close_date == trade_day:
                 self.send_close_order(order)
             else:
                 raise InvalidTradeDayOrder("Order date must match trade day")
 
+    def get_open_order_share(
+            self, order:ReplayOrder, portfolio_value:float, pipeline_data:pd.DataFrame):
+        if order.open_sizer_percent and order.open_sizer_percent > 0:
+            return self.get_open_percent_order_share(
+                order, portfolio_value, pipeline_data)
+        elif order.open_sizer_stop_diff and order.open_sizer_stop_diff > 0:
+            return self.get_open_stop_diff_order_share(
+                order, portfolio_value, pipeline_data)
+        else:
+            raise InvalidOpenOrderException(
+                "Order must have either open_sizer_percent or open_sizer_stop_diff")
+
     def get_open_percent_order_share(
             self, order:ReplayOrder, portfolio_value:float, pipeline_data:pd.DataFrame):
         weight = self.strategy_weight[order.strategy_name]
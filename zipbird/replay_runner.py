@@ -1,15 +1,18 @@
 
 import time
 from functools import partial, wraps
+import numpy as np
 import pandas as pd
 import argparse
 import zipline
+from zipline.data import bundles
 import zipline.api as zipline_api
 from zipline.pipeline import Pipeline
 from zipline.pipeline.data import USEquityPricing
 from zipline.finance.slippage import DailyBarReplayNoSplippage
 
 from zipbird.replay.order_collector import OrderCollector
+from zipbird.replay.replay_engine import ReplayEngine, rank_weights, run_replay, weight_grid
 from zipbird.replay.replay_order import ReplayOrder
 from zipbird.replay.replay_strategy import ReplayStrategy
 import zipbird.strategies.models as se_models
@@ -39,6 +42,12 @@ def run():
                         nargs='+',
                         type=float,
                         help='List of portfolio weights when replaying stratgies')
+    parser.add_argument('--engine', default='zipline', choices=['zipline', 'fast'])
+    parser.add_argument('--weights_file',
+                        help='csv of weight vectors, one per line, to replay in one batch')
+    parser.add_argument('--weight_step',
+                        type=float,
+                        help='Replay in one batch all weight vectors in multiples of the step that add up to 1')
     
     args = parser.parse_args()
 
@@ -47,6 +56,17 @@ def run():
     
     strategy_names = args.replay_strategies
     strategy_weights = args.replay_weights
+    batch_weights = None
+    if args.weights_file:
+        batch_weights = np.loadtxt(args.weights_file, delimiter=',', ndmin=2)
+    elif args.weight_step:
+        batch_weights = weight_grid(len(strategy_names or []), args.weight_step)
+    if batch_weights is not None:
+        if not strategy_names or batch_weights.shape[1] != len(strategy_names):
+            print('To replay in batch, weight vectors must match strategy_names')
+            return
+        # sizing uses the batch weights, not the replayer weights
+        strategy_weights = [1.0] * len(strategy_names)
     if (not strategy_names or 
         not strategy_weights or
         not len(strategy_names) == len(strategy_weights)):
@@ -70,6 +90,15 @@ def run():
     )
 
     add_past_orders(replayer, strategy_names, start_time, end_time, '') #, args.label)
+    if batch_weights is not None:
+        ranked = run_batch(start_time, end_time, replayer, float(args.capital), args.bundle, batch_weights)
+        prefix = '-'.join(['replay-batch'] + strategy_names)
+        ranked.to_csv(f'results/{utils.filename(prefix, start_time, end_time, args.label)}.csv')
+        return
+    if args.engine == 'fast':
+        perf = run_fast(start_time, end_time, replayer, float(args.capital), args.bundle)
+        utils.dump_pickle('replay', start_time, end_time, perf, None, args.label)
+        return
     perf = run_internal(start_time,
                  end_time,
                  replayer,
@@ -106,7 +135,7 @@ def add_past_orders(
         label: str) -> list[ReplayOrder]:
     for strategy_name in strategy_names:
         with replayer.timer_context.timer('read files'):
-            filename = utils.replay_filename(
+            filename = utils.find_replay_filename(
                 strategy_name, start_time, end_time, label)
         with replayer.timer_context.timer('load orders'):
             replayer.load_orders(filename)
@@ -133,6 +162,33 @@ def run_internal(start_time:pd.Timestamp,
     )
 
 
+@timing
+def run_fast(start_time:pd.Timestamp,
+             end_time:pd.Timestamp,
+             replayer:ReplayStrategy,
+             capital:float,
+             bundle:str):
+    perf = run_replay(replayer, bundle, start_time, end_time, capital)
+    utils.print_stats(None, perf)
+    replayer.timer_context.report()
+    return perf
+
+
+@timing
+def run_batch(start_time:pd.Timestamp,
+              end_time:pd.Timestamp,
+              replayer:ReplayStrategy,
+              capital:float,
+              bundle:str,
+              weights:np.ndarray) -> pd.DataFrame:
+    engine = ReplayEngine.from_bundle(replayer, bundles.load(bundle), start_time, end_time)
+    portfolio_values = engine.run_batch(capital, weights, start_time)
+    ranked = rank_weights(list(replayer.strategies), weights, portfolio_values)
+    print(ranked.to_string())
+    replayer.timer_context.report()
+    return ranked
+
+
 _PIPELINE_NAME = 'replay_pipeline'
 
 def make_pipeline():
@@ -7,11 +7,15 @@ import zipline
 import pickle
 
 from zipbird.notebook import performance_summary
-from zipbird.replay.replay_order import ReplayOrder
+from zipbird.replay.replay_order import load_replay_orders
 from zipbird.replay.order_collector import OrderCollector
 import zipbird.strategies.models as se_models
-from zipbird.strategy.strategy_zipline_funcs import initialize_zipline, before_trading_start_zipline
-from zipbird.utils import logger_util, utils
+from zipbird.strategy.daily_simulator import run_fast_simulation
+from zipbird.strategy.precompute_engine import precompute_pipeline
+from zipbird.strategy.strategy_zipline_funcs import (
+    initialize_zipline, before_trading_start_zipline,
+    initialize_precomputed, before_trading_start_precomputed)
+from zipbird.utils import logger_util, result_cache, utils
 from zipbird.utils.runner_util import supress_warnings, timing
 
 supress_warnings()
@@ -30,6 +34,11 @@ def run():
     parser.add_argument('-b', '--bundle', default='quandl')
     parser.add_argument('-f', '--frequency', default='d')
     parser.add_argument('-l', '--label', default='')
+    parser.add_argument('--engine', default='pipeline', choices=['pipeline', 'precompute', 'fast'])
+    parser.add_argument('--replay_csv', action='store_true',
+                        help='Also export the replay orders as csv')
+    parser.add_argument('--no_cache', action='store_true',
+                        help='Rerun even when the result cache has this configuration')
     
     args = parser.parse_args()
 
@@ -47,16 +56,30 @@ def run():
     print(f'bundle: {args.bundle}')
     print(f'start: {args.start}')
     print(f'end: {args.end}')
+    print(f'engine: {args.engine}')
     action = args.action
     if action == 'run':
         #round_trip_tracker = position_manager.RoundTripTracker()
-        perf = run_internal(
-            start_time=start_time,
-            end_time=end_time,
-            strategy=strategy,            
-            capital=args.capital,
-            debug_level=int(args.debug_level),
-            bundle=args.bundle)
+        cache = result_cache.ResultCache()
+        cache_key = result_cache.result_key(
+            strategy, args.bundle, result_cache.bundle_ingestion(args.bundle),
+            start_time, end_time, float(args.capital),
+            args.engine, result_cache.code_version(strategy), result_cache.zipline_version())
+        cached = None if args.no_cache else cache.load(cache_key)
+        if cached:
+            print(f'cached result: {cache_key}')
+            perf, strategy.replay_order_container = cached
+            utils.print_stats(None, perf)
+        else:
+            perf = run_internal(
+                start_time=start_time,
+                end_time=end_time,
+                strategy=strategy,            
+                capital=args.capital,
+                debug_level=int(args.debug_level),
+                bundle=args.bundle,
+                engine=args.engine)
+            cache.save(cache_key, perf, strategy.replay_order_container)
         
         utils.dump_pickle(
             args.strategy_name,
@@ -71,7 +94,8 @@ def run():
             start_time,
             end_time,
             strategy,
-            args.label
+            args.label,
+            export_csv=args.replay_csv,
         )
 
         performance_summary.output_performance(
@@ -87,13 +111,11 @@ def run():
         )
 
     elif action == 'perf':
-        replay_filename = utils.replay_filename(
+        replay_filename = utils.find_replay_filename(
             args.strategy_name, start_time, end_time, args.label)
         replay_orders = OrderCollector(args.strategy_name)
-        with open(replay_filename, 'r') as file:
-            for line in file:
-                order = ReplayOrder.from_csv(line)
-                replay_orders.add_round_trip(order)
+        for order in load_replay_orders(replay_filename):
+            replay_orders.add_round_trip(order)
 
         pickle_filename = utils.pickle_filename(
             prefix=args.strategy_name,
@@ -116,14 +138,27 @@ def run():
             )
 
 @timing
-def run_internal(start_time, end_time, strategy, capital, debug_level, bundle):
+def run_internal(start_time, end_time, strategy, capital, debug_level, bundle, engine='pipeline'):
     debug_logger = logger_util.DebugLogger(debug_level=debug_level)
     strategy.init(debug_logger)
+    if engine == 'fast':
+        perf = run_fast_simulation(strategy, bundle, start_time, end_time, capital)
+        utils.print_stats(None, perf)
+        return perf
+    if engine == 'precompute':
+        strategy.make_pipeline()
+        precomputed = precompute_pipeline(
+            bundle, strategy.pipeline_maker, start_time, end_time)
+        initialize = partial(initialize_precomputed, strategy, debug_logger)
+        before_trading_start = partial(before_trading_start_precomputed, strategy, precomputed)
+    else:
+        initialize = partial(initialize_zipline, strategy, debug_logger)
+        before_trading_start = partial(before_trading_start_zipline, strategy)
     return zipline.run_algorithm(
         start=start_time,
         end=end_time,
-        initialize=partial(initialize_zipline, strategy, debug_logger),
-        before_trading_start=partial(before_trading_start_zipline, strategy),
+        initialize=initialize,
+        before_trading_start=before_trading_start,
         analyze=utils.print_stats,
         capital_base=capital,
         data_frequency='daily',
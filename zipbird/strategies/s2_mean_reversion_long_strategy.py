@@ -1,10 +1,11 @@
 import pandas as pd
 
 from zipbird.strategy.pipeline_maker import PipelineMaker
-from zipbird.strategy.strategy_executor import BaseStrategy, Signal
+from zipbird.basic.signal import SignalBatch
+from zipbird.basic.types import LongShort, OpenClose
+from zipbird.strategy.strategy_executor import BaseStrategy
 from zipbird.strategy import pipeline_column_names as col_name
 
-from zipline.assets import Equity
 from zipline.protocol import Positions
 from zipline.pipeline.data import USEquityPricing
 
@@ -45,7 +46,7 @@ class S2MRLong(BaseStrategy):
     def generate_signals(self,
                          positions:Positions,
                          pipeline_data:pd.DataFrame,
-                         filtered_pipeline_data:pd.DataFrame) -> list[Signal]:
+                         filtered_pipeline_data:pd.DataFrame) -> SignalBatch:
         RSI = col_name.rsi_name(self.params['rsi_period'])
         buy_list = filtered_pipeline_data[RSI].sort_values(ascending=True).dropna()
         # filter out already exist positions
@@ -53,8 +54,9 @@ class S2MRLong(BaseStrategy):
                                      positions,
                                      self.params['max_positions'],
                                      self.params['open_position_factor'])
-        return [self._to_signal(stock, pipeline_data) for stock in buy_list]
-    
-    def _to_signal(self, stock:Equity, pipeline_data:pd.DataFrame) -> Signal:
-        open_price = pipeline_data['close'][stock] * (1 - self.params['open_order_percent'] )
-        return Signal.make_open_long(stock, limit_price=open_price)
\ No newline at end of file
+        return SignalBatch.from_assets(
+            pipeline_data.index,
+            buy_list,
+            OpenClose.Open,
+            LongShort.Long,
+            limit_price=pipeline_data['close'] * (1 - self.params['open_order_percent']))
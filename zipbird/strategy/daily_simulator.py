@@ -0,0 +1,410 @@
+"""Runs a StrategyExecutor over daily bars without zipline.run_algorithm.
+
+Our strategies only trade once a day: before the session they cancel the
+orders left from the last session and send new market, limit or stop
+orders, which fill during the session. DailySimulator implements the
+zipline api the position manager and strategies use (order,
+order_target_percent, cancel_order, get_open_orders, get_datetime, symbol
+and sid) and fills the orders against the unadjusted OHLC of the session:
+
+- market orders fill at the open.
+- a buy limit fills at the open if it is at or below the limit, at the
+  limit if the low reaches it. Sell limits are the other way around.
+- a sell stop fills at the open if it gapped below the stop, at the stop
+  if the low reaches it. Buy stops are the other way around.
+- there is no slippage or volume limit and orders fill completely, as
+  with DailyBarNoSplippage. Commission is per share, like zipline's default.
+- orders of an asset without a bar on the session stay open, until the
+  strategy cancels them before the next session.
+
+As in zipline, positions are closed at the last close on the auto close
+date of their asset, splits adjust positions and cash dividends are paid
+on their pay date. The perf frame has the columns performance_summary
+and utils.print_stats use.
+"""
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from zipline.data import bundles
+from zipline.finance import execution as zipline_execution
+from zipline.pipeline.domain import US_EQUITIES
+from zipline.utils.api_support import ZiplineAPI
+from zipline.utils.math_utils import round_if_near_integer
+
+from zipbird.basic.types import Portfolio, Position
+from zipbird.strategy.precompute_engine import PrecomputedPipeline, precompute_pipelines
+from zipbird.strategy.strategy_executor import StrategyExecutor
+
+DEFAULT_COMMISSION_PER_SHARE = 0.001
+
+
+class DailyBars:
+    """Unadjusted OHLC of every session as (sessions x assets) arrays"""
+    def __init__(self,
+                 sessions:pd.DatetimeIndex,
+                 assets:list,
+                 opens:np.ndarray,
+                 highs:np.ndarray,
+                 lows:np.ndarray,
+                 closes:np.ndarray):
+        self.sessions = sessions
+        self.assets = list(assets)
+        self.opens = opens
+        self.highs = highs
+        self.lows = lows
+        self.closes = closes
+        # the close of the last session the asset traded
+        self.last_closes = pd.DataFrame(closes).ffill().to_numpy()
+        self._columns = {asset.sid: col for col, asset in enumerate(self.assets)}
+
+    @classmethod
+    def from_bundle(cls, bundle_data, start_day:pd.Timestamp, end_day:pd.Timestamp):
+        """Bars from the session before start_day to end_day"""
+        all_sessions = US_EQUITIES.calendar.sessions
+        start = max(all_sessions.searchsorted(start_day) - 1, 0)
+        sessions = all_sessions[start:all_sessions.searchsorted(end_day, side='right')]
+        finder = bundle_data.asset_finder
+        lifetimes = finder.lifetimes(
+            sessions, include_start_date=True, country_codes=[US_EQUITIES.country_code])
+        sids = lifetimes.columns[lifetimes.values.any(axis=0)].values
+        opens, highs, lows, closes = bundle_data.equity_daily_bar_reader.load_raw_arrays(
+            ['open', 'high', 'low', 'close'], sessions[0], sessions[-1], sids)
+        return cls(sessions, finder.retrieve_all(sids), opens, highs, lows, closes)
+
+    def column(self, asset) -> int:
+        return self._columns[asset.sid]
+
+
+def load_corporate_actions(adjustment_reader,
+                           sessions:pd.DatetimeIndex) -> tuple[dict, dict]:
+    """Splits and cash dividends by session, as
+    ({ex_date: [(sid, ratio)]}, {ex_date: [(sid, amount, pay_date)]})"""
+    splits = {}
+    dividends = {}
+    if adjustment_reader is None:
+        return splits, dividends
+    for sid, effective_date, ratio in adjustment_reader.conn.execute(
+            'SELECT sid, effective_date, ratio FROM splits'):
+        day = pd.Timestamp(effective_date, unit='s')
+        if sessions[0] <= day <= sessions[-1]:
+            splits.setdefault(day, []).append((sid, ratio))
+    for sid, ex_date, pay_date, amount in adjustment_reader.conn.execute(
+            'SELECT sid, ex_date, pay_date, amount FROM dividend_payouts'):
+        day = pd.Timestamp(ex_date, unit='s')
+        if sessions[0] <= day <= sessions[-1]:
+            dividends.setdefault(day, []).append((sid, amount, pd.Timestamp(pay_date, unit='s')))
+    return splits, dividends
+
+
+def fill_price(amount:int,
+               limit_price:float|None,
+               stop_price:float|None,
+               open_price:float,
+               high:float,
+               low:float) -> float:
+    """Price an order fills at during a session, NaN if it does not fill"""
+    is_buy = amount > 0
+    price = open_price
+    if stop_price is not None:
+        if is_buy and high >= stop_price:
+            price = max(open_price, stop_price)
+        elif not is_buy and low <= stop_price:
+            price = min(open_price, stop_price)
+        else:
+            return np.nan
+    if limit_price is not None:
+        if is_buy and price > limit_price:
+            price = limit_price if low <= limit_price else np.nan
+        elif not is_buy and price < limit_price:
+            price = limit_price if high >= limit_price else np.nan
+    return price
+
+
+class SimulatedOrder:
+    """Open order, with the attributes of zipline's Order that we use"""
+    def __init__(self,
+                 asset,
+                 amount:int,
+                 created:pd.Timestamp,
+                 limit:float|None=None,
+                 stop:float|None=None):
+        self.id = uuid.uuid4().hex
+        self.asset = asset
+        self.sid = asset
+        self.amount = amount
+        self.created = created
+        self.limit = limit
+        self.stop = stop
+
+    def __repr__(self):
+        return (f'SimulatedOrder({self.id}, {self.asset}, {self.amount}, '
+                f'limit={self.limit}, stop={self.stop})')
+
+
+def _update_position(position:Position, amount:int, price:float):
+    """Same cost basis rules as zipline's Position.update"""
+    total_shares = position.amount + amount
+    if total_shares == 0:
+        position.cost_basis = 0.0
+    elif np.sign(position.amount) != np.sign(amount):
+        if abs(amount) > abs(position.amount):
+            # the position flipped from long to short or back
+            position.cost_basis = price
+    else:
+        position.cost_basis = (
+            position.cost_basis * position.amount + price * amount) / total_shares
+    position.amount = total_shares
+
+
+class DailySimulator:
+    """Runs a strategy executor on daily bars, with the pipeline data of
+    each session taken from a precomputed pipeline"""
+    def __init__(self,
+                 strategy_executor:StrategyExecutor,
+                 bars:DailyBars,
+                 pipeline:PrecomputedPipeline,
+                 capital:float,
+                 asset_finder=None,
+                 splits:dict|None=None,
+                 dividends:dict|None=None,
+                 commission_per_share:float=DEFAULT_COMMISSION_PER_SHARE):
+        self.strategy_executor = strategy_executor
+        self.fill_callback = strategy_executor.get_order_fill_callback()
+        self.bars = bars
+        self.pipeline = pipeline
+        self.capital = capital
+        self.asset_finder = asset_finder
+        self.splits = splits or {}
+        self.dividends = dividends or {}
+        self.commission_per_share = commission_per_share
+        self.cash = capital
+        self.positions = {}
+        self.open_orders = {}
+        self.today = None
+        self._row = None
+        # (pay date, cash) of dividends not paid yet
+        self._payable_dividends = []
+
+    # zipline api
+
+    def get_datetime(self) -> pd.Timestamp:
+        return self.today
+
+    def symbol(self, ticker:str):
+        return self.asset_finder.lookup_symbol(ticker, as_of_date=self.today)
+
+    def sid(self, sid:int):
+        return self.asset_finder.retrieve_asset(sid)
+
+    def order(self, asset, amount, style=None) -> str|None:
+        amount = int(round_if_near_integer(amount))
+        if amount == 0:
+            return None
+        is_buy = amount > 0
+        style = style or zipline_execution.MarketOrder()
+        order = SimulatedOrder(asset, amount, self.today,
+                               limit=style.get_limit_price(is_buy),
+                               stop=style.get_stop_price(is_buy))
+        self.open_orders.setdefault(asset, []).append(order)
+        return order.id
+
+    def order_target_percent(self, asset, target:float) -> str|None:
+        position = self.positions.get(asset)
+        if position:
+            price = position.last_sale_price
+            current_amount = position.amount
+        else:
+            price = self.bars.last_closes[self._row - 1, self.bars.column(asset)]
+            for sid, ratio in self.splits.get(self.today, ()):
+                if sid == asset.sid:
+                    price *= ratio
+            current_amount = 0
+        target_amount = target * self._portfolio_value() / price
+        return self.order(asset, target_amount - current_amount)
+
+    def get_open_orders(self, asset=None):
+        if asset is None:
+            return {asset: list(orders) for asset, orders in self.open_orders.items() if orders}
+        return list(self.open_orders.get(asset, []))
+
+    def cancel_order(self, order_param):
+        order_id = getattr(order_param, 'id', order_param)
+        for asset, orders in self.open_orders.items():
+            for order in orders:
+                if order.id == order_id:
+                    orders.remove(order)
+                    return
+
+    # simulation
+
+    def run(self, start_day:pd.Timestamp, end_day:pd.Timestamp) -> pd.DataFrame:
+        return run_simulators([self], start_day, end_day)[0]
+
+    def _run_session(self, row:int) -> dict:
+        self.today = self.bars.sessions[row]
+        self._row = row
+        starting_cash = self.cash
+        starting_value = self._portfolio_value()
+        transactions = []
+        self._close_expired_positions(transactions)
+        self._process_splits()
+        self._process_dividends()
+
+        portfolio = Portfolio(
+            today=self.today.date(),
+            portfolio_value=self._portfolio_value(),
+            portfolio_cash=self.cash,
+            positions=self.positions)
+        self.strategy_executor.run(
+            portfolio=portfolio,
+            pipeline_data=self.pipeline.for_trade_day(self.today))
+        self._fill_orders(row, transactions)
+
+        self._mark_to_market(row)
+        portfolio_value = self._portfolio_value()
+        long_value = sum(p.amount * p.last_sale_price for p in self.positions.values() if p.amount > 0)
+        short_value = sum(p.amount * p.last_sale_price for p in self.positions.values() if p.amount < 0)
+        return {
+            'starting_cash': starting_cash,
+            'ending_cash': self.cash,
+            'starting_value': starting_value,
+            'portfolio_value': portfolio_value,
+            'pnl': portfolio_value - starting_value,
+            'returns': portfolio_value / starting_value - 1,
+            'long_value': long_value,
+            'short_value': short_value,
+            'gross_leverage': (long_value - short_value) / portfolio_value,
+            'positions': [
+                {'sid': asset, 'amount': p.amount, 'cost_basis': p.cost_basis,
+                 'last_sale_price': p.last_sale_price}
+                for asset, p in self.positions.items()],
+            'transactions': transactions,
+        }
+
+    def _portfolio_value(self) -> float:
+        return self.cash + sum(position.amount * position.last_sale_price
+                               for position in self.positions.values())
+
+    def _mark_to_market(self, row:int):
+        """Values positions at the close of sessions[row]"""
+        for asset, position in self.positions.items():
+            close = self.bars.last_closes[row, self.bars.column(asset)]
+            if not np.isnan(close):
+                position.last_sale_price = close
+
+    def _transact(self, asset, amount:int, price:float, order_id:str|None, transactions:list):
+        commission = abs(amount) * self.commission_per_share
+        position = self.positions.get(asset)
+        if position is None:
+            position = self.positions[asset] = Position(asset, 0, last_sale_price=price)
+        _update_position(position, amount, price)
+        self.cash -= amount * price + commission
+        if position.amount == 0:
+            del self.positions[asset]
+        elif commission:
+            position.cost_basis += commission / position.amount
+        transactions.append({
+            'amount': amount, 'dt': self.today, 'price': price, 'sid': asset,
+            'order_id': order_id, 'commission': commission})
+
+    def _fill_orders(self, row:int, transactions:list):
+        bars = self.bars
+        for asset, orders in self.open_orders.items():
+            col = bars.column(asset)
+            for order in list(orders):
+                price = fill_price(order.amount, order.limit, order.stop,
+                                   bars.opens[row, col], bars.highs[row, col], bars.lows[row, col])
+                if np.isnan(price):
+                    continue
+                orders.remove(order)
+                self.fill_callback(asset, price, order.amount, order)
+                self._transact(asset, order.amount, price, order.id, transactions)
+        self.open_orders = {asset: orders for asset, orders in self.open_orders.items() if orders}
+
+    def _close_expired_positions(self, transactions:list):
+        def expired(asset):
+            return (asset.auto_close_date is not None and
+                    pd.Timestamp(asset.auto_close_date) <= self.today)
+
+        for asset in [asset for asset in self.open_orders if expired(asset)]:
+            del self.open_orders[asset]
+        for asset in [asset for asset in self.positions if expired(asset)]:
+            position = self.positions[asset]
+            self._transact(asset, -position.amount, position.last_sale_price, None, transactions)
+
+    def _process_splits(self):
+        for sid, ratio in self.splits.get(self.today, ()):
+            for asset, position in self.positions.items():
+                if asset.sid != sid:
+                    continue
+                # same rounding as zipline's Position.handle_split
+                shares = position.amount / ratio
+                full_shares = np.floor(shares)
+                position.cost_basis = round(position.cost_basis * ratio, 2)
+                position.last_sale_price *= ratio
+                position.amount = int(full_shares)
+                self.cash += round(float((shares - full_shares) * position.cost_basis), 2)
+
+    def _process_dividends(self):
+        for sid, amount, pay_date in self.dividends.get(self.today, ()):
+            for asset, position in self.positions.items():
+                if asset.sid == sid:
+                    self._payable_dividends.append((pay_date, position.amount * amount))
+        self.cash += sum(cash for pay_date, cash in self._payable_dividends if pay_date <= self.today)
+        self._payable_dividends = [
+            (pay_date, cash) for pay_date, cash in self._payable_dividends if pay_date > self.today]
+
+
+def run_simulators(simulators:list[DailySimulator],
+                   start_day:pd.Timestamp,
+                   end_day:pd.Timestamp) -> list[pd.DataFrame]:
+    """Advances the simulators, which share their bars, one session at a
+    time. Each has its own portfolio, returns the perf frame of each."""
+    sessions = simulators[0].bars.sessions
+    first_row = max(sessions.searchsorted(start_day), 1)
+    last_row = sessions.searchsorted(end_day, side='right')
+    perfs = [[] for _ in simulators]
+    for row in range(first_row, last_row):
+        for simulator, perf in zip(simulators, perfs):
+            with ZiplineAPI(simulator):
+                perf.append(simulator._run_session(row))
+    index = sessions[first_row:last_row].tz_localize('UTC')
+    index.name = 'period_close'
+    return [pd.DataFrame(perf, index=index) for perf in perfs]
+
+
+def run_fast_simulations(strategy_executors:list[StrategyExecutor],
+                         bundle:str,
+                         start_day:pd.Timestamp,
+                         end_day:pd.Timestamp,
+                         capital:float) -> list[pd.DataFrame]:
+    """Runs the strategies side by side, each with its own portfolio of
+    capital. Pipeline columns are precomputed together and the bars are
+    loaded once. Returns the perf frame of each strategy."""
+    bundle_data = bundles.load(bundle)
+    for strategy_executor in strategy_executors:
+        strategy_executor.make_pipeline()
+    pipelines = precompute_pipelines(
+        bundle_data,
+        [strategy_executor.pipeline_maker for strategy_executor in strategy_executors],
+        start_day,
+        end_day)
+    bars = DailyBars.from_bundle(bundle_data, start_day, end_day)
+    splits, dividends = load_corporate_actions(bundle_data.adjustment_reader, bars.sessions)
+    simulators = [
+        DailySimulator(strategy_executor, bars, pipeline, capital,
+                       asset_finder=bundle_data.asset_finder, splits=splits, dividends=dividends)
+        for strategy_executor, pipeline in zip(strategy_executors, pipelines)]
+    return run_simulators(simulators, start_day, end_day)
+
+
+def run_fast_simulation(strategy_executor:StrategyExecutor,
+                        bundle:str,
+                        start_day:pd.Timestamp,
+                        end_day:pd.Timestamp,
+                        capital:float) -> pd.DataFrame:
+    """Runs the strategy with precomputed pipeline columns and
+    DailySimulator, returns the perf frame"""
+    return run_fast_simulations([strategy_executor], bundle, start_day, end_day, capital)[0]
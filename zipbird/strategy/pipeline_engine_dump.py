@@ -0,0 +1,62 @@
+"""Dumps pipeline columns with zipline's pipeline engine only.
+
+The dump command runs a full zipline algorithm to get pipeline output, which
+also simulates trading every day. To add columns to an existing store, the
+pipeline is run directly on the bundle's OHLCV arrays instead, a chunk of
+sessions at a time, and each day of the output is recorded like the dump
+command does.
+"""
+import pandas as pd
+
+from zipline.data import bundles
+from zipline.pipeline import Pipeline, SimplePipelineEngine
+from zipline.pipeline.data import USEquityPricing
+from zipline.pipeline.domain import US_EQUITIES
+from zipline.pipeline.loaders import USEquityPricingLoader
+
+from zipbird.strategy.pipeline_saver import PipelineSaver
+from zipbird.utils.timer_context import TimerContext
+
+DEFAULT_CHUNK_SESSIONS = 250
+
+
+def make_bundle_engine(bundle:str) -> SimplePipelineEngine:
+    """Pipeline engine over the pricing data of the bundle, as in run_algorithm"""
+    bundle_data = bundles.load(bundle)
+    pricing_loader = USEquityPricingLoader.without_fx(
+        bundle_data.equity_daily_bar_reader,
+        bundle_data.adjustment_reader)
+
+    def get_loader(column):
+        if column in USEquityPricing.columns:
+            return pricing_loader
+        raise ValueError(f'No pipeline loader for {column}')
+
+    return SimplePipelineEngine(get_loader, bundle_data.asset_finder, default_domain=US_EQUITIES)
+
+
+def dump_with_engine(engine:SimplePipelineEngine,
+                     pipeline:Pipeline,
+                     pipeline_saver:PipelineSaver,
+                     start_day:pd.Timestamp,
+                     end_day:pd.Timestamp,
+                     timer_context:TimerContext,
+                     chunk_sessions:int=DEFAULT_CHUNK_SESSIONS) -> int:
+    """Records the pipeline output of every session from start_day to end_day.
+
+    Returns the number of values recorded.
+    """
+    sessions = US_EQUITIES.calendar.sessions_in_range(start_day, end_day)
+    recorded = 0
+    for chunk_start in range(0, len(sessions), chunk_sessions):
+        chunk = sessions[chunk_start:chunk_start + chunk_sessions]
+        with timer_context.timer('calc_pipeline'):
+            output = engine.run_pipeline(pipeline, chunk[0], chunk[-1])
+        with timer_context.timer('record_pipeline_data'):
+            for day, pipeline_data in output.groupby(level=0):
+                # same trade day as pipeline_output() in before_trading_start
+                recorded += pipeline_saver.record_pipeline_data(
+                    trade_day=pd.Timestamp(day.date()),
+                    pipeline_data=pipeline_data.droplevel(0))
+    timer_context.add_count('record_pipeline_data', recorded)
+    return recorded
@@ -10,6 +10,7 @@ from zipline_norgatedata.pipelines import NorgateDataUnadjustedClose
 from zipline_norgatedata.pipelines import NorgateDataIndexConstituent
 
 from zipbird.utils import factor_utils
+from zipbird.utils import incremental_factors
 from zipbird.strategy import pipeline_column_names as col_name
 
 EXTRA_LENGTH = 100
@@ -22,8 +23,14 @@ class PipelineMaker:
     
     This will be a singleton. All strategies push their desired indicators
     to this pipeline maker.
+
+    With incremental=True, indicators that have an incremental version
+    (see incremental_factors) carry their state across sessions instead of
+    recomputing the full window every day. Each add_* method can override
+    this with its own incremental argument.
     """
-    def __init__(self):
+    def __init__(self, incremental:bool=False):
+        self.incremental = incremental
         self.columns = {
             # all strategies need yesterday's close
             'close': USEquityPricing.close.latest,
@@ -40,16 +47,45 @@ class PipelineMaker:
             if c in self.columns:
                 self.columns.pop(c)
 
+    def max_window_length(self) -> int:
+        """Longest window of all columns and the universe, in sessions"""
+        terms = list(self.columns.values())
+        if self.universe is not None:
+            terms.append(self.universe)
+        seen = set()
+        max_length = 0
+        while terms:
+            term = terms.pop()
+            if id(term) in seen:
+                continue
+            seen.add(id(term))
+            max_length = max(max_length, getattr(term, 'window_length', 0) or 0)
+            terms.extend(getattr(term, 'inputs', ()))
+            mask = getattr(term, 'mask', None)
+            if mask is not None:
+                terms.append(mask)
+        return max_length
+
     def make_pipeline(self) -> Pipeline:
         # There is no screen, each strategy must use their own screen method
         return Pipeline(columns=self.columns)
     
+    def _use_incremental(self, incremental:bool|None) -> bool:
+        return self.incremental if incremental is None else incremental
+
     def _maybe_add_column(self, name:str, factor:Factor):
         if name not in self.columns:
             self.columns[name] = factor
         return self.columns[name]
     
-    def add_rsi(self, period):
+    def add_rsi(self, period, incremental:bool|None=None):
+        if self._use_incremental(incremental):
+            return self._maybe_add_column(
+                name=col_name.rsi_name(period),
+                factor=incremental_factors.IncrementalRSIFactor(
+                    rsi_len=period,
+                    window_length=period + EXTRA_LENGTH,
+                    mask=self.universe))
         return self._maybe_add_column(
             name=col_name.rsi_name(period),
             factor=factor_utils.RSIFactor(
@@ -57,7 +93,14 @@ class PipelineMaker:
                     window_length=period + EXTRA_LENGTH,
                     mask=self.universe))
     
-    def add_sma(self, period):
+    def add_sma(self, period, incremental:bool|None=None):
+        if self._use_incremental(incremental):
+            return self._maybe_add_column(
+                name=col_name.sma_name(period),
+                factor=incremental_factors.IncrementalSMAFactor(
+                    sma_len=period,
+                    window_length=period + 1,
+                    mask=self.universe))
         return self._maybe_add_column(
             name=col_name.sma_name(period),
             factor= basic_factors.SimpleMovingAverage(
@@ -65,7 +108,14 @@ class PipelineMaker:
                 window_length=period,
                 mask=self.universe))
     
-    def add_atr(self, period):
+    def add_atr(self, period, incremental:bool|None=None):
+        if self._use_incremental(incremental):
+            return self._maybe_add_column(
+                name=col_name.atr_name(period),
+                factor=incremental_factors.IncrementalATRFactor(
+                    atr_len=period,
+                    window_length=period + EXTRA_LENGTH,
+                    mask=self.universe))
         return self._maybe_add_column(
             name=col_name.atr_name(period),
             factor=factor_utils.ATRFactor(
@@ -73,7 +123,14 @@ class PipelineMaker:
                 window_length=period + EXTRA_LENGTH,
                 mask=self.universe))
     
-    def add_atrp(self, period):
+    def add_atrp(self, period, incremental:bool|None=None):
+        if self._use_incremental(incremental):
+            return self._maybe_add_column(
+                name=col_name.atrp_name(period),
+                factor=incremental_factors.IncrementalATRPFactor(
+                    atr_len=period,
+                    window_length=period + EXTRA_LENGTH,
+                    mask=self.universe))
         return self._maybe_add_column(
             name=col_name.atrp_name(period),
             factor=factor_utils.ATRPFactor(
@@ -81,7 +138,14 @@ class PipelineMaker:
                 window_length=period + EXTRA_LENGTH,
                 mask=self.universe))
     
-    def add_adx(self, period):
+    def add_adx(self, period, incremental:bool|None=None):
+        if self._use_incremental(incremental):
+            return self._maybe_add_column(
+                name=col_name.adx_name(period),
+                factor=incremental_factors.IncrementalADXFactor(
+                    adx_len=period,
+                    window_length=period + EXTRA_LENGTH,
+                    mask=self.universe))
         return self._maybe_add_column(
             name=col_name.adx_name(period),
             factor=factor_utils.ADXFactor(
@@ -89,14 +153,26 @@ class PipelineMaker:
                 window_length=period + EXTRA_LENGTH,
                 mask=self.universe))
     
-    def add_vol(self, period):
+    def add_vol(self, period, incremental:bool|None=None):
+        if self._use_incremental(incremental):
+            return self._maybe_add_column(
+                name=col_name.vol_name(period),
+                factor=incremental_factors.IncrementalStdPercentFactor(
+                    std_len=period,
+                    window_length=period + 1,
+                    mask=self.universe))
         return self._maybe_add_column(
             name=col_name.vol_name(period),
             factor=factor_utils.StdFactorPercent(
                 window_length=period,
                 mask=self.universe))
     
-    def add_max_in_window(self, period):
+    def add_max_in_window(self, period, incremental:bool|None=None):
+        if self._use_incremental(incremental):
+            return self._maybe_add_column(
+                name=col_name.max_in_window(period),
+                factor=incremental_factors.IncrementalMaxInWindowFactor(
+                    window_length=period, mask=self.universe))
         return self._maybe_add_column(
             name=col_name.max_in_window(period),
             factor=factor_utils.MaxInWindowFactor(
@@ -108,7 +184,14 @@ class PipelineMaker:
             factor=factor_utils.StdPercentileFactor(
                 window_length=period, mask=self.universe))
 
-    def add_roc(self, period):
+    def add_roc(self, period, incremental:bool|None=None):
+        if self._use_incremental(incremental):
+            return self._maybe_add_column(
+                name=col_name.roc_name(period),
+                factor=incremental_factors.IncrementalROCFactor(
+                    roc_len=period,
+                    window_length=period + 1,
+                    mask=self.universe))
         return self._maybe_add_column(
             name=col_name.roc_name(period),
             factor=factor_utils.ROCFactor(
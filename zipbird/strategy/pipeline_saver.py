@@ -4,14 +4,13 @@ import sqlite3
 from zipbird.strategy import pipleine_const as const
 from zipbird.strategy.strategy import BaseStrategy
 from zipbird.strategy.pipeline_maker import PipelineMaker
+from zipbird.strategy.pipeline_store import PipelineStore, SqlitePipelineStore
 from zipbird.utils import logger_util
 
 UNIVERSE_MAX_RANK = 2000
 UNIVERSE_MIN_PRICE = 1.0
 UNIVERSE_WINDOW_LENGTH = 200
 
-METADATA_TABLE = 'metadata'
-
 class MismatchDateRangeException(Exception):
     pass
 
@@ -19,11 +18,14 @@ class PipelineSaver:
 
     def __init__(self,
                  strategies:list[BaseStrategy],
-                 db_conn: sqlite3.Connection,
-                 start_fresh=False):
+                 db_conn: sqlite3.Connection = None,
+                 start_fresh=False,
+                 store: PipelineStore = None):
+        """Records pipeline data to store, or to a sqlite store on db_conn"""
         self.strategies = strategies
 
-        self._init_db(db_conn, start_fresh)
+        self.store = store or SqlitePipelineStore(db_conn)
+        self.store.prepare(start_fresh)
 
         # Init pipeline
         self.pipeline_maker = PipelineMaker()
@@ -33,15 +35,27 @@ class PipelineSaver:
             window_length=UNIVERSE_WINDOW_LENGTH)
         for strategy in self.strategies:
             strategy.prepare_pipeline_columns(self.pipeline_maker)
-
-    def init(self, debug_logger:logger_util.DebugLogger, start_day:pd.Timestamp, end_day:pd.Timestamp):
+        # metadata to write once all data is stored, set in append mode
+        self._final_metadata = None
+
+    def init(self,
+             debug_logger:logger_util.DebugLogger,
+             start_day:pd.Timestamp,
+             end_day:pd.Timestamp,
+             exclude_columns:list[str]=()):
+        """Prepares to record start_day to end_day.
+
+        Trade days before start_day, e.g. of a warm up, are not recorded.
+        Columns in exclude_columns are not calculated, same as existing ones.
+        """
         self.debug_logger = debug_logger
+        self.start_day = start_day
 
         # make sure existing data is compatiable with requested date range
         self._check_update_existing_data_compatability(start_day=start_day, end_day=end_day)
 
         # if there columns already exists, we don't need to calculate them again
-        existing_columns = self._get_existing_columns()
+        existing_columns = self._get_existing_columns() + list(exclude_columns)
         self.pipeline_maker.remove_columns(existing_columns)
         self.debug_logger.debug_print(
             1, 
@@ -52,26 +66,66 @@ class PipelineSaver:
         # create metadata for this run
         self._upsert_metadata(start_day, end_day)
 
-    def _init_db(self, db_conn:sqlite3.Connection, start_fresh:bool):
-        # Init DB
-        self.db_conn = db_conn
-        cursor = self.db_conn.cursor()
-        if start_fresh:
-            cursor.execute(f'DROP TABLE IF EXISTS {const.TABLE_NAME}')
-            cursor.execute(f'DROP TABLE IF EXISTS {METADATA_TABLE}')
-        # Create main indicator data table
-        columns = [f'{col_name} {col_type}'
-                for col_name, col_type in 
-                const.KEY_COLMNS + const.VALUE_COLUMNS]
-        cursor.execute(f'CREATE TABLE IF NOT EXISTS {const.TABLE_NAME} ({",".join(columns)})')
-
-        # create metadata table
-        cursor.execute(f"""
-            CREATE TABLE IF NOT EXISTS {METADATA_TABLE}
-            (name text, value text)""")
-        cursor.execute(f"""
-            CREATE UNIQUE INDEX IF NOT EXISTS idx_metadata 
-            ON {METADATA_TABLE} (name)""")
+    def init_append(self,
+                    debug_logger:logger_util.DebugLogger,
+                    end_day:pd.Timestamp) -> pd.Timestamp | None:
+        """Prepares to record the trade days after the stored end day up to end_day.
+
+        The stored columns are calculated, and must all be requested by the
+        strategies. Returns the first day to record, None if already stored.
+        The stored end day moves only in create_index(), after all data is
+        stored, so an interrupted append is redone by the next one.
+        """
+        self.debug_logger = debug_logger
+        db_end_day = self._get_metadata('end_day')
+        if not db_end_day:
+            raise MismatchDateRangeException('Nothing stored to append to')
+        stored_columns = self._get_existing_columns()
+        missing_columns = [c for c in stored_columns if c not in self.pipeline_maker.get_columns()]
+        if missing_columns:
+            raise MismatchDateRangeException(
+                f'Stored columns {",".join(missing_columns)} are not requested, can not append')
+        self.pipeline_maker.remove_columns(
+            [c for c in list(self.pipeline_maker.get_columns()) if c not in stored_columns])
+
+        self.start_day = pd.Timestamp(db_end_day) + pd.Timedelta(days=1)
+        if self.start_day > end_day:
+            self.debug_logger.debug_print(1, f'Already stored up to {db_end_day}')
+            return None
+        self.debug_logger.debug_print(
+            1,
+            f'To append data from {self.start_day} to {end_day}. '
+            f'Columns {",".join(self.pipeline_maker.get_columns())}.')
+        self._final_metadata = {'end_day': const.format_trade_day(end_day)}
+        return self.start_day
+
+    def init_new_columns(self,
+                         debug_logger:logger_util.DebugLogger) -> tuple[pd.Timestamp, pd.Timestamp] | None:
+        """Prepares to record only the requested columns not stored yet, over
+        the stored date range.
+
+        Returns the stored date range, None if there is no new column. The
+        new columns are added to the stored ones in create_index(), once all
+        their data is stored.
+        """
+        self.debug_logger = debug_logger
+        db_start_day = self._get_metadata('start_day')
+        db_end_day = self._get_metadata('end_day')
+        if not db_start_day or not db_end_day:
+            raise MismatchDateRangeException('Nothing stored to add columns to')
+        self.start_day = pd.Timestamp(db_start_day)
+
+        existing_columns = self._get_existing_columns()
+        self.pipeline_maker.remove_columns(existing_columns)
+        new_columns = list(self.pipeline_maker.get_columns())
+        if not new_columns:
+            self.debug_logger.debug_print(1, 'All requested columns are already stored')
+            return None
+        self.debug_logger.debug_print(
+            1,
+            f'To store columns {",".join(new_columns)} from {db_start_day} to {db_end_day}')
+        self._final_metadata = {'columns': ','.join(existing_columns + new_columns)}
+        return self.start_day, pd.Timestamp(db_end_day)
 
     def _check_update_existing_data_compatability(self, start_day:pd.Timestamp, end_day: pd.Timestamp):
         """Check if can update existing data without causing data inconsistency"""        
@@ -84,12 +138,7 @@ class PipelineSaver:
             raise MismatchDateRangeException(f'end day does not match, in db: {db_end_day}, requested: {end_day}')
 
     def _get_metadata(self, key) -> str | None:
-        cursor = self.db_conn.cursor()
-        results = cursor.execute(f'select name, value from {METADATA_TABLE}').fetchall()
-        for name, value in results:
-            if key == name:
-                return value
-        return None
+        return self.store.get_metadata(key)
     
     def _get_existing_columns(self) -> list[str]:
         columns = self._get_metadata('columns')
@@ -103,64 +152,29 @@ class PipelineSaver:
         #   start_day: start day of the backtest
         #   end_day: end day of the backtest
         #   columns: comma separated indicator columns
-        cursor = self.db_conn.cursor()
-        
         to_update = {
             'start_day': const.format_trade_day(start_day),
             'end_day': const.format_trade_day(end_day),
             'columns': ','.join(self.pipeline_maker.get_columns())
         }
-        for key, value in to_update.items():
-            sql = f"""
-            INSERT OR REPLACE INTO {METADATA_TABLE}
-            (name, value)
-            VALUES
-            (?, ?)
-            """
-            cursor.execute(sql, (key, value))
+        self.store.upsert_metadata(to_update)
 
     def make_pipeline(self):        
         return self.pipeline_maker.make_pipeline()
 
-    def record_pipeline_data(self, trade_day:pd.Timestamp, pipeline_data:pd.DataFrame):
+    def record_pipeline_data(self, trade_day:pd.Timestamp, pipeline_data:pd.DataFrame) -> int:
+        """Records the pipeline output of the trade day, returns number of values stored"""
+        if trade_day < self.start_day:
+            return 0
         self.debug_logger.debug_print(2, f'trade day {trade_day}, {len(pipeline_data)}')
         # trade day is the day to place trade, by the nature of zipline pipeline
         # the pipeline data provided for the trade day is calcuated from yesterday's 
         # price
-        trade_day_str = const.format_trade_day(trade_day)
-        data_to_insert = []
-        for idx, row in pipeline_data.iterrows():
-            ticker = idx.symbol
-            sid = idx.sid
-            for col in pipeline_data.columns:
-                if pd.notna(row[col]):
-                    data_to_insert.append(( 
-                        trade_day_str,
-                        ticker,
-                        sid,
-                        col,
-                        row[col],
-                    ))
-        insert_sql = f"""
-        INSERT OR REPLACE INTO {const.TABLE_NAME} (
-          {const.TRADE_DAY},
-          {const.TICKER},
-          {const.SID},
-          {const.IND_NAME},
-          {const.IND_VALUE}
-        )
-        VALUES (?, ?, ?, ?, ?)
-        """
-        cursor = self.db_conn.cursor()
-        cursor.executemany(insert_sql, data_to_insert)
-        self.db_conn.commit()
+        return self.store.record(trade_day, pipeline_data)
 
     def create_index(self):
-        cursor = self.db_conn.cursor()
-        # Create index
-        sql = f"""
-        CREATE UNIQUE INDEX IF NOT EXISTS idx_1 ON 
-        {const.TABLE_NAME} ({",".join(col for col, _ in const.KEY_COLMNS)})
-        """
-        cursor.execute(sql)
-        self.db_conn.commit()
+        """Finishes writing, e.g. creates the sqlite index"""
+        self.store.finish()
+        if self._final_metadata:
+            self.store.upsert_metadata(self._final_metadata)
+            self._final_metadata = None
@@ -0,0 +1,98 @@
+"""Splits a pipeline dump into shards that can run in parallel.
+
+A shard is a range of trade days, at most one calendar year, dumped into its
+own store by its own zipline run and then merged into the main store. Each
+run starts some sessions before its shard (warm up) so that the indicators
+see the same history as a single run over the whole range would, and
+records only the days of its shard, so merged shards have no duplicate or
+missing days.
+
+Unlike a single PipelineSaver run, the range of a sharded dump can differ
+from the stored one: the dump covers the union of both ranges. Days in the
+stored range only compute the columns not stored yet, other days compute
+every requested column.
+"""
+import pandas as pd
+
+from zipbird.strategy import pipleine_const as const
+from zipbird.strategy.pipeline_store import PipelineStore
+
+
+class DumpShard:
+    """Trade days from start_day to end_day, without the exclude_columns"""
+    def __init__(self,
+                 start_day:pd.Timestamp,
+                 end_day:pd.Timestamp,
+                 exclude_columns:list[str]=()):
+        self.start_day = start_day
+        self.end_day = end_day
+        self.exclude_columns = list(exclude_columns)
+
+    @property
+    def name(self) -> str:
+        return f'{self.start_day:%Y%m%d}-{self.end_day:%Y%m%d}'
+
+    def __repr__(self):
+        return f'DumpShard({self.name}, exclude={self.exclude_columns})'
+
+
+def split_by_year(start_day:pd.Timestamp,
+                  end_day:pd.Timestamp,
+                  split_days:list[pd.Timestamp]=()) -> list[tuple[pd.Timestamp, pd.Timestamp]]:
+    """Splits start_day to end_day into calendar years, also starting a new
+    range at every day of split_days"""
+    boundaries = {pd.Timestamp(year=year, month=1, day=1)
+                  for year in range(start_day.year + 1, end_day.year + 1)}
+    boundaries.update(day for day in split_days if start_day < day <= end_day)
+    ranges = []
+    range_start = start_day
+    for boundary in sorted(boundaries):
+        ranges.append((range_start, boundary - pd.Timedelta(days=1)))
+        range_start = boundary
+    ranges.append((range_start, end_day))
+    return ranges
+
+
+def plan_shards(store:PipelineStore,
+                columns:list[str],
+                start_day:pd.Timestamp,
+                end_day:pd.Timestamp) -> tuple[list[DumpShard], dict[str, str]]:
+    """Returns the shards to dump the columns from start_day to end_day into
+    the store, and the store metadata once they are merged"""
+    stored_start = store.get_metadata('start_day')
+    stored_end = store.get_metadata('end_day')
+    stored_columns = store.get_metadata('columns')
+    stored_columns = stored_columns.split(',') if stored_columns else []
+    if not stored_start or not stored_end:
+        shards = [DumpShard(shard_start, shard_end)
+                  for shard_start, shard_end in split_by_year(start_day, end_day)]
+        return shards, {
+            'start_day': const.format_trade_day(start_day),
+            'end_day': const.format_trade_day(end_day),
+            'columns': ','.join(columns),
+        }
+
+    stored_start = pd.Timestamp(stored_start)
+    stored_end = pd.Timestamp(stored_end)
+    dump_start = min(start_day, stored_start)
+    dump_end = max(end_day, stored_end)
+    new_columns = [column for column in columns if column not in stored_columns]
+    shards = []
+    for shard_start, shard_end in split_by_year(
+            dump_start, dump_end, [stored_start, stored_end + pd.Timedelta(days=1)]):
+        if stored_start <= shard_start and shard_end <= stored_end:
+            if new_columns:
+                shards.append(DumpShard(shard_start, shard_end, stored_columns))
+        else:
+            shards.append(DumpShard(shard_start, shard_end))
+
+    if dump_start < stored_start or dump_end > stored_end:
+        # stored columns not requested again are missing on the new days
+        covered_columns = list(columns)
+    else:
+        covered_columns = stored_columns + new_columns
+    return shards, {
+        'start_day': const.format_trade_day(dump_start),
+        'end_day': const.format_trade_day(dump_end),
+        'columns': ','.join(covered_columns),
+    }
@@ -0,0 +1,707 @@
+"""Storage backends for pipeline data.
+
+PipelineSaver records the pipeline output of each trade day into a store and
+PipelineLoader reads it back one trade day at a time, indexed by sid.
+
+SqlitePipelineStore keeps one tall table with a row per trade day, ticker and
+indicator, which has to be pivoted when loaded. CompactSqlitePipelineStore
+keeps the same rows with integer keys in a clustered WITHOUT ROWID table.
+
+NpyPipelineStore keeps every indicator as a dense trade day x sid float32
+matrix in a .npy file, so a trade day is a row slice of each indicator.
+Matrices are split in segments of one calendar year:
+
+    <path>/metadata.json
+    <path>/<year>/days.npy      trade days, datetime64[D]
+    <path>/<year>/sids.npy      sorted sids, int64
+    <path>/<year>/tickers.npy   ticker of each sid
+    <path>/<year>/<indicator>.npy
+
+With mmap, the matrices are memory mapped instead of read, and a trade day
+is returned as views into the mapped files. Only the pages of the trade days
+read are resident, and they live in the OS page cache, shared by every
+process reading the same store.
+"""
+from abc import ABC, abstractmethod
+import itertools
+import json
+import os
+import shutil
+import sqlite3
+from urllib.parse import quote, unquote
+
+import numpy as np
+import pandas as pd
+
+from zipbird.strategy import pipleine_const as const
+
+METADATA_TABLE = 'metadata'
+# trade days recorded per sqlite transaction
+DEFAULT_COMMIT_DAYS = 50
+
+
+class PipelineChunk(ABC):
+    """Pipeline data of the trade days from start_day to end_day"""
+    def __init__(self, start_day:pd.Timestamp, end_day:pd.Timestamp):
+        self.start_day = start_day
+        self.end_day = end_day
+
+    def covers(self, trade_day:pd.Timestamp) -> bool:
+        return self.start_day <= trade_day <= self.end_day
+
+    @abstractmethod
+    def for_trade_day(self, trade_day:pd.Timestamp) -> pd.DataFrame:
+        """Returns indicators of the trade day, one row per sid"""
+
+
+class PipelineStore(ABC):
+    """Base class of pipeline data stores"""
+
+    @abstractmethod
+    def prepare(self, start_fresh:bool):
+        """Creates the storage for writing, erasing existing data if start_fresh"""
+
+    @abstractmethod
+    def get_metadata(self, key:str) -> str | None:
+        """Returns the metadata value of the key, None if not set"""
+
+    @abstractmethod
+    def upsert_metadata(self, values:dict[str, str]):
+        """Updates all values at once, readers see all or none of them"""
+
+    @abstractmethod
+    def record(self, trade_day:pd.Timestamp, pipeline_data:pd.DataFrame) -> int:
+        """Stores the pipeline output of one trade day.
+
+        Returns the number of (non NaN) values stored.
+        """
+
+    def finish(self):
+        """Called after all trade days are recorded"""
+
+    @abstractmethod
+    def merge_from(self, other:'PipelineStore'):
+        """Copies all pipeline data of another store of the same kind into this
+        one, replacing stored values of the same day, sid and indicator"""
+
+    @abstractmethod
+    def load_chunk(self,
+                   start_day:pd.Timestamp,
+                   end_day:pd.Timestamp,
+                   columns:list[str]) -> PipelineChunk:
+        """Loads the columns for trade days starting from start_day.
+
+        The returned chunk covers start_day, and as many days up to end_day
+        as the store finds convenient.
+        """
+
+
+class SqlitePipelineChunk(PipelineChunk):
+    def __init__(self, start_day:pd.Timestamp, end_day:pd.Timestamp, df_wide:pd.DataFrame):
+        super().__init__(start_day, end_day)
+        self.df_wide = df_wide
+
+    def for_trade_day(self, trade_day:pd.Timestamp) -> pd.DataFrame:
+        return self.df_wide.loc[const.format_trade_day(trade_day)]
+
+
+class SqlitePipelineStore(PipelineStore):
+    """Stores pipeline data in one SQLite table of (day, ticker, indicator) rows
+
+    Trade days are committed in batches of commit_days, and on finish().
+    """
+    def __init__(self, db_conn:sqlite3.Connection, commit_days:int=DEFAULT_COMMIT_DAYS):
+        self.db_conn = db_conn
+        self.commit_days = commit_days
+        self._uncommitted_days = 0
+
+    def prepare(self, start_fresh:bool):
+        cursor = self.db_conn.cursor()
+        if start_fresh:
+            cursor.execute(f'DROP TABLE IF EXISTS {const.TABLE_NAME}')
+            cursor.execute(f'DROP TABLE IF EXISTS {METADATA_TABLE}')
+        # Create main indicator data table
+        columns = [f'{col_name} {col_type}'
+                for col_name, col_type in
+                const.KEY_COLMNS + const.VALUE_COLUMNS]
+        cursor.execute(f'CREATE TABLE IF NOT EXISTS {const.TABLE_NAME} ({",".join(columns)})')
+
+        # create metadata table
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {METADATA_TABLE}
+            (name text, value text)""")
+        cursor.execute(f"""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_metadata
+            ON {METADATA_TABLE} (name)""")
+
+    def get_metadata(self, key:str) -> str | None:
+        cursor = self.db_conn.cursor()
+        results = cursor.execute(f'select name, value from {METADATA_TABLE}').fetchall()
+        for name, value in results:
+            if key == name:
+                return value
+        return None
+
+    def upsert_metadata(self, values:dict[str, str]):
+        cursor = self.db_conn.cursor()
+        for key, value in values.items():
+            sql = f"""
+            INSERT OR REPLACE INTO {METADATA_TABLE}
+            (name, value)
+            VALUES
+            (?, ?)
+            """
+            cursor.execute(sql, (key, value))
+        # all keys in one transaction
+        self.db_conn.commit()
+
+    def record(self, trade_day:pd.Timestamp, pipeline_data:pd.DataFrame) -> int:
+        # melt the frame to (asset, indicator) positions of the non NaN values
+        values = pipeline_data.to_numpy(dtype=np.float64)
+        asset_rows, columns = np.nonzero(~np.isnan(values))
+        tickers = np.array([asset.symbol for asset in pipeline_data.index], dtype=object)
+        sids = np.array([asset.sid for asset in pipeline_data.index], dtype=np.int64)
+        data_to_insert = zip(
+            itertools.repeat(const.format_trade_day(trade_day)),
+            tickers[asset_rows].tolist(),
+            sids[asset_rows].tolist(),
+            np.asarray(pipeline_data.columns, dtype=object)[columns].tolist(),
+            values[asset_rows, columns].tolist(),
+        )
+        insert_sql = f"""
+        INSERT OR REPLACE INTO {const.TABLE_NAME} (
+          {const.TRADE_DAY},
+          {const.TICKER},
+          {const.SID},
+          {const.IND_NAME},
+          {const.IND_VALUE}
+        )
+        VALUES (?, ?, ?, ?, ?)
+        """
+        cursor = self.db_conn.cursor()
+        cursor.executemany(insert_sql, data_to_insert)
+        self._uncommitted_days += 1
+        if self._uncommitted_days >= self.commit_days:
+            self.db_conn.commit()
+            self._uncommitted_days = 0
+        return len(asset_rows)
+
+    def finish(self):
+        cursor = self.db_conn.cursor()
+        # Create index
+        sql = f"""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_1 ON
+        {const.TABLE_NAME} ({",".join(col for col, _ in const.KEY_COLMNS)})
+        """
+        cursor.execute(sql)
+        self.db_conn.commit()
+        self._uncommitted_days = 0
+
+    def _attach(self, other:'SqlitePipelineStore'):
+        other.db_conn.commit()
+        _, _, path = other.db_conn.execute('PRAGMA database_list').fetchone()
+        self.db_conn.commit()
+        self.db_conn.execute('ATTACH DATABASE ? AS other', (path,))
+
+    def _detach(self):
+        self.db_conn.commit()
+        self.db_conn.execute('DETACH DATABASE other')
+
+    def merge_from(self, other:'SqlitePipelineStore'):
+        self._attach(other)
+        try:
+            columns = ','.join(col for col, _ in const.KEY_COLMNS + const.VALUE_COLUMNS)
+            self.db_conn.execute(f"""
+                INSERT OR REPLACE INTO {const.TABLE_NAME} ({columns})
+                SELECT {columns} FROM other.{const.TABLE_NAME}""")
+        finally:
+            self._detach()
+
+    def load_chunk(self,
+                   start_day:pd.Timestamp,
+                   end_day:pd.Timestamp,
+                   columns:list[str]) -> PipelineChunk:
+        indicator_placeholder = ','.join(['?'] * len(columns))
+        query = f"""
+           SELECT
+             {const.TRADE_DAY},
+             {const.TICKER},
+             {const.SID},
+             {const.IND_NAME},
+             {const.IND_VALUE}
+           FROM
+             {const.TABLE_NAME}
+           WHERE
+             {const.TRADE_DAY} >= ?
+             AND {const.TRADE_DAY} <= ?
+             AND {const.IND_NAME} in ({indicator_placeholder})
+        """
+        df = pd.read_sql_query(
+            query,
+            self.db_conn,
+            params=[
+                const.format_trade_day(start_day),
+                const.format_trade_day(end_day)] + columns)
+        df_wide = df.pivot(
+            index=[const.TRADE_DAY, const.SID],
+            columns=const.IND_NAME,
+            values=const.IND_VALUE)
+        return SqlitePipelineChunk(start_day, end_day, df_wide)
+
+
+
+# Applied to the writing connection of CompactSqlitePipelineStore. page_size
+# only takes effect on a new database, before WAL is turned on.
+COMPACT_PRAGMAS = (
+    'PRAGMA page_size = 16384',
+    'PRAGMA journal_mode = WAL',
+    'PRAGMA synchronous = NORMAL',
+)
+
+
+class CompactSqlitePipelineChunk(PipelineChunk):
+    def __init__(self, start_day:pd.Timestamp, end_day:pd.Timestamp, df_wide:pd.DataFrame):
+        super().__init__(start_day, end_day)
+        self.df_wide = df_wide
+
+    def for_trade_day(self, trade_day:pd.Timestamp) -> pd.DataFrame:
+        return self.df_wide.loc[const.trade_day_number(trade_day)]
+
+
+class CompactSqlitePipelineStore(SqlitePipelineStore):
+    """Stores pipeline data in a compact SQLite schema.
+
+    Indicator names and tickers are interned into dimension tables, trade
+    days are stored as day numbers, and values live in a WITHOUT ROWID table
+    whose primary key (trade_day, ind_id, sid) keeps the rows of a day range
+    together on disk, so no separate index is needed.
+    """
+    def __init__(self, db_conn:sqlite3.Connection, commit_days:int=DEFAULT_COMMIT_DAYS):
+        super().__init__(db_conn, commit_days)
+        self._ind_ids = None
+        self._known_tickers = {}
+
+    def prepare(self, start_fresh:bool):
+        cursor = self.db_conn.cursor()
+        for pragma in COMPACT_PRAGMAS:
+            cursor.execute(pragma)
+        if start_fresh:
+            for table in (const.COMPACT_TABLE_NAME, const.INDICATOR_TABLE_NAME,
+                          const.TICKER_TABLE_NAME, METADATA_TABLE):
+                cursor.execute(f'DROP TABLE IF EXISTS {table}')
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {const.INDICATOR_TABLE_NAME} (
+              {const.IND_ID} INTEGER PRIMARY KEY,
+              {const.IND_NAME} TEXT NOT NULL UNIQUE)""")
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {const.TICKER_TABLE_NAME} (
+              {const.SID} INTEGER PRIMARY KEY,
+              {const.TICKER} TEXT NOT NULL)""")
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {const.COMPACT_TABLE_NAME} (
+              {const.TRADE_DAY} INTEGER NOT NULL,
+              {const.IND_ID} INTEGER NOT NULL,
+              {const.SID} INTEGER NOT NULL,
+              {const.IND_VALUE} REAL NOT NULL,
+              PRIMARY KEY ({const.TRADE_DAY}, {const.IND_ID}, {const.SID})
+            ) WITHOUT ROWID""")
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {METADATA_TABLE}
+            (name text, value text)""")
+        cursor.execute(f"""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_metadata
+            ON {METADATA_TABLE} (name)""")
+        self.db_conn.commit()
+
+    def _indicator_ids(self) -> dict[str, int]:
+        if self._ind_ids is None:
+            cursor = self.db_conn.cursor()
+            self._ind_ids = dict(cursor.execute(
+                f'SELECT {const.IND_NAME}, {const.IND_ID} FROM {const.INDICATOR_TABLE_NAME}'))
+        return self._ind_ids
+
+    def _intern_indicators(self, names:list[str]) -> np.ndarray:
+        ind_ids = self._indicator_ids()
+        cursor = self.db_conn.cursor()
+        for name in names:
+            if name not in ind_ids:
+                cursor.execute(
+                    f'INSERT INTO {const.INDICATOR_TABLE_NAME} ({const.IND_NAME}) VALUES (?)',
+                    (name,))
+                ind_ids[name] = cursor.lastrowid
+        return np.array([ind_ids[name] for name in names], dtype=np.int64)
+
+    def _intern_tickers(self, sids:np.ndarray, tickers:np.ndarray):
+        new_tickers = [(sid, ticker) for sid, ticker in zip(sids.tolist(), tickers.tolist())
+                       if self._known_tickers.get(sid) != ticker]
+        if new_tickers:
+            # a sid can change its ticker, the latest one wins
+            self.db_conn.cursor().executemany(
+                f'INSERT OR REPLACE INTO {const.TICKER_TABLE_NAME} '
+                f'({const.SID}, {const.TICKER}) VALUES (?, ?)',
+                new_tickers)
+            self._known_tickers.update(new_tickers)
+
+    def record(self, trade_day:pd.Timestamp, pipeline_data:pd.DataFrame) -> int:
+        values = pipeline_data.to_numpy(dtype=np.float64)
+        asset_rows, columns = np.nonzero(~np.isnan(values))
+        sids = np.array([asset.sid for asset in pipeline_data.index], dtype=np.int64)
+        self._intern_tickers(
+            sids, np.array([asset.symbol for asset in pipeline_data.index], dtype=object))
+        ind_ids = self._intern_indicators(list(pipeline_data.columns))
+        data_to_insert = zip(
+            itertools.repeat(const.trade_day_number(trade_day)),
+            ind_ids[columns].tolist(),
+            sids[asset_rows].tolist(),
+            values[asset_rows, columns].tolist(),
+        )
+        cursor = self.db_conn.cursor()
+        cursor.executemany(f"""
+            INSERT OR REPLACE INTO {const.COMPACT_TABLE_NAME}
+            ({const.TRADE_DAY}, {const.IND_ID}, {const.SID}, {const.IND_VALUE})
+            VALUES (?, ?, ?, ?)""", data_to_insert)
+        self._uncommitted_days += 1
+        if self._uncommitted_days >= self.commit_days:
+            self.db_conn.commit()
+            self._uncommitted_days = 0
+        return len(asset_rows)
+
+    def record_rows(self, rows:list[tuple]) -> int:
+        """Stores (trade_day, ticker, sid, ind_name, ind_value) rows of the tall table"""
+        if not rows:
+            return 0
+        trade_days, tickers, sids, names, values = zip(*rows)
+        # days since epoch, same as const.trade_day_number
+        day_numbers = np.array(trade_days, dtype='datetime64[D]').astype(np.int64)
+        unique_names, name_positions = np.unique(np.array(names, dtype=object), return_inverse=True)
+        ind_ids = self._intern_indicators(unique_names.tolist())
+        sids = np.array(sids, dtype=np.int64)
+        self._intern_tickers(sids, np.array(tickers, dtype=object))
+        self.db_conn.cursor().executemany(f"""
+            INSERT OR REPLACE INTO {const.COMPACT_TABLE_NAME}
+            ({const.TRADE_DAY}, {const.IND_ID}, {const.SID}, {const.IND_VALUE})
+            VALUES (?, ?, ?, ?)""", zip(
+                day_numbers.tolist(),
+                ind_ids[name_positions].tolist(),
+                sids.tolist(),
+                values))
+        return len(rows)
+
+    def merge_from(self, other:'CompactSqlitePipelineStore'):
+        self._attach(other)
+        try:
+            # indicator ids differ between the dbs, match them by name
+            self.db_conn.execute(f"""
+                INSERT OR IGNORE INTO {const.INDICATOR_TABLE_NAME} ({const.IND_NAME})
+                SELECT {const.IND_NAME} FROM other.{const.INDICATOR_TABLE_NAME}""")
+            self.db_conn.execute(f"""
+                INSERT OR REPLACE INTO {const.TICKER_TABLE_NAME} ({const.SID}, {const.TICKER})
+                SELECT {const.SID}, {const.TICKER} FROM other.{const.TICKER_TABLE_NAME}""")
+            self.db_conn.execute(f"""
+                INSERT OR REPLACE INTO {const.COMPACT_TABLE_NAME}
+                ({const.TRADE_DAY}, {const.IND_ID}, {const.SID}, {const.IND_VALUE})
+                SELECT v.{const.TRADE_DAY}, i.{const.IND_ID}, v.{const.SID}, v.{const.IND_VALUE}
+                FROM other.{const.COMPACT_TABLE_NAME} v
+                JOIN other.{const.INDICATOR_TABLE_NAME} oi ON v.{const.IND_ID} = oi.{const.IND_ID}
+                JOIN {const.INDICATOR_TABLE_NAME} i ON i.{const.IND_NAME} = oi.{const.IND_NAME}""")
+        finally:
+            self._detach()
+        self._ind_ids = None
+        self._known_tickers = {}
+
+    def finish(self):
+        self.db_conn.execute('PRAGMA optimize')
+        self.db_conn.commit()
+        self._uncommitted_days = 0
+
+    def load_chunk(self,
+                   start_day:pd.Timestamp,
+                   end_day:pd.Timestamp,
+                   columns:list[str]) -> PipelineChunk:
+        ind_ids = self._indicator_ids()
+        names = {ind_ids[column]: column for column in columns if column in ind_ids}
+        indicator_placeholder = ','.join(['?'] * len(names))
+        query = f"""
+           SELECT
+             {const.TRADE_DAY},
+             {const.SID},
+             {const.IND_ID},
+             {const.IND_VALUE}
+           FROM
+             {const.COMPACT_TABLE_NAME}
+           WHERE
+             {const.TRADE_DAY} >= ?
+             AND {const.TRADE_DAY} <= ?
+             AND {const.IND_ID} in ({indicator_placeholder})
+        """
+        df = pd.read_sql_query(
+            query,
+            self.db_conn,
+            params=[
+                const.trade_day_number(start_day),
+                const.trade_day_number(end_day)] + list(names))
+        df_wide = df.pivot(
+            index=[const.TRADE_DAY, const.SID],
+            columns=const.IND_ID,
+            values=const.IND_VALUE).rename(columns=names)
+        df_wide.columns.name = const.IND_NAME
+        return CompactSqlitePipelineChunk(start_day, end_day, df_wide)
+
+
+DAYS_FILE = 'days.npy'
+SIDS_FILE = 'sids.npy'
+TICKERS_FILE = 'tickers.npy'
+METADATA_FILE = 'metadata.json'
+
+
+def _column_file(column:str) -> str:
+    # column names like 'vol%tile_20' or 'i_S&P 500' are not all file name safe
+    return quote(column, safe='') + '.npy'
+
+
+def _save(path:str, array:np.ndarray):
+    """Writes the array to a temp file first so readers never see half a file"""
+    tmp_path = path + '.tmp.npy'
+    np.save(tmp_path, array)
+    os.replace(tmp_path, path)
+
+
+def _save_segment(segment_path:str,
+                  days:np.ndarray, sids:np.ndarray, tickers:np.ndarray,
+                  columns):
+    """Writes a segment from (column, values) pairs"""
+    os.makedirs(segment_path, exist_ok=True)
+    for column, values in columns:
+        _save(os.path.join(segment_path, _column_file(column)), values)
+    _save(os.path.join(segment_path, TICKERS_FILE), tickers)
+    _save(os.path.join(segment_path, SIDS_FILE), sids)
+    # days last, a segment without days file is not read
+    _save(os.path.join(segment_path, DAYS_FILE), days)
+
+
+def _reindex(values:np.ndarray,
+             days:np.ndarray, sids:np.ndarray,
+             new_days:np.ndarray, new_sids:np.ndarray) -> np.ndarray:
+    """Moves a day x sid matrix onto larger sorted axes, NaN where missing"""
+    if np.array_equal(days, new_days) and np.array_equal(sids, new_sids):
+        return values
+    result = np.full((len(new_days), len(new_sids)), np.nan, dtype=np.float32)
+    result[np.ix_(np.searchsorted(new_days, days), np.searchsorted(new_sids, sids))] = values
+    return result
+
+
+class NpyPipelineChunk(PipelineChunk):
+    def __init__(self,
+                 start_day:pd.Timestamp,
+                 days:np.ndarray,
+                 sids:np.ndarray,
+                 values:dict[str, np.ndarray],
+                 drop_missing:bool=True):
+        super().__init__(start_day, pd.Timestamp(days[-1]))
+        self.days = days
+        self.sids = pd.Index(sids, name=const.SID)
+        self.values = values
+        self.drop_missing = drop_missing
+
+    def for_trade_day(self, trade_day:pd.Timestamp) -> pd.DataFrame:
+        day = np.datetime64(trade_day.date(), 'D')
+        row = np.searchsorted(self.days, day)
+        if row == len(self.days) or self.days[row] != day:
+            raise KeyError(const.format_trade_day(trade_day))
+        data = {column: values[row] for column, values in self.values.items()}
+        if not self.drop_missing:
+            # columns are read only views, sids without data that day are all NaN
+            return pd.DataFrame(data, index=self.sids, copy=False)
+        # like the sqlite store, only sids that have some value that day
+        present = np.zeros(len(self.sids), dtype=bool)
+        for values in data.values():
+            present |= ~np.isnan(values)
+        return pd.DataFrame(data, index=self.sids)[present]
+
+
+class NpyPipelineStore(PipelineStore):
+    """Stores each indicator as trade day x sid float32 matrices in .npy files"""
+    def __init__(self, path:str, mmap:bool=False):
+        self.path = path
+        self.mmap = mmap
+        self._pending_segment = None
+        self._pending = []
+
+    def prepare(self, start_fresh:bool):
+        if start_fresh and os.path.isdir(self.path):
+            shutil.rmtree(self.path)
+        os.makedirs(self.path, exist_ok=True)
+
+    def _read_metadata(self) -> dict[str, str]:
+        metadata_path = os.path.join(self.path, METADATA_FILE)
+        if not os.path.isfile(metadata_path):
+            return {}
+        with open(metadata_path) as f:
+            return json.load(f)
+
+    def get_metadata(self, key:str) -> str | None:
+        return self._read_metadata().get(key)
+
+    def upsert_metadata(self, values:dict[str, str]):
+        metadata = self._read_metadata()
+        metadata.update(values)
+        metadata_path = os.path.join(self.path, METADATA_FILE)
+        with open(metadata_path + '.tmp', 'w') as f:
+            json.dump(metadata, f, indent=2)
+        os.replace(metadata_path + '.tmp', metadata_path)
+
+    def record(self, trade_day:pd.Timestamp, pipeline_data:pd.DataFrame) -> int:
+        segment = str(trade_day.year)
+        if segment != self._pending_segment:
+            self._flush()
+            self._pending_segment = segment
+        self._pending.append((
+            np.datetime64(trade_day.date(), 'D'),
+            np.array([asset.sid for asset in pipeline_data.index], dtype=np.int64),
+            np.array([asset.symbol for asset in pipeline_data.index], dtype=str),
+            pipeline_data.astype(np.float32),
+        ))
+        return int(pipeline_data.notna().to_numpy().sum())
+
+    def finish(self):
+        self._flush()
+
+    def _segment_path(self, segment:str) -> str:
+        return os.path.join(self.path, segment)
+
+    def _flush(self):
+        if not self._pending:
+            return
+        pending = sorted(self._pending, key=lambda day_data: day_data[0])
+        days = np.array([day for day, _, _, _ in pending])
+        sids = np.unique(np.concatenate([day_sids for _, day_sids, _, _ in pending]))
+        tickers = np.full(len(sids), '', dtype=object)
+        columns = {}
+        for row, (_, day_sids, day_tickers, data) in enumerate(pending):
+            positions = np.searchsorted(sids, day_sids)
+            tickers[positions] = day_tickers
+            for column in data.columns:
+                if column not in columns:
+                    columns[column] = np.full((len(days), len(sids)), np.nan, dtype=np.float32)
+                columns[column][row, positions] = data[column].to_numpy()
+        self._write_segment(self._pending_segment, days, sids, tickers.astype(str), columns)
+        self._pending = []
+
+    def _write_segment(self, segment:str,
+                       days:np.ndarray, sids:np.ndarray, tickers:np.ndarray,
+                       columns:dict[str, np.ndarray]):
+        segment_path = self._segment_path(segment)
+        self._recover_segment(segment)
+        if not os.path.isfile(os.path.join(segment_path, DAYS_FILE)):
+            _save_segment(segment_path, days, sids, tickers, columns.items())
+            return
+        # the merged segment is built beside the old one and swapped in, an
+        # interrupted merge leaves the old segment as it was
+        tmp_path = self._segment_path(f'.{segment}.tmp')
+        if os.path.isdir(tmp_path):
+            shutil.rmtree(tmp_path)
+        _save_segment(tmp_path, *self._merge_segment(segment_path, days, sids, tickers, columns))
+        old_path = self._segment_path(f'.{segment}.old')
+        os.rename(segment_path, old_path)
+        os.rename(tmp_path, segment_path)
+        shutil.rmtree(old_path)
+
+    def _recover_segment(self, segment:str):
+        """Completes a segment swap interrupted between its renames"""
+        old_path = self._segment_path(f'.{segment}.old')
+        if not os.path.isdir(old_path):
+            return
+        if os.path.isdir(self._segment_path(segment)):
+            shutil.rmtree(old_path)
+        else:
+            os.rename(old_path, self._segment_path(segment))
+
+    def _merge_segment(self, segment_path:str,
+                       days:np.ndarray, sids:np.ndarray, tickers:np.ndarray,
+                       columns:dict[str, np.ndarray]):
+        """Merges new values into an existing segment, returns the merged
+        axes and tickers and a generator of the merged columns.
+
+        Like INSERT OR REPLACE in the sqlite store, a new value replaces the
+        stored one and a missing new value keeps it.
+        """
+        old_days = np.load(os.path.join(segment_path, DAYS_FILE))
+        old_sids = np.load(os.path.join(segment_path, SIDS_FILE))
+        old_tickers = np.load(os.path.join(segment_path, TICKERS_FILE))
+        new_days = np.union1d(old_days, days)
+        new_sids = np.union1d(old_sids, sids)
+
+        new_tickers = np.full(len(new_sids), '', dtype=object)
+        new_tickers[np.searchsorted(new_sids, old_sids)] = old_tickers
+        new_tickers[np.searchsorted(new_sids, sids)] = tickers
+
+        old_columns = [name for name in os.listdir(segment_path)
+                       if name not in (DAYS_FILE, SIDS_FILE, TICKERS_FILE)
+                       and not name.endswith('.tmp.npy')]
+
+        def merged_columns():
+            # one column in memory at a time
+            for column, values in columns.items():
+                values = _reindex(values, days, sids, new_days, new_sids)
+                column_path = os.path.join(segment_path, _column_file(column))
+                if _column_file(column) in old_columns:
+                    old_values = _reindex(np.load(column_path), old_days, old_sids, new_days, new_sids)
+                    values = np.where(np.isnan(values), old_values, values)
+                yield column, values
+            # columns not written this time still need the new axes
+            written = {_column_file(column) for column in columns}
+            for file_name in old_columns:
+                if file_name not in written:
+                    old_values = np.load(os.path.join(segment_path, file_name))
+                    yield (unquote(file_name[:-len('.npy')]),
+                           _reindex(old_values, old_days, old_sids, new_days, new_sids))
+
+        return new_days, new_sids, new_tickers.astype(str), merged_columns()
+
+    def merge_from(self, other:'NpyPipelineStore'):
+        for segment in other._segments():
+            segment_path = other._segment_path(segment)
+            days = np.load(os.path.join(segment_path, DAYS_FILE))
+            sids = np.load(os.path.join(segment_path, SIDS_FILE))
+            tickers = np.load(os.path.join(segment_path, TICKERS_FILE))
+            columns = {}
+            for file_name in os.listdir(segment_path):
+                if (file_name in (DAYS_FILE, SIDS_FILE, TICKERS_FILE)
+                        or file_name.endswith('.tmp.npy')):
+                    continue
+                column = unquote(file_name[:-len('.npy')])
+                columns[column] = np.load(os.path.join(segment_path, file_name))
+            self._write_segment(segment, days, sids, tickers, columns)
+
+    def _segments(self) -> list[str]:
+        if not os.path.isdir(self.path):
+            return []
+        # segments being merged or swapped out start with a dot
+        return sorted(
+            name for name in os.listdir(self.path)
+            if not name.startswith('.')
+            and os.path.isfile(os.path.join(self.path, name, DAYS_FILE)))
+
+    def load_chunk(self,
+                   start_day:pd.Timestamp,
+                   end_day:pd.Timestamp,
+                   columns:list[str]) -> PipelineChunk:
+        """Loads the segment holding start_day, end_day is not used"""
+        day = np.datetime64(start_day.date(), 'D')
+        for segment in self._segments():
+            segment_path = self._segment_path(segment)
+            days = np.load(os.path.join(segment_path, DAYS_FILE))
+            if days[-1] < day:
+                continue
+            sids = np.load(os.path.join(segment_path, SIDS_FILE))
+            values = {}
+            for column in columns:
+                column_path = os.path.join(segment_path, _column_file(column))
+                if os.path.isfile(column_path):
+                    values[column] = np.load(column_path, mmap_mode='r' if self.mmap else None)
+                else:
+                    # a read only NaN matrix without memory behind it
+                    values[column] = np.broadcast_to(np.float32(np.nan), (len(days), len(sids)))
+            # the previous chunk, and with it its mapped files, is released by the loader
+            return NpyPipelineChunk(start_day, days, sids, values, drop_missing=not self.mmap)
+        raise KeyError(const.format_trade_day(start_day))
@@ -26,3 +26,19 @@ def has_db_file(db_name:str):
 
 def format_trade_day(trade_day: pd.Timestamp) -> str:
     return trade_day.strftime('%Y-%m-%d')
+
+# Compact schema: indicator names and tickers interned in dimension tables,
+# trade day stored as days since epoch, values in a WITHOUT ROWID table
+# clustered on (trade day, indicator, sid).
+COMPACT_TABLE_NAME = 'pipeline_values'
+INDICATOR_TABLE_NAME = 'indicators'
+TICKER_TABLE_NAME = 'tickers'
+IND_ID = 'ind_id'
+
+_EPOCH = pd.Timestamp('1970-01-01')
+
+def trade_day_number(trade_day: pd.Timestamp) -> int:
+    return (trade_day.normalize() - _EPOCH).days
+
+def trade_day_from_number(day_number: int) -> pd.Timestamp:
+    return _EPOCH + pd.Timedelta(days=day_number)
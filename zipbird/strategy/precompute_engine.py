@@ -0,0 +1,587 @@
+"""Computes the strategy pipeline for a whole date range in one pass.
+
+zipline's pipeline engine loads and re-adjusts the OHLCV windows of every
+chunk of sessions and calls each factor once per session. Here the OHLCV of
+the bundle is loaded once into dense (sessions x assets) arrays, adjusted up
+to the last session, and every term is computed over all sessions at once:
+
+- the window a term sees on a session is the bars before that session, with
+  the adjustments that are not effective yet undone, so it is the same
+  window the pipeline engine would pass to compute.
+- factors that compute every asset on its own (COLUMN_FACTORS) get the
+  windows of many (session, asset) pairs in a single compute call.
+- cross sectional factors (CROSS_SECTIONAL_FACTORS) compute their per asset
+  value the same way and are ranked per session afterwards.
+- column and cross sectional factors with a HISTORY_KERNELS entry compute
+  the pairs whose window has no missing bar from the whole history at once,
+  e.g. a moving sum or one Wilder recursion over all sessions, instead of
+  from every window on its own. Only the other pairs get their windows.
+- every other term runs its own _compute over all sessions, as the pipeline
+  engine does, e.g. incremental factors, filters and the norgate terms.
+
+IndicatorCache computes the columns of many pipeline makers, e.g. the
+combinations of a parameter sweep, sharing the columns they have in common.
+save_pipelines writes them to .npy files, each shared column once, for worker
+processes to memory map instead of receiving a copy of every pipeline.
+"""
+from collections.abc import Callable
+import os
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from zipline.data import bundles
+from zipline.pipeline.data import BoundColumn
+from zipline.pipeline.domain import US_EQUITIES
+from zipline.pipeline.factors import AverageDollarVolume, SimpleMovingAverage
+from zipline.pipeline.factors.factor import Latest
+from zipline.pipeline.sentinels import NotSpecified
+from zipline.pipeline.term import AssetExists, Term
+
+from zipbird.strategy.pipeline_maker import PipelineMaker
+from zipbird.utils import factor_utils, wilder_smoothing
+
+# each asset of a window is computed on its own
+COLUMN_FACTORS = (
+    SimpleMovingAverage,
+    AverageDollarVolume,
+    factor_utils.RSIFactor,
+    factor_utils.ATRFactor,
+    factor_utils.ATRPFactor,
+    factor_utils.ADXFactor,
+    factor_utils.ROCFactor,
+    factor_utils.StdFactorPercent,
+    factor_utils.ConsecutiveUpFactor,
+    factor_utils.MaxInWindowFactor,
+    factor_utils.SMACrossOver,
+    factor_utils.SMATrend,
+)
+
+# factor type -> (value of each asset, rank of the values of one session)
+CROSS_SECTIONAL_FACTORS = {
+    factor_utils.DollarVolumeRankFactor: (
+        factor_utils.average_dollar_volume, factor_utils.dollar_volume_rank),
+    factor_utils.StdPercentileFactor: (
+        factor_utils.std_percent, factor_utils.percentile_rank),
+}
+
+PRICE_ADJUSTMENT_TABLES = ('splits', 'mergers', 'dividends')
+SESSIONS_FILE = 'sessions.npy'
+ASSETS_FILE = 'assets.npy'
+VOLUME_ADJUSTMENT_TABLES = ('splits',)
+# values in the windows of one batched compute call
+DEFAULT_BATCH_ELEMENTS = 20_000_000
+# values in each temporary of a history kernel batch, few enough to stay in cache
+KERNEL_BATCH_ELEMENTS = 1_000_000
+
+
+class UnsupportedTermException(Exception):
+    pass
+
+
+def adjustment_factors(adjustment_reader,
+                       tables:tuple[str],
+                       sessions:pd.DatetimeIndex,
+                       sids:np.ndarray,
+                       invert:bool=False) -> np.ndarray:
+    """factors[i, a] is the product of the ratios of asset a in the tables
+    that are effective after sessions[i]"""
+    ratios = np.ones((len(sessions) + 1, len(sids)))
+    if adjustment_reader is not None:
+        sid_index = pd.Index(sids)
+        for table in tables:
+            rows = adjustment_reader.conn.execute(
+                f'SELECT sid, effective_date, ratio FROM {table}').fetchall()
+            if not rows:
+                continue
+            adj_sids, effective_dates, adj_ratios = (np.array(values) for values in zip(*rows))
+            cols = sid_index.get_indexer(adj_sids)
+            known = cols >= 0
+            positions = sessions.searchsorted(
+                pd.to_datetime(effective_dates[known], unit='s'), side='left')
+            adj_ratios = adj_ratios[known].astype(float)
+            np.multiply.at(ratios, (positions, cols[known]),
+                           1 / adj_ratios if invert else adj_ratios)
+    # ratio effective on sessions[p] applies to all sessions before p
+    return np.cumprod(ratios[::-1], axis=0)[::-1][1:]
+
+
+class PricingArrays:
+    """OHLCV bars of a bundle as dense (sessions x assets) arrays.
+
+    values[name][a, i] is the bar of asset a on sessions[i], adjusted up to
+    the last session. Bars are stored asset by asset, so the window of an
+    asset is a contiguous block. On sessions[i], the bars before it are seen
+    divided by factors[name][i], which undoes the adjustments effective
+    after it.
+    """
+    def __init__(self,
+                 sessions:pd.DatetimeIndex,
+                 sids:np.ndarray,
+                 raw:dict[str, np.ndarray],
+                 factors:dict[str, np.ndarray],
+                 lifetimes:np.ndarray,
+                 first_row:int,
+                 assets:np.ndarray|None=None):
+        self.sessions = sessions
+        self.sids = np.asarray(sids)
+        self.assets = self.sids if assets is None else np.asarray(assets, dtype=object)
+        self.factors = factors
+        self.values = {name: np.ascontiguousarray((bars * factors[name][:len(bars)]).T)
+                       for name, bars in raw.items()}
+        self.lifetimes = lifetimes
+        # the first session to compute, the rows before it are history only
+        self.first_row = first_row
+        self._missing_counts = {}
+
+    @classmethod
+    def from_bundle(cls,
+                    bundle_data,
+                    columns:list[str],
+                    start_day:pd.Timestamp,
+                    end_day:pd.Timestamp,
+                    lookback:int):
+        """Loads the bars of the columns from lookback sessions before
+        start_day to end_day"""
+        all_sessions = US_EQUITIES.calendar.sessions
+        first_row = max(1, lookback)
+        start = all_sessions.searchsorted(start_day) - first_row
+        if start < 0:
+            raise ValueError(f'Not enough sessions before {start_day} for {lookback} sessions of history')
+        sessions = all_sessions[start:all_sessions.searchsorted(end_day, side='right')]
+        finder = bundle_data.asset_finder
+        lifetimes = finder.lifetimes(
+            sessions, include_start_date=False, country_codes=[US_EQUITIES.country_code])
+        lifetimes = lifetimes.loc[:, lifetimes.values.any(axis=0)]
+        sids = lifetimes.columns.values
+        raw = bundle_data.equity_daily_bar_reader.load_raw_arrays(
+            columns, sessions[0], sessions[-2], sids)
+        # all price columns share one array of factors
+        price_factors = None
+        factors = {}
+        for name in columns:
+            if name == 'volume':
+                factors[name] = adjustment_factors(
+                    bundle_data.adjustment_reader, VOLUME_ADJUSTMENT_TABLES, sessions, sids, invert=True)
+            else:
+                if price_factors is None:
+                    price_factors = adjustment_factors(
+                        bundle_data.adjustment_reader, PRICE_ADJUSTMENT_TABLES, sessions, sids)
+                factors[name] = price_factors
+        return cls(sessions, sids, dict(zip(columns, raw)), factors,
+                   lifetimes.values, first_row, finder.retrieve_all(sids))
+
+    def windows(self, name:str, rows:np.ndarray, cols:np.ndarray, length:int) -> np.ndarray:
+        """(length x pairs) windows seen on sessions[rows] by the assets cols"""
+        blocks = sliding_window_view(self.values[name], length, axis=1)[cols, rows - length]
+        return blocks.T / self.factors[name][rows, cols]
+
+    def session_window(self, name:str, row:int, length:int) -> np.ndarray:
+        """(length x assets) window seen on sessions[row]"""
+        return self.values[name][:, row - length:row].T / self.factors[name][row]
+
+    def latest(self, name:str, rows:np.ndarray) -> np.ndarray:
+        """(rows x assets) bars of the session before each of the rows"""
+        return self.values[name][:, rows - 1].T / self.factors[name][rows]
+
+    def bars(self, name:str) -> np.ndarray:
+        """(sessions x assets) view of the adjusted bars"""
+        return self.values[name].T
+
+    def complete_windows(self, names:list[str], rows:np.ndarray, length:int) -> np.ndarray:
+        """(rows x assets) True where no bar of the names is missing in the
+        window seen on the row"""
+        key = tuple(sorted(names))
+        if key not in self._missing_counts:
+            missing = np.logical_or.reduce([np.isnan(self.values[name]) for name in key])
+            counts = np.zeros((missing.shape[0], missing.shape[1] + 1), dtype=np.int64)
+            np.cumsum(missing, axis=1, out=counts[:, 1:])
+            self._missing_counts[key] = counts
+        counts = self._missing_counts[key]
+        return (counts[:, rows] == counts[:, rows - length]).T
+
+
+def _history_windows(bars:np.ndarray, rows:np.ndarray, length:int) -> np.ndarray:
+    """(rows x assets x length) adjusted windows of the sessions rows,
+    which must be consecutive"""
+    return sliding_window_view(bars, length, axis=0)[rows[0] - length:rows[-1] - length + 1]
+
+
+def _in_batches(func:Callable, rows:np.ndarray, row_elements:int) -> np.ndarray:
+    """Calls func on batches of rows, row_elements being the size of the
+    temporaries of one row"""
+    step = max(1, KERNEL_BATCH_ELEMENTS // row_elements)
+    return np.concatenate([func(rows[start:start + step]) for start in range(0, len(rows), step)])
+
+
+def _sma_history(arrays:PricingArrays, rows:np.ndarray, term:Term) -> np.ndarray:
+    name = term.inputs[0].name
+    return (_history_windows(arrays.bars(name), rows, term.window_length).mean(axis=-1)
+            / arrays.factors[name][rows])
+
+
+def _max_history(arrays:PricingArrays, rows:np.ndarray, term:Term) -> np.ndarray:
+    name = term.inputs[0].name
+    return (_history_windows(arrays.bars(name), rows, term.window_length).max(axis=-1)
+            / arrays.factors[name][rows])
+
+
+def _std_percent_history(arrays:PricingArrays, rows:np.ndarray, term:Term) -> np.ndarray:
+    # the same for adjusted and seen windows
+    bars = arrays.bars(term.inputs[0].name)
+
+    def std_percent(batch_rows):
+        windows = _history_windows(bars, batch_rows, term.window_length)
+        return windows.std(axis=-1) / windows.mean(axis=-1) * 100
+
+    return _in_batches(std_percent, rows, term.window_length * bars.shape[1])
+
+
+def _average_dollar_volume_history(arrays:PricingArrays, rows:np.ndarray, term:Term) -> np.ndarray:
+    close, volume = (input_.name for input_ in term.inputs)
+    dollar_volumes = arrays.bars(close) * arrays.bars(volume)
+    sums = _history_windows(dollar_volumes, rows, term.window_length).sum(axis=-1)
+    return sums / term.window_length / (arrays.factors[close][rows] * arrays.factors[volume][rows])
+
+
+def _roc_history(arrays:PricingArrays, rows:np.ndarray, term:Term) -> np.ndarray:
+    roc_len = term.params['roc_len']
+    if term.window_length <= roc_len:
+        return np.full((len(rows), len(arrays.sids)), np.nan)
+    closes = arrays.bars(term.inputs[0].name)
+    last, prev = closes[rows - 1], closes[rows - 1 - roc_len]
+    # talib's ROCP outputs 0 after a zero close
+    return np.where(prev != 0, (last - prev) / prev, 0.0)
+
+
+def _rsi_history(arrays:PricingArrays, rows:np.ndarray, term:Term) -> np.ndarray:
+    # the same for adjusted and seen windows
+    gain, loss = wilder_smoothing.gains_and_losses(arrays.bars(term.inputs[0].name))
+    rsi_len = term.params['rsi_len']
+    return wilder_smoothing.rsi_from_averages(
+        wilder_smoothing.window_averages(gain, rows - 1, term.window_length, rsi_len),
+        wilder_smoothing.window_averages(loss, rows - 1, term.window_length, rsi_len))
+
+
+def _adjusted_atr(arrays:PricingArrays, rows:np.ndarray, term:Term) -> np.ndarray:
+    closes, highs, lows = (arrays.bars(input_.name) for input_ in term.inputs)
+    return wilder_smoothing.window_averages(
+        wilder_smoothing.true_range(highs, lows, closes), rows - 1,
+        term.window_length, term.params['atr_len'])
+
+
+def _atr_history(arrays:PricingArrays, rows:np.ndarray, term:Term) -> np.ndarray:
+    return _adjusted_atr(arrays, rows, term) / arrays.factors[term.inputs[0].name][rows]
+
+
+def _atrp_history(arrays:PricingArrays, rows:np.ndarray, term:Term) -> np.ndarray:
+    name = term.inputs[0].name
+    factors = arrays.factors[name][rows]
+    return wilder_smoothing.natr_from_atr(
+        _adjusted_atr(arrays, rows, term) / factors, arrays.bars(name)[rows - 1] / factors)
+
+
+def _adx_history(arrays:PricingArrays, rows:np.ndarray, term:Term) -> np.ndarray:
+    closes, highs, lows = (arrays.bars(input_.name) for input_ in term.inputs)
+    adx_len = term.params['adx_len']
+    history = wilder_smoothing.adx_history(highs, lows, closes, adx_len)
+    factors = arrays.factors[term.inputs[0].name]
+
+    def window_adx(batch_rows):
+        return wilder_smoothing.window_adx(
+            history, batch_rows - 1, term.window_length, adx_len, factors[batch_rows])
+
+    return _in_batches(window_adx, rows, term.window_length * closes.shape[1])
+
+
+# factor type -> (arrays, rows, term) -> (rows x assets) values of the pairs
+# with complete windows, before the ranking of cross sectional factors. The
+# pairs a kernel returns NaN for are computed from their windows.
+HISTORY_KERNELS = {
+    SimpleMovingAverage: _sma_history,
+    AverageDollarVolume: _average_dollar_volume_history,
+    factor_utils.RSIFactor: _rsi_history,
+    factor_utils.ATRFactor: _atr_history,
+    factor_utils.ATRPFactor: _atrp_history,
+    factor_utils.ADXFactor: _adx_history,
+    factor_utils.ROCFactor: _roc_history,
+    factor_utils.StdFactorPercent: _std_percent_history,
+    factor_utils.MaxInWindowFactor: _max_history,
+    factor_utils.DollarVolumeRankFactor: _average_dollar_volume_history,
+    factor_utils.StdPercentileFactor: _std_percent_history,
+}
+
+
+class PrecomputedPipeline:
+    """Pipeline output of every session, as pipeline_output() returns it"""
+    def __init__(self,
+                 sessions:pd.DatetimeIndex,
+                 assets:np.ndarray,
+                 columns:dict[str, np.ndarray],
+                 mask:np.ndarray):
+        self.sessions = sessions
+        self.assets = assets
+        self.columns = columns
+        self.mask = mask
+
+    def for_trade_day(self, trade_day:pd.Timestamp) -> pd.DataFrame:
+        row = self.sessions.get_loc(pd.Timestamp(trade_day))
+        exists = self.mask[row]
+        return pd.DataFrame(
+            {name: values[row, exists] for name, values in self.columns.items()},
+            index=pd.Index(self.assets[exists]))
+
+
+class PipelineFiles:
+    """A PrecomputedPipeline saved by save_pipelines.
+
+    It only holds file names, so it is cheap to send to another process.
+    load() memory maps the columns, and processes loading the same files
+    share their pages in the OS page cache.
+    """
+    def __init__(self, directory:str, columns:dict[str, str], mask:str):
+        self.directory = directory
+        self.columns = columns
+        self.mask = mask
+
+    def load(self) -> PrecomputedPipeline:
+        return PrecomputedPipeline(
+            pd.DatetimeIndex(np.load(self._path(SESSIONS_FILE))),
+            np.load(self._path(ASSETS_FILE), allow_pickle=True),
+            {name: np.load(self._path(file), mmap_mode='r') for name, file in self.columns.items()},
+            np.load(self._path(self.mask), mmap_mode='r'))
+
+    def _path(self, file:str) -> str:
+        return os.path.join(self.directory, file)
+
+
+def save_pipelines(pipelines:list[PrecomputedPipeline], directory:str) -> list[PipelineFiles]:
+    """Saves pipelines of the same sessions and assets, e.g. of one
+    IndicatorCache, writing arrays they share once"""
+    os.makedirs(directory, exist_ok=True)
+    np.save(os.path.join(directory, SESSIONS_FILE), pipelines[0].sessions.values)
+    np.save(os.path.join(directory, ASSETS_FILE), pipelines[0].assets, allow_pickle=True)
+    # id of an array -> its file
+    files = {}
+
+    def save(values:np.ndarray) -> str:
+        if id(values) not in files:
+            files[id(values)] = f'{len(files)}.npy'
+            np.save(os.path.join(directory, files[id(values)]), values)
+        return files[id(values)]
+
+    return [PipelineFiles(directory,
+                          {name: save(values) for name, values in pipeline.columns.items()},
+                          save(pipeline.mask))
+            for pipeline in pipelines]
+
+
+class PrecomputeEngine:
+    """Computes pipeline terms on every session of the pricing arrays
+    after their first_row"""
+    def __init__(self, arrays:PricingArrays, batch_elements:int=DEFAULT_BATCH_ELEMENTS):
+        self.arrays = arrays
+        self.batch_elements = batch_elements
+        self.rows = np.arange(arrays.first_row, len(arrays.sessions))
+        self.dates = arrays.sessions[arrays.first_row:]
+        self.workspace = {}
+
+    def run(self, columns:dict[str, Term]) -> PrecomputedPipeline:
+        outputs = {name: self.compute(term) for name, term in columns.items()}
+        return PrecomputedPipeline(
+            self.dates, self.arrays.assets, outputs, self.compute(AssetExists()))
+
+    def compute(self, term:Term) -> np.ndarray:
+        """(sessions x assets) values of the term"""
+        if term not in self.workspace:
+            self.workspace[term] = self._compute(term)
+        return self.workspace[term]
+
+    def compute_shared(self, terms:list[Term]):
+        """Computes terms that only differ by their mask once, for the
+        union of their masks"""
+        groups = {}
+        for term in dict.fromkeys(terms):
+            key = _shared_key(term)
+            if key is not None and term not in self.workspace:
+                groups.setdefault(key, []).append(term)
+        for group in groups.values():
+            if len(group) < 2:
+                continue
+            masks = [self.compute(term.mask) for term in group]
+            values = self._compute_with_mask(group[0], np.logical_or.reduce(masks))
+            for term, mask in zip(group, masks):
+                self.workspace[term] = np.where(mask, values, term.missing_value).astype(term.dtype)
+
+    def _compute(self, term:Term) -> np.ndarray:
+        if isinstance(term, AssetExists):
+            return self.arrays.lifetimes[self.rows]
+        if isinstance(term, BoundColumn) or term.ndim != 2:
+            raise UnsupportedTermException(f'Can not compute {term!r}')
+        return self._compute_with_mask(term, self.compute(term.mask))
+
+    def _compute_with_mask(self, term:Term, mask:np.ndarray) -> np.ndarray:
+        if not term.inputs:
+            # e.g. norgate terms, which load their own data
+            return term._compute([], self.dates, self.arrays.sids, mask)
+        if not term.windowed:
+            inputs = [self.compute(input_) for input_ in term.inputs]
+            return term._compute(inputs, self.dates, self.arrays.sids, mask)
+        if not all(isinstance(input_, BoundColumn) for input_ in term.inputs):
+            raise UnsupportedTermException(f'Windows of computed terms are not supported: {term!r}')
+
+        if type(term) is Latest:
+            values = self.arrays.latest(term.inputs[0].name, self.rows)
+            return np.where(mask, values, term.missing_value).astype(term.dtype)
+        if type(term) in CROSS_SECTIONAL_FACTORS:
+            return self._compute_cross_sectional(term, mask)
+        if type(term) in COLUMN_FACTORS and term.outputs is NotSpecified:
+            return self._compute_values(term, mask, term.compute, term.params)
+        return self._compute_per_session(term, mask)
+
+    def _compute_values(self, term:Term, mask:np.ndarray, compute:Callable, params:dict) -> np.ndarray:
+        """Values of the pairs of the mask, from the history kernel of the
+        term where their window is complete, from their windows otherwise"""
+        kernel = HISTORY_KERNELS.get(type(term))
+        if kernel is None or term.params.get('use_talib'):
+            return self._compute_pairs(term, mask, compute, params)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            values = kernel(self.arrays, self.rows, term)
+        computed = mask & ~np.isnan(values) & self.arrays.complete_windows(
+            [input_.name for input_ in term.inputs], self.rows, term.window_length)
+        out = np.where(computed, values, term.missing_value).astype(term.dtype)
+        partial = mask & ~computed
+        if partial.any():
+            out[partial] = self._compute_pairs(term, partial, compute, params)[partial]
+        return out
+
+    def _compute_pairs(self, term:Term, mask:np.ndarray, compute:Callable, params:dict) -> np.ndarray:
+        """Calls compute with the windows of many (session, asset) pairs at a time"""
+        out = np.full(mask.shape, term.missing_value, dtype=term.dtype)
+        rows, cols = np.nonzero(mask)
+        step = max(1, self.batch_elements // (term.window_length * len(term.inputs)))
+        with term.ctx:
+            for start in range(0, len(rows), step):
+                batch_rows = rows[start:start + step]
+                batch_cols = cols[start:start + step]
+                windows = [self.arrays.windows(input_.name, self.rows[batch_rows], batch_cols, term.window_length)
+                           for input_ in term.inputs]
+                batch_out = np.empty(len(batch_rows), dtype=term.dtype)
+                compute(self.dates[batch_rows[-1]], self.arrays.sids[batch_cols], batch_out, *windows, **params)
+                out[batch_rows, batch_cols] = batch_out
+        return out
+
+    def _compute_cross_sectional(self, term:Term, mask:np.ndarray) -> np.ndarray:
+        value_func, rank_func = CROSS_SECTIONAL_FACTORS[type(term)]
+
+        def compute_values(today, assets, out, *windows):
+            out[:] = value_func(*windows)
+
+        values = self._compute_values(term, mask, compute_values, {})
+        out = np.full(mask.shape, term.missing_value, dtype=term.dtype)
+        for row, row_mask in enumerate(mask):
+            out[row, row_mask] = rank_func(values[row, row_mask])
+        return out
+
+    def _compute_per_session(self, term:Term, mask:np.ndarray) -> np.ndarray:
+        windows = [self._session_windows(input_.name, term.window_length)
+                   for input_ in term.inputs]
+        return term._compute(windows, self.dates, self.arrays.sids, mask)
+
+    def _session_windows(self, name:str, length:int):
+        for row in self.rows:
+            yield self.arrays.session_window(name, row, length)
+
+
+class IndicatorCache:
+    """Pipeline columns of many pipeline makers over one date range.
+
+    Columns are grouped by their pipeline_column_names name, e.g. rsi_3 or
+    sma_150, and a column is computed once for all makers that use it. When
+    makers ask for the same column with different universes, a factor that
+    computes every asset on its own is computed once for the union of the
+    universes.
+    """
+    def __init__(self, engine:PrecomputeEngine):
+        self.engine = engine
+        self.makers = []
+        # column name -> terms of the makers for the column
+        self.columns = {}
+
+    @classmethod
+    def from_bundle(cls,
+                    bundle_data,
+                    pipeline_makers:list[PipelineMaker],
+                    start_day:pd.Timestamp,
+                    end_day:pd.Timestamp):
+        terms = [term for maker in pipeline_makers for term in maker.get_columns().values()]
+        arrays = PricingArrays.from_bundle(
+            bundle_data,
+            _pricing_columns(terms),
+            start_day,
+            end_day,
+            max(maker.max_window_length() for maker in pipeline_makers))
+        cache = cls(PrecomputeEngine(arrays))
+        for maker in pipeline_makers:
+            cache.add(maker)
+        return cache
+
+    def add(self, pipeline_maker:PipelineMaker):
+        self.makers.append(pipeline_maker)
+        for name, term in pipeline_maker.get_columns().items():
+            self.columns.setdefault(name, []).append(term)
+
+    def pipelines(self) -> list[PrecomputedPipeline]:
+        """Pipeline output of each maker, in the order they were added"""
+        for terms in self.columns.values():
+            self.engine.compute_shared(terms)
+        return [self.engine.run(maker.get_columns()) for maker in self.makers]
+
+
+def _shared_key(term:Term) -> tuple|None:
+    """Identity of the term without its mask, if it computes every asset on its own"""
+    if not all(isinstance(input_, BoundColumn) for input_ in getattr(term, 'inputs', [None])):
+        return None
+    if type(term) is Latest or (type(term) in COLUMN_FACTORS and term.outputs is NotSpecified):
+        return (type(term), tuple(term.inputs), term.window_length,
+                tuple(sorted(term.params.items())), term.dtype, term.missing_value)
+    return None
+
+
+def _pricing_columns(terms:list[Term]) -> list[str]:
+    """Names of the bound columns the terms depend on"""
+    names = set()
+    terms = list(terms)
+    seen = set()
+    while terms:
+        term = terms.pop()
+        if id(term) in seen:
+            continue
+        seen.add(id(term))
+        if isinstance(term, BoundColumn):
+            names.add(term.name)
+            continue
+        terms.extend(getattr(term, 'inputs', ()))
+        mask = getattr(term, 'mask', None)
+        if mask is not None:
+            terms.append(mask)
+    return sorted(names)
+
+
+def precompute_pipelines(bundle_data,
+                         pipeline_makers:list[PipelineMaker],
+                         start_day:pd.Timestamp,
+                         end_day:pd.Timestamp) -> list[PrecomputedPipeline]:
+    """Computes the columns of each pipeline maker on every session from
+    start_day to end_day, see IndicatorCache"""
+    return IndicatorCache.from_bundle(bundle_data, pipeline_makers, start_day, end_day).pipelines()
+
+
+def precompute_pipeline(bundle:str,
+                        pipeline_maker:PipelineMaker,
+                        start_day:pd.Timestamp,
+                        end_day:pd.Timestamp) -> PrecomputedPipeline:
+    """Computes the columns of the pipeline maker on every session from
+    start_day to end_day"""
+    return precompute_pipelines(bundles.load(bundle), [pipeline_maker], start_day, end_day)[0]
@@ -2,7 +2,7 @@ import pandas as pd
 
 from zipline.protocol import Positions
 
-from zipbird.basic.signal import Signal
+from zipbird.basic.signal import Signal, SignalBatch
 from zipbird.basic.types import Equity
 from zipbird.strategy.pipeline_maker import PipelineMaker
 
@@ -37,8 +37,8 @@ class BaseStrategy:
     def generate_signals(self,
                          positions: Positions,
                          pipeline_data:pd.DataFrame,
-                         filtered_pipeline_data:pd.DataFrame) -> list[Signal]:
-        """Generate signals
+                         filtered_pipeline_data:pd.DataFrame) -> list[Signal] | SignalBatch:
+        """Generate signals, as a list of Signal or a SignalBatch over pipeline_data.index
         
         positions: current positions in portfolio
         pipeline_data: raw pipeline data
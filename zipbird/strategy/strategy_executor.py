@@ -3,7 +3,7 @@ import pandas as pd
 from zipbird.replay.order_collector import OrderCollector
 from zipbird.utils.logger_util import DebugLogger
 from zipbird.basic.order import Order, ShareOrder
-from zipbird.basic.signal import Signal
+from zipbird.basic.signal import Signal, SignalBatch
 from zipbird.basic.types import CloseStockNotInPortfolioException, Equity, OpenClose, Portfolio, Positions
 from zipbird.strategy.pipeline_maker import PipelineMaker
 from zipbird.position_manager.position_manager import PositionManager
@@ -64,6 +64,8 @@ class StrategyExecutor:
             positions=portfolio.positions, 
             pipeline_data=pipeline_data,
             filtered_pipeline_data=filtered_pipeline_data)
+        if not isinstance(signals, SignalBatch):
+            signals = SignalBatch.from_signals(signals, pipeline_data.index)
         
         to_open, to_close = _split_signals(signals)
         self.debug_logger.debug_print(5, f'To open signals: {len(to_open)}, {to_open}')
@@ -93,43 +95,35 @@ class StrategyExecutor:
         self.position_manager.send_orders(open_orders + close_orders)
 
 
-def _split_signals(signals:list[Signal]) -> tuple[list[Signal], list[Signal]]:
-    to_open = []
-    to_close = []
-    for signal in signals:
-        if signal.open_close == OpenClose.Open:
-            to_open.append(signal)
-        elif signal.open_close == OpenClose.Close:
-            to_close.append(signal)
-    return to_open, to_close
+def _split_signals(signals:SignalBatch) -> tuple[SignalBatch, SignalBatch]:
+    return (signals.select(signals.is_open_close(OpenClose.Open)),
+            signals.select(signals.is_open_close(OpenClose.Close)))
 
 
-def _get_extra_cash_after_closing(positions:Positions, 
-                            to_close:list[Signal],
-                            pipeline_data:pd.DataFrame) -> float:
-    extra_cash = 0
-    for close_signal in to_close:
-        stock = close_signal.stock
+def _get_position_amounts(positions:Positions, to_close:SignalBatch) -> list[int]:
+    amounts = []
+    for stock in to_close.assets:
         if stock in positions:
-            last_close = pipeline_data['close'][stock]
-            extra_cash += positions[stock].amount * last_close
+            amounts.append(positions[stock].amount)
         else:
             raise CloseStockNotInPortfolioException(f'{stock} not in portfolio')
+    return amounts
+
+
+def _get_extra_cash_after_closing(positions:Positions, 
+                            to_close:SignalBatch,
+                            pipeline_data:pd.DataFrame) -> float:
+    amounts = _get_position_amounts(positions, to_close)
+    last_closes = to_close.values(pipeline_data['close'])
+    extra_cash = 0
+    for amount, last_close in zip(amounts, last_closes):
+        extra_cash += amount * last_close
     return extra_cash
 
 
 def _create_closing_orders(positions:Positions,
-                            to_close:list[Signal]) -> list[Order]:
-    orders = []
-    for close_signal in to_close:
-        stock = close_signal.stock
-        if stock in positions:
-            orders.append(ShareOrder(
-                stock, 
-            OpenClose.Close, 
-            close_signal.long_short,
-                amount=positions[stock].amount))
-        else:
-            raise CloseStockNotInPortfolioException(f'{stock} not in portfolio')
-    return orders
-
+                            to_close:SignalBatch) -> list[Order]:
+    amounts = _get_position_amounts(positions, to_close)
+    return [ShareOrder(stock, OpenClose.Close, long_short, amount=amount)
+            for stock, long_short, amount in zip(
+                to_close.assets, to_close.get_long_shorts(), amounts)]
@@ -9,6 +9,7 @@ from zipbird.utils import logger_util
 from zipbird.utils.timer_context import TimerContext
 from zipbird.basic.types import Portfolio
 from zipbird.strategy.pipeline_loader import PipelineLoader
+from zipbird.strategy.precompute_engine import PrecomputedPipeline
 from zipbird.strategy.strategy_executor import StrategyExecutor
 
 _STRATEGY_PIPELINE_NAME = 'backtest_strategy_pipeline'
@@ -22,6 +23,10 @@ def initialize_zipline(strategy_executor, debug_logger, context):
         eager=True)
     _init_internal(strategy_executor, debug_logger, context)
 
+def initialize_precomputed(strategy_executor, debug_logger, context):
+    # pipeline columns are already computed, see precompute_engine
+    _init_internal(strategy_executor, debug_logger, context)
+
 def _init_internal(strategy_executor:StrategyExecutor,
                    debug_logger:logger_util.DebugLogger,
                    context:TradingAlgorithm):
@@ -35,6 +40,14 @@ def before_trading_start_zipline(strategy_executor:StrategyExecutor, context:Tra
     pipeline_data = zipline_api.pipeline_output(_STRATEGY_PIPELINE_NAME)
     _run_for_one_day(strategy_executor, context, pipeline_data, False)
 
+def before_trading_start_precomputed(strategy_executor:StrategyExecutor,
+                                     precomputed:PrecomputedPipeline,
+                                     context:TradingAlgorithm,
+                                     data):
+    today = pd.Timestamp(zipline_api.get_datetime().date())
+    pipeline_data = precomputed.for_trade_day(today)
+    _run_for_one_day(strategy_executor, context, pipeline_data, False)
+
 def _run_for_one_day(strategy_executor:StrategyExecutor, context:TradingAlgorithm, pipeline_data:pd.DataFrame, use_pipeline_loader:bool):
     context.debug_logger.output_progress(context, pipeline_data, strategy_executor)
     portfolio = Portfolio(
@@ -64,9 +77,9 @@ def before_trading_start_use_loader(pipeline_loader:PipelineLoader,
     with timer_context.timer('load_pipeline_data'):
         pipeline_data = pipeline_loader.load_for_trade_day(trade_day=today)
     
-    # loaded index are tickers, convert them to zipline symbol
+    # loaded index are sids, convert them to zipline symbol
     with timer_context.timer('convert to symbol'):        
-        pipeline_data.index = pipeline_data.index.map(ticker_to_zipline_symbol)
+        pipeline_data.index = pipeline_data.index.map(sid_to_zipline_symbol)
 
     with timer_context.timer('run trading'):
         _run_for_one_day(strategy_executor=pipeline_loader.strategy,
@@ -0,0 +1,41 @@
+"""Parameter sweeps of a strategy in models.STRATEGY_FUNC_MAP"""
+import ast
+import itertools
+
+from zipbird.strategy.strategy_executor import StrategyExecutor
+
+
+class InvalidParamGridException(Exception):
+    pass
+
+
+def parse_param_values(arg:str) -> tuple[str, list]:
+    """Parses a name=v1,v2,... argument into the param name and values"""
+    name, sep, values = arg.partition('=')
+    if not sep or not name or not values:
+        raise InvalidParamGridException(f'Param grid must look like name=v1,v2: {arg}')
+    return name, [_parse_value(value) for value in values.split(',')]
+
+
+def _parse_value(value:str):
+    try:
+        return ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return value
+
+
+def param_combinations(base_params:dict, grid:dict[str, list]) -> list[dict]:
+    """base_params updated with every combination of the grid values"""
+    unknown = [name for name in grid if name not in base_params]
+    if unknown:
+        raise InvalidParamGridException(f'Unknown params {unknown}, choose from {list(base_params)}')
+    names = list(grid)
+    return [{**base_params, **dict(zip(names, values))}
+            for values in itertools.product(*grid.values())]
+
+
+def make_sweep_executor(base:StrategyExecutor, name:str, params:dict) -> StrategyExecutor:
+    """Executor with the strategy and position sizer classes of base and the params"""
+    return StrategyExecutor(
+        strategy=type(base.strategy)(name, params),
+        position_sizer=type(base.position_sizer)(params))
@@ -0,0 +1,133 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import os
+import tempfile
+import pandas as pd
+from zipline.data import bundles
+
+import zipbird.strategies.models as se_models
+from zipbird.strategy.daily_simulator import DailyBars, DailySimulator, load_corporate_actions
+from zipbird.strategy.precompute_engine import PipelineFiles, precompute_pipelines, save_pipelines
+from zipbird.strategy.strategy_executor import StrategyExecutor
+from zipbird.strategy.sweep import make_sweep_executor, param_combinations, parse_param_values
+from zipbird.utils import logger_util, utils
+from zipbird.utils.runner_util import supress_warnings, timing
+
+supress_warnings()
+
+def run():
+    parser = argparse.ArgumentParser(
+        prog='SweepRunner',
+        description='Runs a strategy over a grid of params')
+    parser.add_argument('strategy_name')
+    parser.add_argument('-p', '--param',
+                        action='append',
+                        default=[],
+                        help='Param values to sweep, as name=v1,v2,...')
+    parser.add_argument('-s', '--start', default='2015-01-01')
+    parser.add_argument('-e', '--end', default='2015-12-31')
+    parser.add_argument('-c', '--capital', default=100_000)
+    parser.add_argument('-b', '--bundle', default='quandl')
+    parser.add_argument('-l', '--label', default='')
+    parser.add_argument('-n', '--processes', type=int, default=os.cpu_count())
+
+    args = parser.parse_args()
+
+    base = se_models.STRATEGY_FUNC_MAP.get(args.strategy_name)
+    if not isinstance(base, StrategyExecutor):
+        print('Strategy name {} unknown, choose from: {}'.format(
+            args.strategy_name, se_models.STRATEGY_FUNC_MAP.keys()))
+        return
+    grid = dict(parse_param_values(param) for param in args.param)
+    combinations = param_combinations(base.strategy.get_params(), grid)
+    start_time = pd.Timestamp(args.start)
+    end_time = pd.Timestamp(args.end)
+    print(f'{len(combinations)} combinations of {args.strategy_name}')
+
+    results = run_sweep(args.strategy_name, combinations, start_time, end_time,
+                        float(args.capital), args.bundle, args.processes, args.label)
+    table = pd.DataFrame([{'name': name, **{param: params[param] for param in grid}, **metrics}
+                          for name, params, metrics in results])
+    table = table.sort_values('annual_return', ascending=False, ignore_index=True)
+    print(table.to_string())
+    table.to_csv(f'results/sweep-{utils.filename(args.strategy_name, start_time, end_time, args.label)}.csv')
+
+
+def sweep_names(strategy_name:str, combinations:list[dict]) -> list[str]:
+    width = len(str(len(combinations)))
+    return [f'{strategy_name}-{i:0{width}d}' for i in range(len(combinations))]
+
+
+@timing
+def run_sweep(strategy_name:str,
+              combinations:list[dict],
+              start_time:pd.Timestamp,
+              end_time:pd.Timestamp,
+              capital:float,
+              bundle:str,
+              processes:int,
+              label:str) -> list[tuple[str, dict, dict]]:
+    """Simulates every combination, returns (name, params, metrics) of each"""
+    base = se_models.STRATEGY_FUNC_MAP[strategy_name]
+    names = sweep_names(strategy_name, combinations)
+    makers = []
+    for name, params in zip(names, combinations):
+        executor = make_sweep_executor(base, name, params)
+        executor.make_pipeline()
+        makers.append(executor.pipeline_maker)
+    os.makedirs('results', exist_ok=True)
+    with tempfile.TemporaryDirectory(prefix='sweep-pipelines-', dir='results') as pipeline_dir:
+        # columns shared by the combinations are computed and saved once, workers map the files
+        pipeline_files = save_pipelines(
+            precompute_pipelines(bundles.load(bundle), makers, start_time, end_time), pipeline_dir)
+
+        with ProcessPoolExecutor(
+                max_workers=processes,
+                initializer=_init_worker,
+                initargs=(bundle, start_time, end_time)) as pool:
+            futures = [
+                pool.submit(_run_combination, strategy_name, name, params, files,
+                            start_time, end_time, capital, label)
+                for name, params, files in zip(names, combinations, pipeline_files)]
+            return [(name, params, future.result())
+                    for name, params, future in zip(names, combinations, futures)]
+
+
+# bundle data loaded once in each worker process
+_worker_data = {}
+
+def _init_worker(bundle:str, start_time:pd.Timestamp, end_time:pd.Timestamp):
+    supress_warnings()
+    bundle_data = bundles.load(bundle)
+    bars = DailyBars.from_bundle(bundle_data, start_time, end_time)
+    splits, dividends = load_corporate_actions(bundle_data.adjustment_reader, bars.sessions)
+    _worker_data.update(bundle_data=bundle_data, bars=bars, splits=splits, dividends=dividends)
+
+
+def _run_combination(strategy_name:str,
+                     name:str,
+                     params:dict,
+                     pipeline_files:PipelineFiles,
+                     start_time:pd.Timestamp,
+                     end_time:pd.Timestamp,
+                     capital:float,
+                     label:str) -> dict:
+    executor = make_sweep_executor(se_models.STRATEGY_FUNC_MAP[strategy_name], name, params)
+    executor.init(logger_util.DebugLogger(debug_level=0))
+    executor.make_pipeline()
+    simulator = DailySimulator(
+        executor,
+        _worker_data['bars'],
+        pipeline_files.load(),
+        capital,
+        asset_finder=_worker_data['bundle_data'].asset_finder,
+        splits=_worker_data['splits'],
+        dividends=_worker_data['dividends'])
+    perf = simulator.run(start_time, end_time)
+    utils.dump_replay_orders(name, start_time, end_time, executor, label, export_csv=True)
+    maxdd, ann_ret = utils.get_main_perf(perf)
+    return {'annual_return': ann_ret, 'max_drawdown': maxdd}
+
+
+if __name__ == '__main__':
+    run()
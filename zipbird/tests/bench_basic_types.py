@@ -0,0 +1,49 @@
+"""Microbenchmark of building signals, orders and stops.
+
+Builds n sets of an equity, an open signal, a share order with three stops
+and its opposite order, like a backtest does for every entry. Reports the
+time to build them and the memory they retain, measured with tracemalloc.
+
+    python -m zipbird.tests.bench_basic_types [-n 50000]
+"""
+import argparse
+import time
+import tracemalloc
+
+from zipbird.basic.order import ShareOrder
+from zipbird.basic.signal import Signal
+from zipbird.basic.stop import FixStop, PercentProfitTarget, PercentTrailingStop, StopOrder
+from zipbird.basic.types import Equity, LongShort
+
+
+def make_objects(n:int) -> list:
+    objects = []
+    for i in range(n):
+        signal = Signal.make_open_long(Equity(f'S{i}'))
+        order = ShareOrder(signal.stock, signal.open_close, signal.long_short, amount=100)
+        order.add_stop(StopOrder(initial_stop=FixStop(LongShort.Long, 2.),
+                                 profit_target=PercentProfitTarget(LongShort.Long, 0.1),
+                                 trailing=PercentTrailingStop(LongShort.Long, 10., 0.2)))
+        objects.append((signal, order, order.make_opposite_order(True, False)))
+    return objects
+
+
+def run(n:int):
+    # warm up, so the timed run does not pay for imports and caches
+    make_objects(n)
+    start = time.perf_counter()
+    make_objects(n)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    objects = make_objects(n)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'{n} sets built in {elapsed:.3f}s')
+    print(f'retained {retained / 1e6:.1f}MB, {retained / len(objects):.0f} bytes per set')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Builds signals, orders and stops')
+    parser.add_argument('-n', type=int, default=50_000)
+    run(parser.parse_args().n)
@@ -2,7 +2,7 @@ import unittest
 import pandas as pd
 
 from zipbird.basic.order import ShareOrder
-from zipbird.basic.signal import Signal
+from zipbird.basic.signal import Signal, SignalBatch
 from zipbird.basic.types import CloseStockNotInPortfolioException, ClosingInPositionSizerException, LongShort, OpenClose, Portfolio, Position
 from zipbird.position_manager.atr_position_sizer import ATRPositionSizer
 
@@ -44,6 +44,60 @@ class TestATRPositionSizer(unittest.TestCase):
         self.assert_open_order(orders[0], 'AAPL', 10)
         self.assert_open_order(orders[1], 'GOOG', 16, 50.0)
 
+    def test_get_orders_from_signal_batch(self):
+        params = {
+            'atr_period': 10,
+            'stop_loss_atr_multiple': 3,
+            'stop_loss_days': 4,
+            'max_equity_per_position': 0.1,
+            'fraction_risk': 0.02,
+            'price_target_atr_multiple': 2,
+            'trailing_stop_percent': 0.2,
+        }
+        sizer = ATRPositionSizer(params)
+        portfolio = Portfolio(portfolio_value=10000, positions={})
+        pipeline_data = pd.DataFrame({
+            'close': {'AAPL': 100., 'GOOG': 10., 'AMZN': 300.},
+            'atr_10': {'AAPL': 3., 'GOOG': float('nan'), 'AMZN': 5.},
+        })
+        signals = [
+            Signal.make_open_long('AAPL'),
+            Signal.make_open_short('GOOG', 12.0),
+        ]
+        orders = sizer.get_orders(
+            portfolio, SignalBatch.from_signals(signals, pipeline_data.index), pipeline_data)
+        self.assertEqual([repr(o) for o in orders],
+                         [repr(o) for o in sizer.get_orders(portfolio, signals, pipeline_data)])
+        self.assert_open_order(orders[0], 'AAPL', 10)
+        self.assertEqual(orders[1].long_short, LongShort.Short)
+        # no atr, risk is half of the close
+        self.assertEqual(orders[1].amount, 40)
+        self.assertEqual(orders[1].limit_price, 12.0)
+        self.assertEqual(orders[0].stop.initial_stop.diff_price, 9)
+        self.assertEqual(orders[0].stop.profit_target.diff, 6)
+        self.assertEqual(orders[0].stop.trailing_stop.enter_price, 100)
+
+    def test_get_orders_nan_close(self):
+        params = {
+            'atr_period': 10,
+            'stop_loss_atr_multiple': 3,
+            'stop_loss_days': 4,
+            'max_equity_per_position': 0.1,
+            'fraction_risk': 0.02
+        }
+        sizer = ATRPositionSizer(params)
+        portfolio = Portfolio(portfolio_value=10000, positions={})
+        pipeline_data = pd.DataFrame({
+            'close': {'AAPL': 100., 'GOOG': float('nan')},
+            'atr_10': {'AAPL': 3., 'GOOG': float('nan')},
+        })
+        signals = [
+            Signal.make_open_long('AAPL'),
+            Signal.make_open_long('GOOG'),
+        ]
+        with self.assertRaises(ValueError):
+            sizer.get_orders(portfolio, signals, pipeline_data)
+
     def assert_open_order(self, order, stock, amount, limit_price=None):
         self.assertEqual(order.stock, stock)
         self.assertEqual(order.amount, amount)
@@ -0,0 +1,165 @@
+import datetime
+import unittest
+
+import numpy as np
+import pandas as pd
+import zipline.api as zipline_api
+from zipline.finance.execution import LimitOrder, StopOrder
+
+from zipbird.basic.types import Equity
+from zipbird.strategy.daily_simulator import (
+    DailyBars, DailySimulator, fill_price, run_simulators)
+
+SESSIONS = pd.DatetimeIndex(pd.bdate_range('2020-01-06', periods=6))
+
+
+class FakePipeline:
+    def for_trade_day(self, day):
+        return pd.DataFrame()
+
+
+class FakeExecutor:
+    """Runs the orders function of each session with the zipline api"""
+    def __init__(self, orders_by_day=None):
+        self.orders_by_day = orders_by_day or {}
+        self.portfolios = []
+        self.fills = []
+
+    def get_order_fill_callback(self):
+        def callback(asset, price, amount, order):
+            self.fills.append((asset, price, amount))
+        return callback
+
+    def run(self, portfolio, pipeline_data):
+        self.portfolios.append((portfolio.portfolio_value, portfolio.get_cash_after_close(),
+                                {a: p.amount for a, p in portfolio.positions.items()}))
+        send_orders = self.orders_by_day.get(portfolio.today)
+        if send_orders:
+            send_orders()
+
+
+def make_bars(assets):
+    closes = np.tile(np.arange(10., 10. + len(SESSIONS))[:, None], (1, len(assets)))
+    opens = closes - 0.5
+    return DailyBars(SESSIONS, assets, opens, closes + 1, closes - 2, closes)
+
+
+class TestFillPrice(unittest.TestCase):
+
+    def test_market(self):
+        self.assertEqual(10, fill_price(5, None, None, 10, 12, 9))
+        self.assertEqual(10, fill_price(-5, None, None, 10, 12, 9))
+
+    def test_limit(self):
+        self.assertEqual(10, fill_price(5, 11, None, 10, 12, 9))
+        self.assertEqual(9.5, fill_price(5, 9.5, None, 10, 12, 9))
+        self.assertTrue(np.isnan(fill_price(5, 8, None, 10, 12, 9)))
+        self.assertEqual(11, fill_price(-5, 11, None, 10, 12, 9))
+        self.assertTrue(np.isnan(fill_price(-5, 13, None, 10, 12, 9)))
+
+    def test_stop(self):
+        self.assertEqual(9.5, fill_price(-5, None, 9.5, 10, 12, 9))
+        # gapped below the stop
+        self.assertEqual(10, fill_price(-5, None, 11, 10, 12, 9))
+        self.assertTrue(np.isnan(fill_price(-5, None, 8, 10, 12, 9)))
+        self.assertEqual(11, fill_price(5, None, 11, 10, 12, 9))
+        self.assertTrue(np.isnan(fill_price(5, None, 13, 10, 12, 9)))
+
+
+class TestDailySimulator(unittest.TestCase):
+
+    def setUp(self):
+        self.aaa = Equity('AAA')
+        self.bbb = Equity('BBB', auto_close_date=datetime.date(2020, 1, 9))
+        self.bars = make_bars([self.aaa, self.bbb])
+
+    def simulate(self, orders_by_day, splits=None):
+        executor = FakeExecutor({day.date(): send for day, send in orders_by_day.items()})
+        simulator = DailySimulator(executor, self.bars, FakePipeline(), 10_000,
+                                   splits=splits, commission_per_share=0.01)
+        perf = simulator.run(SESSIONS[1], SESSIONS[-1])
+        return simulator, executor, perf
+
+    def test_market_order(self):
+        simulator, executor, perf = self.simulate(
+            {SESSIONS[1]: lambda: zipline_api.order(self.aaa, 100)})
+        # fills at the open of SESSIONS[1]
+        self.assertEqual([(self.aaa, 10.5, 100)], executor.fills)
+        transaction = perf.transactions.iloc[0][0]
+        self.assertEqual(10.5, transaction['price'])
+        self.assertAlmostEqual(1.0, transaction['commission'])
+        self.assertAlmostEqual(10_000 - 1050 - 1, perf.ending_cash.iloc[0])
+        position = simulator.positions[self.aaa]
+        self.assertEqual(100, position.amount)
+        self.assertAlmostEqual(10.51, position.cost_basis)
+        # valued at the close
+        self.assertAlmostEqual(10_000 - 1051 + 1100, perf.portfolio_value.iloc[0])
+        self.assertAlmostEqual(perf.portfolio_value.iloc[0] / 10_000 - 1, perf.returns.iloc[0])
+        self.assertAlmostEqual(perf.portfolio_value.iloc[-1], 10_000 - 1051 + 1500)
+        self.assertEqual(list(SESSIONS[1:].tz_localize('UTC')), list(perf.index))
+
+    def test_open_orders_and_cancel(self):
+        def send():
+            zipline_api.order(self.aaa, 10, style=LimitOrder(5))
+            zipline_api.order(self.aaa, -10, style=StopOrder(1))
+
+        def cancel():
+            open_orders = zipline_api.get_open_orders()
+            self.assertEqual(2, len(open_orders[self.aaa]))
+            zipline_api.cancel_order(open_orders[self.aaa][0])
+
+        simulator, executor, perf = self.simulate({SESSIONS[1]: send, SESSIONS[2]: cancel})
+        self.assertEqual([], executor.fills)
+        self.assertEqual(1, len(simulator.get_open_orders(self.aaa)))
+        self.assertEqual(1, simulator.get_open_orders(self.aaa)[0].stop)
+
+    def test_order_target_percent(self):
+        simulator, executor, perf = self.simulate(
+            {SESSIONS[1]: lambda: zipline_api.order_target_percent(self.aaa, 0.5),
+             SESSIONS[3]: lambda: zipline_api.order_target_percent(self.aaa, 0)})
+        # half of the portfolio at the last close of 10
+        self.assertEqual((self.aaa, 10.5, 500), executor.fills[0])
+        self.assertEqual((self.aaa, 12.5, -500), executor.fills[1])
+        self.assertNotIn(self.aaa, simulator.positions)
+        self.assertAlmostEqual(10_000 + 500 * 2 - 10, perf.ending_cash.iloc[-1])
+
+    def test_auto_close(self):
+        simulator, executor, perf = self.simulate(
+            {SESSIONS[1]: lambda: zipline_api.order(self.bbb, 10)})
+        self.assertNotIn(self.bbb, simulator.positions)
+        # closed at the last close before the auto close date
+        closing = perf.transactions.loc[SESSIONS[3].tz_localize('UTC')][0]
+        self.assertEqual(-10, closing['amount'])
+        self.assertEqual(12, closing['price'])
+        self.assertIsNone(closing['order_id'])
+
+    def test_split(self):
+        splits = {SESSIONS[2]: [(self.aaa.sid, 0.5)]}
+        simulator, executor, perf = self.simulate(
+            {SESSIONS[1]: lambda: zipline_api.order(self.aaa, 101)}, splits=splits)
+        position = simulator.positions[self.aaa]
+        self.assertEqual(202, position.amount)
+        # the strategy sees the position after the split
+        self.assertEqual(202, executor.portfolios[1][2][self.aaa])
+        self.assertAlmostEqual(perf.portfolio_value.iloc[0], executor.portfolios[1][0])
+
+    def test_run_simulators(self):
+        def make_simulators():
+            buy_aaa = FakeExecutor({SESSIONS[1].date(): lambda: zipline_api.order_target_percent(self.aaa, 0.5)})
+            buy_bbb = FakeExecutor({SESSIONS[1].date(): lambda: zipline_api.order(self.bbb, 100),
+                                    SESSIONS[2].date(): lambda: zipline_api.order(self.aaa, -50)})
+            return [DailySimulator(executor, self.bars, FakePipeline(), capital)
+                    for executor, capital in ((buy_aaa, 10_000), (buy_bbb, 20_000))]
+
+        together = run_simulators(make_simulators(), SESSIONS[1], SESSIONS[-1])
+        for i, simulator in enumerate(make_simulators()):
+            alone = simulator.run(SESSIONS[1], SESSIONS[-1])
+            self.assertEqual(list(alone.portfolio_value), list(together[i].portfolio_value))
+            self.assertEqual(list(alone.transactions.map(len)), list(together[i].transactions.map(len)))
+        # the orders of each strategy only go to its own portfolio
+        self.assertEqual([500], [t['amount'] for t in together[0].transactions.iloc[0]])
+        self.assertEqual([-50], [t['amount'] for t in together[1].transactions.iloc[1]])
+
+
+if __name__ == '__main__':
+    unittest.main()
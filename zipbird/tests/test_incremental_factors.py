@@ -0,0 +1,147 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+import talib
+
+from zipbird.utils import factor_utils, incremental_factors, wilder_smoothing
+from zipbird.tests.test_wilder_smoothing import make_prices
+
+TOLERANCE = 1e-9
+
+
+def run_sessions(factor, inputs, params, window_length, sids=None, first_day=0):
+    """Calls factor.compute once per session like the pipeline engine does.
+
+    Returns the output of every session as rows of a (sessions x assets) array.
+    """
+    n_rows, n_cols = inputs[0].shape
+    sids = np.arange(n_cols) if sids is None else sids
+    days = pd.bdate_range('2020-01-01', periods=n_rows)
+    result = np.full((n_rows, n_cols), np.nan)
+    for row in range(max(window_length - 1, first_day), n_rows):
+        windows = [values[row - window_length + 1:row + 1] for values in inputs]
+        out = np.empty(n_cols)
+        factor.compute(days[row], sids, out, *windows, **params)
+        result[row] = out
+    return result
+
+
+class TestIncrementalFactors(unittest.TestCase):
+
+    def test_sma(self):
+        _, _, closes = make_prices()
+        factor = incremental_factors.IncrementalSMAFactor(sma_len=20, window_length=21)
+        result = run_sessions(factor, [closes], {'sma_len': 20}, 21)
+        for row in range(20, len(closes)):
+            expected = np.array([np.nan if np.isnan(c).all() else np.nanmean(c)
+                                 for c in closes[row - 19:row + 1].T])
+            np.testing.assert_allclose(result[row], expected, rtol=TOLERANCE, equal_nan=True)
+
+    def test_std_percent(self):
+        _, _, closes = make_prices()
+        # no NaN here as StdFactorPercent does not skip them
+        closes = closes[:, 5:]
+        closes = closes[:, ~np.isnan(closes).any(axis=0)]
+        factor = incremental_factors.IncrementalStdPercentFactor(std_len=30, window_length=31)
+        result = run_sessions(factor, [closes], {'std_len': 30}, 31)
+        reference = factor_utils.StdFactorPercent(window_length=30)
+        for row in range(30, len(closes)):
+            expected = np.empty(closes.shape[1])
+            reference.compute(None, None, expected, closes[row - 29:row + 1])
+            np.testing.assert_allclose(result[row], expected, rtol=1e-6)
+
+    def test_max_in_window(self):
+        _, _, closes = make_prices()
+        factor = incremental_factors.IncrementalMaxInWindowFactor(window_length=10)
+        result = run_sessions(factor, [closes], {}, 10)
+        for row in range(9, len(closes)):
+            np.testing.assert_array_equal(result[row], np.max(closes[row - 9:row + 1], axis=0))
+
+    def test_roc(self):
+        _, _, closes = make_prices()
+        factor = incremental_factors.IncrementalROCFactor(roc_len=12, window_length=13)
+        result = run_sessions(factor, [closes], {'roc_len': 12}, 13)
+        expected = np.column_stack([talib.ROCP(c, timeperiod=12) for c in closes.T])
+        np.testing.assert_allclose(result[12:], expected[12:], atol=TOLERANCE, equal_nan=True)
+
+    def test_wilder_factors_match_full_history(self):
+        highs, lows, closes = make_prices()
+        # no gaps, so the full history starts with the first window
+        highs, lows, closes = (values[:, 1::4] for values in (highs, lows, closes))
+        window_length = 40
+        cases = [
+            (incremental_factors.IncrementalRSIFactor, [closes], {'rsi_len': 5},
+             wilder_smoothing.rsi(closes, 5)),
+            (incremental_factors.IncrementalATRFactor, [closes, highs, lows], {'atr_len': 7},
+             wilder_smoothing.atr(highs, lows, closes, 7)),
+            (incremental_factors.IncrementalATRPFactor, [closes, highs, lows], {'atr_len': 7},
+             wilder_smoothing.natr(highs, lows, closes, 7)),
+            (incremental_factors.IncrementalADXFactor, [closes, highs, lows], {'adx_len': 7},
+             wilder_smoothing.adx(highs, lows, closes, 7)),
+        ]
+        for factor_class, inputs, params, expected in cases:
+            with self.subTest(factor_class.__name__):
+                factor = factor_class(window_length=window_length, **params)
+                result = run_sessions(factor, inputs, params, window_length)
+                np.testing.assert_allclose(result[window_length - 1:],
+                                           expected[window_length - 1:],
+                                           rtol=0, atol=TOLERANCE, equal_nan=True)
+
+    def test_adjusted_history_reseeds(self):
+        _, _, closes = make_prices()
+        closes = closes[:, 1::4]
+        factor = incremental_factors.IncrementalRSIFactor(rsi_len=5, window_length=30)
+        days = pd.bdate_range('2020-01-01', periods=len(closes))
+        sids = np.arange(closes.shape[1])
+        out = np.empty(closes.shape[1])
+        for row in range(29, 60):
+            factor.compute(days[row], sids, out, closes[row - 29:row + 1], rsi_len=5)
+        # a 2:1 split on the next day rewrites the history of the first asset
+        adjusted = closes.copy()
+        adjusted[:61, 0] /= 2
+        factor.compute(days[60], sids, out, adjusted[31:61], rsi_len=5)
+        expected = wilder_smoothing.rsi(adjusted[31:61], 5)[-1]
+        self.assertAlmostEqual(out[0], expected[0], delta=TOLERANCE)
+        self.assertNotAlmostEqual(out[1], expected[1], delta=TOLERANCE)
+
+    def test_assets_entering_and_leaving(self):
+        _, _, closes = make_prices()
+        closes = closes[:, 1::4]
+        factor = incremental_factors.IncrementalSMAFactor(sma_len=5, window_length=6)
+        days = pd.bdate_range('2020-01-01', periods=len(closes))
+        out = np.empty(2)
+        for row in range(5, 40):
+            # asset 7 leaves the universe for a while, asset 3 is always there
+            sids = np.array([3, 7]) if row < 20 or row > 30 else np.array([3, 9])
+            window = closes[row - 5:row + 1][:, sids]
+            factor.compute(days[row], sids, out, window, sma_len=5)
+            np.testing.assert_allclose(out, window[1:].mean(axis=0), rtol=TOLERANCE)
+
+    def test_new_run_starts_from_scratch(self):
+        _, _, closes = make_prices()
+        closes = closes[:, 1::4]
+        factor = incremental_factors.IncrementalRSIFactor(rsi_len=5, window_length=30)
+        run_sessions(factor, [closes], {'rsi_len': 5}, 30)
+        result = run_sessions(factor, [closes], {'rsi_len': 5}, 30, first_day=80)
+        expected = wilder_smoothing.rsi(closes[51:81], 5)[-1]
+        np.testing.assert_allclose(result[80], expected, atol=TOLERANCE)
+
+    def test_missing_methods_fail_on_construction(self):
+        class NoSeedFactor(incremental_factors.IncrementalFactor):
+            inputs = (incremental_factors.USEquityPricing.close,)
+            window_length = 2
+            state_names = ('value',)
+
+            def step(self, state, rows):
+                return state
+
+            def output(self, state, rows):
+                return state[0]
+
+        with self.assertRaises(TypeError):
+            NoSeedFactor()
+
+
+if __name__ == '__main__':
+    unittest.main()
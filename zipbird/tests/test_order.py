@@ -2,6 +2,7 @@ import unittest
 
 from zipbird.basic.types import LongShort, OpenClose
 from zipbird.basic.order import ShareOrder, PercentOrder
+from zipbird.basic.stop import FixStop, StopOrder
 
 class TestOrder(unittest.TestCase):
     def test_create_order_long(self):
@@ -40,4 +41,23 @@ class TestOrder(unittest.TestCase):
         self.assertEqual(order.stock, 'AAPL')
         self.assertEqual(order.open_close, OpenClose.Open)
         self.assertEqual(order.long_short, LongShort.Short)
-        self.assertEqual(order.target_percent, 0.1)
\ No newline at end of file
+        self.assertEqual(order.target_percent, 0.1)
+
+    def test_order_ids(self):
+        first = ShareOrder.make_open_long('AAPL', 100)
+        second = ShareOrder.make_open_long('AAPL', 100)
+        self.assertIsInstance(first.order_id, int)
+        self.assertNotEqual(first.order_id, second.order_id)
+
+    def test_make_opposite_order(self):
+        order = ShareOrder.make_open_long('AAPL', 100, limit_price=12.)
+        order.add_stop(StopOrder(initial_stop=FixStop(LongShort.Long, 2.)))
+        order.inc_bar_count()
+        opposite = order.make_opposite_order(keep_stop=True, keep_limit=False)
+        self.assertIsInstance(opposite, ShareOrder)
+        self.assertEqual(OpenClose.Close, opposite.open_close)
+        self.assertEqual(100, opposite.amount)
+        self.assertIsNone(opposite.limit_price)
+        self.assertEqual(order.order_id, opposite.order_id)
+        self.assertIs(order.stop, opposite.stop)
+        self.assertEqual(1, opposite.get_bar_count())
@@ -0,0 +1,69 @@
+import sqlite3
+import unittest
+
+import numpy as np
+import pandas as pd
+from zipline.pipeline import Pipeline, SimplePipelineEngine
+from zipline.pipeline.data import USEquityPricing
+from zipline.pipeline.domain import US_EQUITIES
+from zipline.pipeline.factors import SimpleMovingAverage
+from zipline.pipeline.loaders.frame import DataFrameLoader
+from zipline.testing.core import tmp_asset_finder
+
+from zipbird.strategy import pipleine_const as const
+from zipbird.strategy.pipeline_engine_dump import dump_with_engine
+from zipbird.strategy.pipeline_saver import PipelineSaver
+from zipbird.utils import logger_util
+from zipbird.utils.timer_context import TimerContext
+
+DEBUG_LOGGER = logger_util.DebugLogger()
+
+
+class TestStrategy:
+    def prepare_pipeline_columns(self, pipeline_maker):
+        pass
+
+
+class TestPipelineEngineDump(unittest.TestCase):
+
+    def test_dump_with_engine(self):
+        sessions = US_EQUITIES.calendar.sessions_in_range(
+            pd.Timestamp('2020-01-02'), pd.Timestamp('2020-03-31'))
+        equities = pd.DataFrame({
+            'symbol': ['AAA', 'BBB'],
+            'start_date': sessions[0],
+            'end_date': sessions[-1],
+            'exchange': 'NYSE'})
+        exchanges = pd.DataFrame({'exchange': ['NYSE'], 'country_code': ['US']})
+        closes = np.arange(len(sessions) * 2, dtype=float).reshape(-1, 2) + 10
+        db_conn = sqlite3.connect(':memory:')
+        with tmp_asset_finder(equities=equities, exchanges=exchanges) as finder:
+            loader = DataFrameLoader(
+                USEquityPricing.close,
+                pd.DataFrame(closes, index=sessions, columns=finder.sids))
+            engine = SimplePipelineEngine(lambda column: loader, finder, default_domain=US_EQUITIES)
+            pipeline = Pipeline({'sma_5': SimpleMovingAverage(
+                inputs=[USEquityPricing.close], window_length=5)})
+
+            saver = PipelineSaver(strategies=[TestStrategy()], db_conn=db_conn)
+            saver.init(DEBUG_LOGGER, sessions[10], sessions[-1])
+            timer_context = TimerContext()
+            recorded = dump_with_engine(engine, pipeline, saver, sessions[10], sessions[-1],
+                                        timer_context, chunk_sessions=7)
+            saver.create_index()
+
+        self.assertEqual((len(sessions) - 10) * 2, recorded)
+        self.assertEqual(recorded, timer_context.counts['record_pipeline_data'])
+        rows = db_conn.execute(f"""
+            SELECT {const.TRADE_DAY}, {const.TICKER}, {const.IND_VALUE}
+            FROM {const.TABLE_NAME} ORDER BY 1, 2""").fetchall()
+        # unlike the bundle loader, DataFrameLoader does not shift data by a session
+        self.assertEqual((const.format_trade_day(sessions[10]), 'AAA', closes[6:11, 0].mean()),
+                         rows[0])
+        self.assertEqual((const.format_trade_day(sessions[-1]), 'BBB', closes[-5:, 1].mean()),
+                         rows[-1])
+        db_conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,12 +1,16 @@
 
+import os
 import sqlite3
+import tempfile
 import unittest
+import numpy as np
 import pandas as pd
 
 from zipbird.utils import logger_util
 from zipbird.strategy import pipleine_const as const
 from zipbird.strategy.pipeline_maker import PipelineMaker
 from zipbird.strategy.pipeline_saver import MismatchDateRangeException, PipelineSaver
+from zipbird.strategy.pipeline_store import SqlitePipelineStore
 from zipbird.basic.types import Equity
 
 class TestStrategy:   
@@ -104,4 +108,105 @@ class TestPipelineSaver(unittest.TestCase):
         self.assertEqual(6, len(self.get_all_records()))
         
         self.saver.record_pipeline_data(pd.Timestamp(DAY2), DF)
-        self.assertEqual(12, len(self.get_all_records()))
\ No newline at end of file
+        self.assertEqual(12, len(self.get_all_records()))
+
+    def test_record_skips_nan(self):
+        df = DF.astype(float)
+        df.iloc[0, 1] = np.nan
+        df.iloc[1, 2] = np.nan
+        self.assertEqual(4, self.saver.record_pipeline_data(pd.Timestamp(DAY1), df))
+        records = self.get_all_records()
+        self.assertEqual(4, len(records))
+        self.assertIn((DAY1, 'TSLA', 'close', TICKERS[1].sid, 39.), records)
+        self.assertNotIn('adx_10', [name for _, ticker, name, _, _ in records if ticker == 'TSLA'])
+
+    def test_commit_in_batches(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_name = os.path.join(tmp_dir, 'pipeline.db')
+            db_conn = sqlite3.connect(db_name)
+            store = SqlitePipelineStore(db_conn, commit_days=2)
+            store.prepare(start_fresh=False)
+            db_conn.commit()
+            reader = sqlite3.connect(db_name)
+            count_sql = f'SELECT COUNT(*) FROM {const.TABLE_NAME}'
+
+            store.record(pd.Timestamp(DAY1), DF)
+            self.assertEqual(0, reader.execute(count_sql).fetchone()[0])
+            store.record(pd.Timestamp(DAY2), DF)
+            self.assertEqual(12, reader.execute(count_sql).fetchone()[0])
+            store.record(pd.Timestamp(DAY3), DF)
+            store.finish()
+            self.assertEqual(18, reader.execute(count_sql).fetchone()[0])
+            reader.close()
+            db_conn.close()
+
+    def test_merge_from(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            shard_conn = sqlite3.connect(os.path.join(tmp_dir, 'shard.db'))
+            shard = SqlitePipelineStore(shard_conn)
+            shard.prepare(start_fresh=True)
+            shard.record(pd.Timestamp(DAY2), DF)
+            shard.finish()
+            self.saver.record_pipeline_data(pd.Timestamp(DAY1), DF)
+            self.saver.store.merge_from(shard)
+            shard_conn.close()
+        self.assertEqual(12, len(self.get_all_records()))
+
+    def test_skip_days_before_start(self):
+        self.assertEqual(0, self.saver.record_pipeline_data(pd.Timestamp('2011-12-30'), DF))
+        self.assertEqual(0, len(self.get_all_records()))
+
+    def test_exclude_columns(self):
+        saver2 = PipelineSaver(strategies=[TestStrategy2()],
+                               db_conn=self.db_conn,
+                               start_fresh=True)
+        saver2.init(DEBUG_LOGGER, pd.Timestamp(DAY1), pd.Timestamp(DAY2),
+                    exclude_columns=['close', 'atrp_30'])
+        self.assertEqual('adx_10,atrp_20', saver2._get_metadata('columns'))
+
+    def test_init_append(self):
+        self.saver.record_pipeline_data(pd.Timestamp(DAY1), DF)
+        saver2 = PipelineSaver(strategies=[TestStrategy2()], db_conn=self.db_conn)
+        self.assertEqual(pd.Timestamp('2013-01-01'),
+                         saver2.init_append(DEBUG_LOGGER, pd.Timestamp(DAY3)))
+        # only the stored columns
+        self.assertEqual(['close', 'adx_10', 'atrp_20'], list(saver2.pipeline_maker.get_columns()))
+        self.assertEqual(0, saver2.record_pipeline_data(pd.Timestamp(DAY2), DF))
+        saver2.record_pipeline_data(pd.Timestamp('2013-01-02'), DF)
+        # end day moves only when done
+        self.assertEqual(DAY2, saver2._get_metadata('end_day'))
+        saver2.create_index()
+        self.assertEqual(DAY3, saver2._get_metadata('end_day'))
+        self.assertEqual(DAY1, saver2._get_metadata('start_day'))
+        self.assertEqual(12, len(self.get_all_records()))
+
+        saver3 = PipelineSaver(strategies=[TestStrategy()], db_conn=self.db_conn)
+        self.assertIsNone(saver3.init_append(DEBUG_LOGGER, pd.Timestamp(DAY3)))
+
+    def test_init_append_missing_columns(self):
+        class TestStrategy3:
+            def prepare_pipeline_columns(self, pipeline_maker:PipelineMaker):
+                pipeline_maker.add_adx(10)
+        saver2 = PipelineSaver(strategies=[TestStrategy3()], db_conn=self.db_conn)
+        with self.assertRaises(MismatchDateRangeException):
+            saver2.init_append(DEBUG_LOGGER, pd.Timestamp(DAY3))
+
+    def test_init_append_empty_store(self):
+        saver2 = PipelineSaver(strategies=[TestStrategy()], db_conn=self.db_conn, start_fresh=True)
+        with self.assertRaises(MismatchDateRangeException):
+            saver2.init_append(DEBUG_LOGGER, pd.Timestamp(DAY3))
+
+    def test_init_new_columns(self):
+        self.saver.record_pipeline_data(pd.Timestamp(DAY1), DF)
+        saver2 = PipelineSaver(strategies=[TestStrategy2()], db_conn=self.db_conn)
+        self.assertEqual((pd.Timestamp(DAY1), pd.Timestamp(DAY2)),
+                         saver2.init_new_columns(DEBUG_LOGGER))
+        self.assertEqual(['atrp_30'], list(saver2.pipeline_maker.get_columns()))
+        saver2.record_pipeline_data(pd.Timestamp(DAY1), DF[['atr_10']].rename(columns={'atr_10': 'atrp_30'}))
+        self.assertEqual('close,adx_10,atrp_20', saver2._get_metadata('columns'))
+        saver2.create_index()
+        self.assertEqual('close,adx_10,atrp_20,atrp_30', saver2._get_metadata('columns'))
+        self.assertEqual(8, len(self.get_all_records()))
+
+        saver3 = PipelineSaver(strategies=[TestStrategy2()], db_conn=self.db_conn)
+        self.assertIsNone(saver3.init_new_columns(DEBUG_LOGGER))
@@ -0,0 +1,85 @@
+import sqlite3
+import unittest
+
+import pandas as pd
+
+from zipbird.strategy.pipeline_maker import PipelineMaker
+from zipbird.strategy.pipeline_shards import plan_shards, split_by_year
+from zipbird.strategy.pipeline_store import SqlitePipelineStore
+
+T = pd.Timestamp
+
+
+def shard_ranges(shards):
+    return [(f'{shard.start_day:%Y-%m-%d}', f'{shard.end_day:%Y-%m-%d}') for shard in shards]
+
+
+class TestPipelineShards(unittest.TestCase):
+
+    def setUp(self):
+        self.db_conn = sqlite3.connect(':memory:')
+        self.store = SqlitePipelineStore(self.db_conn)
+        self.store.prepare(start_fresh=True)
+
+    def tearDown(self):
+        self.db_conn.close()
+
+    def test_split_by_year(self):
+        self.assertEqual(
+            [(T('2014-03-05'), T('2014-12-31')),
+             (T('2015-01-01'), T('2015-06-30')),
+             (T('2015-07-01'), T('2015-12-31')),
+             (T('2016-01-01'), T('2016-02-01'))],
+            split_by_year(T('2014-03-05'), T('2016-02-01'), [T('2015-07-01'), T('2020-01-01')]))
+        self.assertEqual([(T('2015-01-05'), T('2015-03-01'))],
+                         split_by_year(T('2015-01-05'), T('2015-03-01')))
+
+    def test_plan_empty_store(self):
+        shards, metadata = plan_shards(
+            self.store, ['close', 'rsi_3'], T('2014-06-01'), T('2016-03-01'))
+        self.assertEqual([('2014-06-01', '2014-12-31'),
+                          ('2015-01-01', '2015-12-31'),
+                          ('2016-01-01', '2016-03-01')], shard_ranges(shards))
+        self.assertTrue(all(shard.exclude_columns == [] for shard in shards))
+        self.assertEqual({'start_day': '2014-06-01', 'end_day': '2016-03-01',
+                          'columns': 'close,rsi_3'}, metadata)
+
+    def test_plan_extending_range(self):
+        self.store.upsert_metadata(
+            {'start_day': '2015-01-01', 'end_day': '2015-06-30', 'columns': 'close,adx_10'})
+        shards, metadata = plan_shards(
+            self.store, ['close', 'rsi_3'], T('2015-03-01'), T('2016-03-01'))
+        # the stored days only need the new column
+        self.assertEqual([('2015-01-01', '2015-06-30'),
+                          ('2015-07-01', '2015-12-31'),
+                          ('2016-01-01', '2016-03-01')], shard_ranges(shards))
+        self.assertEqual(['close', 'adx_10'], shards[0].exclude_columns)
+        self.assertEqual([], shards[1].exclude_columns)
+        # adx_10 is not on the new days
+        self.assertEqual({'start_day': '2015-01-01', 'end_day': '2016-03-01',
+                          'columns': 'close,rsi_3'}, metadata)
+
+    def test_plan_new_columns_only(self):
+        self.store.upsert_metadata(
+            {'start_day': '2015-01-01', 'end_day': '2015-12-31', 'columns': 'close,adx_10'})
+        shards, metadata = plan_shards(
+            self.store, ['close', 'adx_10'], T('2015-01-01'), T('2015-12-31'))
+        self.assertEqual([], shards)
+        shards, metadata = plan_shards(
+            self.store, ['close', 'rsi_3'], T('2015-01-01'), T('2015-12-31'))
+        self.assertEqual([('2015-01-01', '2015-12-31')], shard_ranges(shards))
+        self.assertEqual('close,adx_10,rsi_3', metadata['columns'])
+
+    def test_max_window_length(self):
+        pipeline_maker = PipelineMaker()
+        pipeline_maker.add_dollar_volume_rank_universe(
+            max_rank=500, min_close=1.0, window_length=300)
+        pipeline_maker.add_rsi(3)
+        pipeline_maker.add_sma(200)
+        self.assertEqual(300, pipeline_maker.max_window_length())
+        pipeline_maker.add_sma(400)
+        self.assertEqual(400, pipeline_maker.max_window_length())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,310 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from zipbird.basic.types import Equity
+from zipbird.strategy.pipeline_loader import PipelineLoader
+from zipbird.strategy.pipeline_saver import PipelineSaver
+from zipbird.strategy import pipleine_const as const
+from zipbird.strategy.pipeline_store import CompactSqlitePipelineStore, NpyPipelineStore, PipelineStore
+from zipbird.utils import logger_util
+from zipbird.utils.timer_context import TimerContext
+from zipbird.tests.test_pipeline_loader import TestStrategy, TestStrategy2
+
+DEBUG_LOGGER = logger_util.DebugLogger()
+
+AAPL = Equity('AAPL')
+AAPL.sid = 1
+TSLA = Equity('TSLA')
+TSLA.sid = 2
+MSFT = Equity('MSFT')
+MSFT.sid = 3
+
+
+def make_df(values:dict, assets:list[Equity]) -> pd.DataFrame:
+    return pd.DataFrame(values, index=assets)
+
+
+class TestNpyPipelineStore(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def make_store(self, start_fresh=False) -> NpyPipelineStore:
+        store = NpyPipelineStore(self.path)
+        store.prepare(start_fresh)
+        return store
+
+    def test_partial_store_fails_on_construction(self):
+        class RecordOnlyStore(PipelineStore):
+            def record(self, trade_day, pipeline_data):
+                return 0
+
+        with self.assertRaises(TypeError):
+            RecordOnlyStore()
+
+    def test_record_and_load(self):
+        store = self.make_store()
+        store.record(pd.Timestamp('2012-01-03'),
+                     make_df({'close': [20., 39.], 'adx_10': [1., np.nan]}, [AAPL, TSLA]))
+        store.record(pd.Timestamp('2012-01-04'),
+                     make_df({'close': [21., 5.], 'adx_10': [2., 3.]}, [AAPL, MSFT]))
+        store.record(pd.Timestamp('2013-01-02'),
+                     make_df({'close': [22.], 'adx_10': [4.]}, [TSLA]))
+        store.finish()
+
+        chunk = store.load_chunk(pd.Timestamp('2012-01-03'), pd.Timestamp('2013-12-31'),
+                                 ['close', 'adx_10'])
+        self.assertTrue(chunk.covers(pd.Timestamp('2012-01-04')))
+        self.assertFalse(chunk.covers(pd.Timestamp('2013-01-02')))
+        df = chunk.for_trade_day(pd.Timestamp('2012-01-03'))
+        self.assertEqual([1, 2], list(df.index))
+        self.assertEqual(39., df.loc[2, 'close'])
+        self.assertTrue(np.isnan(df.loc[2, 'adx_10']))
+        # TSLA has no data on the second day
+        df = chunk.for_trade_day(pd.Timestamp('2012-01-04'))
+        self.assertEqual([1, 3], list(df.index))
+        self.assertEqual(3., df.loc[3, 'adx_10'])
+
+        chunk = store.load_chunk(pd.Timestamp('2013-01-02'), pd.Timestamp('2013-12-31'), ['close'])
+        df = chunk.for_trade_day(pd.Timestamp('2013-01-02'))
+        self.assertEqual(['close'], list(df.columns))
+        self.assertEqual(22., df.loc[2, 'close'])
+
+    def test_unknown_trade_day(self):
+        store = self.make_store()
+        store.record(pd.Timestamp('2012-01-03'), make_df({'close': [20.]}, [AAPL]))
+        store.finish()
+        chunk = store.load_chunk(pd.Timestamp('2012-01-03'), pd.Timestamp('2012-12-31'), ['close'])
+        with self.assertRaises(KeyError):
+            chunk.for_trade_day(pd.Timestamp('2012-01-05'))
+        with self.assertRaises(KeyError):
+            store.load_chunk(pd.Timestamp('2014-01-02'), pd.Timestamp('2014-12-31'), ['close'])
+
+    def test_merge_into_existing_segment(self):
+        store = self.make_store()
+        store.record(pd.Timestamp('2012-01-03'),
+                     make_df({'close': [20., 39.]}, [AAPL, TSLA]))
+        store.finish()
+        # a second run adds a column, a day and an asset
+        store = self.make_store()
+        store.record(pd.Timestamp('2012-01-03'),
+                     make_df({'close': [25., np.nan], 'rsi_3': [50., 60.]}, [AAPL, TSLA]))
+        store.record(pd.Timestamp('2012-01-04'),
+                     make_df({'close': [5.], 'rsi_3': [70.]}, [MSFT]))
+        store.finish()
+
+        chunk = store.load_chunk(pd.Timestamp('2012-01-03'), pd.Timestamp('2012-12-31'),
+                                 ['close', 'rsi_3'])
+        df = chunk.for_trade_day(pd.Timestamp('2012-01-03'))
+        self.assertEqual(25., df.loc[1, 'close'])
+        # a missing new value keeps the stored one
+        self.assertEqual(39., df.loc[2, 'close'])
+        self.assertEqual(60., df.loc[2, 'rsi_3'])
+        df = chunk.for_trade_day(pd.Timestamp('2012-01-04'))
+        self.assertEqual([3], list(df.index))
+        self.assertEqual(70., df.loc[3, 'rsi_3'])
+
+    def test_interrupted_merge_keeps_segment(self):
+        store = self.make_store()
+        store.record(pd.Timestamp('2012-01-03'), make_df({'close': [20.]}, [AAPL]))
+        store.finish()
+        store.record(pd.Timestamp('2012-01-04'), make_df({'close': [21.], 'rsi_3': [50.]}, [TSLA]))
+        with mock.patch('zipbird.strategy.pipeline_store._reindex', side_effect=OSError):
+            with self.assertRaises(OSError):
+                store.finish()
+        chunk = store.load_chunk(pd.Timestamp('2012-01-03'), pd.Timestamp('2012-12-31'), ['close'])
+        self.assertEqual(20., chunk.for_trade_day(pd.Timestamp('2012-01-03')).loc[1, 'close'])
+        with self.assertRaises(KeyError):
+            chunk.for_trade_day(pd.Timestamp('2012-01-04'))
+
+        # a swap interrupted between its renames is completed by the next write
+        os.rename(os.path.join(self.path, '2012'), os.path.join(self.path, '.2012.old'))
+        store = self.make_store()
+        store.record(pd.Timestamp('2012-01-04'), make_df({'close': [21.]}, [TSLA]))
+        store.finish()
+        self.assertEqual(['2012'], os.listdir(self.path))
+        chunk = store.load_chunk(pd.Timestamp('2012-01-03'), pd.Timestamp('2012-12-31'), ['close'])
+        self.assertEqual(20., chunk.for_trade_day(pd.Timestamp('2012-01-03')).loc[1, 'close'])
+        self.assertEqual(21., chunk.for_trade_day(pd.Timestamp('2012-01-04')).loc[2, 'close'])
+
+    def test_start_fresh(self):
+        store = self.make_store()
+        store.record(pd.Timestamp('2012-01-03'), make_df({'close': [20.]}, [AAPL]))
+        store.finish()
+        store.upsert_metadata({'start_day': '2012-01-03'})
+        store = self.make_store(start_fresh=True)
+        self.assertIsNone(store.get_metadata('start_day'))
+        self.assertEqual([], os.listdir(self.path))
+
+    def test_column_names_are_quoted(self):
+        store = self.make_store()
+        store.record(pd.Timestamp('2012-01-03'),
+                     make_df({'vol%tile_20': [0.5], 'i_S&P/500': [1.]}, [AAPL]))
+        store.finish()
+        chunk = store.load_chunk(pd.Timestamp('2012-01-03'), pd.Timestamp('2012-12-31'),
+                                 ['vol%tile_20', 'i_S&P/500'])
+        df = chunk.for_trade_day(pd.Timestamp('2012-01-03'))
+        self.assertEqual(0.5, df.loc[1, 'vol%tile_20'])
+        self.assertEqual(1., df.loc[1, 'i_S&P/500'])
+
+    def test_metadata(self):
+        store = self.make_store()
+        self.assertIsNone(store.get_metadata('start_day'))
+        store.upsert_metadata({'start_day': '2012-01-03', 'end_day': '2012-12-31'})
+        store.upsert_metadata({'end_day': '2013-12-31'})
+        store = NpyPipelineStore(self.path)
+        self.assertEqual('2012-01-03', store.get_metadata('start_day'))
+        self.assertEqual('2013-12-31', store.get_metadata('end_day'))
+
+    def test_mmap(self):
+        store = self.make_store()
+        store.record(pd.Timestamp('2012-01-03'),
+                     make_df({'close': [20., 39.]}, [AAPL, TSLA]))
+        store.record(pd.Timestamp('2012-01-04'),
+                     make_df({'close': [21.]}, [AAPL]))
+        store.finish()
+
+        store = NpyPipelineStore(self.path, mmap=True)
+        chunk = store.load_chunk(pd.Timestamp('2012-01-03'), pd.Timestamp('2012-12-31'),
+                                 ['close', 'adx_10'])
+        self.assertIsInstance(chunk.values['close'], np.memmap)
+        df = chunk.for_trade_day(pd.Timestamp('2012-01-04'))
+        self.assertTrue(np.shares_memory(df['close'].to_numpy(), chunk.values['close']))
+        # sids without data that day are kept, all NaN
+        self.assertEqual([1, 2], list(df.index))
+        self.assertEqual(21., df.loc[1, 'close'])
+        self.assertTrue(np.isnan(df.loc[2, 'close']))
+        self.assertTrue(df['adx_10'].isna().all())
+
+    def test_merge_from(self):
+        store = self.make_store()
+        store.record(pd.Timestamp('2012-12-31'), make_df({'close': [20.]}, [AAPL]))
+        store.finish()
+        shard_path = os.path.join(self.path, 'shard')
+        shard = NpyPipelineStore(shard_path)
+        shard.prepare(start_fresh=True)
+        shard.record(pd.Timestamp('2013-01-02'), make_df({'vol%tile_20': [1.]}, [TSLA]))
+        shard.finish()
+        store.merge_from(shard)
+        shutil.rmtree(shard_path)
+
+        chunk = store.load_chunk(pd.Timestamp('2013-01-02'), pd.Timestamp('2013-12-31'),
+                                 ['close', 'vol%tile_20'])
+        df = chunk.for_trade_day(pd.Timestamp('2013-01-02'))
+        self.assertEqual(1., df.loc[2, 'vol%tile_20'])
+        chunk = store.load_chunk(pd.Timestamp('2012-12-31'), pd.Timestamp('2013-12-31'), ['close'])
+        self.assertEqual(20., chunk.for_trade_day(pd.Timestamp('2012-12-31')).loc[1, 'close'])
+
+    def test_saver_and_loader(self):
+        saver = PipelineSaver(strategies=[TestStrategy()], store=NpyPipelineStore(self.path))
+        saver.init(DEBUG_LOGGER, start_day=pd.Timestamp('2012-01-03'),
+                   end_day=pd.Timestamp('2012-01-04'))
+        saver.record_pipeline_data(
+            trade_day=pd.Timestamp('2012-01-03'),
+            pipeline_data=make_df({'atrp_20': [10., 29.], 'close': [20., 39.], 'adx_10': [1., 9.]},
+                                  [AAPL, TSLA]))
+        saver.create_index()
+
+        loader = PipelineLoader(strategy=TestStrategy2(), store=NpyPipelineStore(self.path))
+        loader.init(debug_logger=DEBUG_LOGGER, timer_context=TimerContext())
+        df = loader.load_for_trade_day(pd.Timestamp('2012-01-03'))
+        self.assertEqual({'close', 'adx_10'}, set(df.columns))
+        self.assertEqual(9., df.loc[TSLA.sid, 'adx_10'])
+
+
+class TestCompactSqlitePipelineStore(unittest.TestCase):
+
+    def setUp(self):
+        self.db_conn = sqlite3.connect(':memory:')
+
+    def tearDown(self):
+        self.db_conn.close()
+
+    def test_renamed_ticker(self):
+        store = CompactSqlitePipelineStore(self.db_conn)
+        store.prepare(start_fresh=True)
+        store.record(pd.Timestamp('2012-01-03'), make_df({'close': [20.]}, [AAPL]))
+        renamed = Equity('APPL')
+        renamed.sid = AAPL.sid
+        store.record(pd.Timestamp('2012-01-04'), make_df({'close': [21.]}, [renamed]))
+        store.finish()
+        self.assertEqual([(1, 'APPL')], self.db_conn.execute(
+            f'SELECT * FROM {const.TICKER_TABLE_NAME}').fetchall())
+
+    def test_record_and_load(self):
+        store = CompactSqlitePipelineStore(self.db_conn)
+        store.prepare(start_fresh=True)
+        self.assertEqual(2, store.record(
+            pd.Timestamp('2012-01-03'),
+            make_df({'close': [20., np.nan], 'adx_10': [np.nan, 9.]}, [AAPL, TSLA])))
+        store.record(pd.Timestamp('2012-01-04'),
+                     make_df({'close': [21., 40.], 'adx_10': [2., 10.]}, [AAPL, TSLA]))
+        # replacing a stored value
+        store.record(pd.Timestamp('2012-01-04'), make_df({'close': [41.]}, [TSLA]))
+        store.finish()
+
+        rows = self.db_conn.execute(
+            f'SELECT * FROM {const.COMPACT_TABLE_NAME} ORDER BY 1, 2, 3').fetchall()
+        day = const.trade_day_number(pd.Timestamp('2012-01-03'))
+        self.assertEqual((day, 1, 1, 20.), rows[0])
+        self.assertEqual(6, len(rows))
+        self.assertEqual([(1, 'AAPL'), (2, 'TSLA')], self.db_conn.execute(
+            f'SELECT * FROM {const.TICKER_TABLE_NAME} ORDER BY 1').fetchall())
+
+        store = CompactSqlitePipelineStore(self.db_conn)
+        chunk = store.load_chunk(pd.Timestamp('2012-01-03'), pd.Timestamp('2012-01-10'),
+                                 ['close', 'adx_10', 'rsi_3'])
+        df = chunk.for_trade_day(pd.Timestamp('2012-01-03'))
+        self.assertEqual([1, 2], list(df.index))
+        self.assertEqual(20., df.loc[1, 'close'])
+        self.assertEqual(9., df.loc[2, 'adx_10'])
+        df = chunk.for_trade_day(pd.Timestamp('2012-01-04'))
+        self.assertEqual(41., df.loc[2, 'close'])
+        with self.assertRaises(KeyError):
+            chunk.for_trade_day(pd.Timestamp('2012-01-05'))
+
+    def test_merge_from(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            shard_conn = sqlite3.connect(os.path.join(tmp_dir, 'shard.db'))
+            shard = CompactSqlitePipelineStore(shard_conn)
+            shard.prepare(start_fresh=True)
+            # interned in a different order than in the main store
+            shard.record(pd.Timestamp('2012-01-04'),
+                         make_df({'adx_10': [3.], 'close': [5.]}, [MSFT]))
+            shard.finish()
+
+            store = CompactSqlitePipelineStore(self.db_conn)
+            store.prepare(start_fresh=True)
+            store.record(pd.Timestamp('2012-01-03'),
+                         make_df({'close': [20.], 'rsi_3': [50.]}, [AAPL]))
+            store.merge_from(shard)
+            store.finish()
+            shard_conn.close()
+
+        chunk = store.load_chunk(pd.Timestamp('2012-01-03'), pd.Timestamp('2012-01-10'),
+                                 ['close', 'adx_10', 'rsi_3'])
+        df = chunk.for_trade_day(pd.Timestamp('2012-01-04'))
+        self.assertEqual(5., df.loc[3, 'close'])
+        self.assertEqual(3., df.loc[3, 'adx_10'])
+        self.assertEqual(50., chunk.for_trade_day(pd.Timestamp('2012-01-03')).loc[1, 'rsi_3'])
+        self.assertEqual([(1, 'AAPL'), (3, 'MSFT')], self.db_conn.execute(
+            f'SELECT * FROM {const.TICKER_TABLE_NAME} ORDER BY 1').fetchall())
+
+    def test_trade_day_number(self):
+        day = pd.Timestamp('2015-01-02')
+        self.assertEqual(day, const.trade_day_from_number(const.trade_day_number(day)))
+        self.assertEqual(0, const.trade_day_number(pd.Timestamp('1970-01-01')))
+
+
+if __name__ == '__main__':
+    unittest.main()
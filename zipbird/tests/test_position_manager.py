@@ -413,3 +413,58 @@ class TestPositionManager(unittest.TestCase):
                 call(MSFT, 100, style=StopOrderMatcher(110)),
             ],
             any_order=True)
+
+    ###########################################################################
+    # managed_order_ids
+    ###########################################################################
+    def assert_managed_order_ids(self, position_manager, expected):
+        self.assertEqual(expected, position_manager.managed_order_ids)
+        by_asset = {}
+        for order_id, order in position_manager.managed_orders.items():
+            by_asset.setdefault(order.stock, []).append(order_id)
+        self.assertEqual(by_asset, position_manager.managed_order_ids)
+
+    def test_managed_order_ids_on_fill(self):
+        position_manager = PositionManager(Mock(), Mock())
+        order_api = Mock()
+        position_manager.order_api = order_api
+        order_api.order.side_effect = ['1', '2', '3', '4']
+        position_manager.send_orders([
+            ShareOrder.make_open_long(AMZN, 100),
+            ShareOrder.make_open_long(MSFT, 100),
+        ])
+        position_manager.on_order_filled(AMZN, 100, 100, FakeZiplineOrder('1'))
+        position_manager.on_order_filled(MSFT, 100, 100, FakeZiplineOrder('2'))
+        self.assert_managed_order_ids(position_manager, {AMZN: ['1'], MSFT: ['2']})
+        self.assertEqual([position_manager.managed_orders['1']],
+                         position_manager._find_managed_orders(AMZN))
+
+        position_manager.send_orders([ShareOrder.make_close_long(AMZN, 100)])
+        position_manager.on_order_filled(AMZN, -100, 100, FakeZiplineOrder('3'))
+        self.assert_managed_order_ids(position_manager, {MSFT: ['2']})
+        self.assertEqual([], position_manager._find_managed_orders(AMZN))
+
+    def test_managed_order_ids_close_every_order_of_asset(self):
+        position_manager = PositionManager(Mock(), Mock())
+        order_api = Mock()
+        position_manager.order_api = order_api
+        order_api.order.side_effect = ['3', '4']
+        position_manager.managed_orders = {
+            '1': ShareOrder.make_open_long(AMZN, 100),
+            '2': ShareOrder.make_open_long(AMZN, 50),
+        }
+        self.assert_managed_order_ids(position_manager, {AMZN: ['1', '2']})
+        position_manager.send_orders([ShareOrder.make_close_long(AMZN, 150)])
+        self.assertEqual(['1', '2'], [o.orginal_order_id for o in position_manager.pending_orders.values()])
+
+    def test_managed_order_ids_on_expiry(self):
+        position_manager = PositionManager(Mock(), Mock())
+        amzn = asset('AMZN', auto_close_date=pd.Timestamp(datetime.date(2024, 1, 1)))
+        position_manager.managed_orders = {
+            '1': ShareOrder.make_open_long(amzn, 100),
+            '2': ShareOrder.make_open_long(MSFT, 100),
+            '3': ShareOrder.make_open_long(amzn, 100),
+        }
+        position_manager._verify_managed_orders(
+            datetime.date(2024, 1, 2), {MSFT: Position(MSFT, 100, 100)})
+        self.assert_managed_order_ids(position_manager, {MSFT: ['2']})
@@ -0,0 +1,227 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from zipline.data.adjustments import SQLiteAdjustmentReader, SQLiteAdjustmentWriter
+from zipline.data.bcolz_daily_bars import BcolzDailyBarReader, BcolzDailyBarWriter
+from zipline.data.bundles.core import BundleData
+from zipline.pipeline import Pipeline, SimplePipelineEngine
+from zipline.pipeline.data import USEquityPricing
+from zipline.pipeline.domain import US_EQUITIES
+from zipline.pipeline.loaders import USEquityPricingLoader
+from zipline.testing.core import tmp_asset_finder
+
+from zipbird.strategy.pipeline_maker import PipelineMaker
+from zipbird.strategy.precompute_engine import (
+    HISTORY_KERNELS, IndicatorCache, PrecomputeEngine, PricingArrays, UnsupportedTermException,
+    _pricing_columns, precompute_pipelines, save_pipelines)
+from zipbird.utils import factor_utils
+
+SESSIONS = US_EQUITIES.calendar.sessions_in_range(
+    pd.Timestamp('2019-01-02'), pd.Timestamp('2019-12-31'))
+N_ASSETS = 8
+
+
+def make_bars(seed=0):
+    rng = np.random.default_rng(seed)
+    shape = (len(SESSIONS), N_ASSETS)
+    closes = 50 * np.exp(np.cumsum(rng.normal(0, 0.02, shape), axis=0))
+    opens = closes * (1 + rng.normal(0, 0.01, shape))
+    highs = np.maximum(opens, closes) * (1 + rng.uniform(0, 0.03, shape))
+    lows = np.minimum(opens, closes) * (1 - rng.uniform(0, 0.03, shape))
+    volumes = rng.integers(1_000, 100_000, shape).astype(float)
+    return {'open': opens, 'high': highs, 'low': lows, 'close': closes, 'volume': volumes}
+
+
+def make_maker():
+    maker = PipelineMaker()
+    maker.add_universe(
+        (factor_utils.DollarVolumeRankFactor(window_length=20) <= 6) &
+        (USEquityPricing.close.latest > 1))
+    for period in (5, 20):
+        maker.add_sma(period)
+        maker.add_rsi(period)
+        maker.add_atr(period)
+        maker.add_atrp(period)
+        maker.add_adx(period)
+        maker.add_vol(period)
+        maker.add_max_in_window(period)
+        maker.add_roc(period)
+        maker.add_vol_percentile(period)
+        maker.add_dollar_volume_rank(period)
+        maker.add_sma_cross(period)
+        maker.add_sma_trend(period)
+    maker.add_consecutive_up(3)
+    maker.columns['rsi_inc'] = maker.add_rsi(7, incremental=True)
+    maker.columns['sma_inc'] = maker.add_sma(30, incremental=True)
+    maker.add_filter(maker.columns['sma_5'] > maker.columns['close'])
+    return maker
+
+
+class TestPrecomputeEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        # the first asset lists late, the last one delists early
+        start_dates = [SESSIONS[0]] * N_ASSETS
+        end_dates = [SESSIONS[-1]] * N_ASSETS
+        start_dates[0] = SESSIONS[150]
+        end_dates[-1] = SESSIONS[200]
+        equities = pd.DataFrame({
+            'symbol': [f'S{i}' for i in range(N_ASSETS)],
+            'start_date': start_dates,
+            'end_date': end_dates,
+            'exchange': 'NYSE'})
+        exchanges = pd.DataFrame({'exchange': ['NYSE'], 'country_code': ['US']})
+        self.finder_context = tmp_asset_finder(equities=equities, exchanges=exchanges)
+        self.finder = self.finder_context.__enter__()
+        self.sids = self.finder.sids
+        bars = make_bars()
+
+        def frames():
+            for col, sid in enumerate(self.sids):
+                asset = self.finder.retrieve_asset(sid)
+                days = SESSIONS.slice_indexer(asset.start_date, asset.end_date)
+                yield sid, pd.DataFrame({name: values[days, col] for name, values in bars.items()},
+                                        index=SESSIONS[days])
+
+        bar_path = os.path.join(self.tmp_dir.name, 'daily.bcolz')
+        BcolzDailyBarWriter(bar_path, US_EQUITIES.calendar, SESSIONS[0], SESSIONS[-1]).write(frames())
+        self.bar_reader = BcolzDailyBarReader(bar_path)
+        adjustment_path = os.path.join(self.tmp_dir.name, 'adjustments.db')
+        SQLiteAdjustmentWriter(adjustment_path, self.bar_reader, overwrite=True).write(
+            splits=pd.DataFrame({
+                'sid': [self.sids[1], self.sids[2], self.sids[1]],
+                'ratio': [0.5, 4.0, 0.25],
+                'effective_date': [SESSIONS[170], SESSIONS[185], SESSIONS[240]]}),
+            mergers=pd.DataFrame({
+                'sid': [self.sids[3]],
+                'ratio': [0.9],
+                'effective_date': [SESSIONS[178]]}))
+        self.adjustment_reader = SQLiteAdjustmentReader(adjustment_path)
+        self.bundle_data = BundleData(self.finder, None, self.bar_reader, self.adjustment_reader)
+
+    def tearDown(self):
+        self.adjustment_reader.close()
+        self.finder_context.__exit__(None, None, None)
+        self.tmp_dir.cleanup()
+
+    def run_pipeline_engine(self, columns, start_day, end_day):
+        loader = USEquityPricingLoader.without_fx(self.bar_reader, self.adjustment_reader)
+        engine = SimplePipelineEngine(lambda column: loader, self.finder, default_domain=US_EQUITIES)
+        return engine.run_pipeline(Pipeline(columns), start_day, end_day)
+
+    def precompute(self, maker, start_day, end_day, batch_elements=1_000):
+        columns = maker.get_columns()
+        arrays = PricingArrays.from_bundle(
+            self.bundle_data, _pricing_columns(columns.values()),
+            start_day, end_day, maker.max_window_length())
+        return PrecomputeEngine(arrays, batch_elements=batch_elements).run(columns)
+
+    def test_same_as_pipeline_engine(self):
+        maker = make_maker()
+        start_day, end_day = SESSIONS[140], SESSIONS[-1]
+        expected = self.run_pipeline_engine(maker.get_columns(), start_day, end_day)
+        precomputed = self.precompute(maker, start_day, end_day)
+
+        self.assertEqual(list(expected.index.levels[0]), list(precomputed.sessions))
+        for day, expected_day in expected.groupby(level=0):
+            expected_day = expected_day.droplevel(0)
+            result = precomputed.for_trade_day(day)
+            self.assertEqual(list(expected_day.index), list(result.index))
+            self.assertEqual(list(expected_day.columns), list(result.columns))
+            for name in expected_day.columns:
+                np.testing.assert_allclose(
+                    result[name].to_numpy(dtype=float), expected_day[name].to_numpy(dtype=float),
+                    rtol=1e-9, atol=1e-9, equal_nan=True, err_msg=f'{name} on {day}')
+
+    def test_history_kernels_same_as_windows(self):
+        maker = make_maker()
+        start_day, end_day = SESSIONS[140], SESSIONS[-1]
+        precomputed = self.precompute(maker, start_day, end_day)
+        with mock.patch.dict(HISTORY_KERNELS, clear=True):
+            expected = self.precompute(maker, start_day, end_day)
+        for name, values in expected.columns.items():
+            np.testing.assert_allclose(values.astype(float), precomputed.columns[name].astype(float),
+                                       rtol=1e-9, atol=1e-9, equal_nan=True, err_msg=name)
+
+    def test_adjusted_close(self):
+        maker = PipelineMaker()
+        precomputed = self.precompute(maker, SESSIONS[160], SESSIONS[-1])
+        sid = self.sids[1]
+        closes = self.bar_reader.load_raw_arrays(['close'], SESSIONS[0], SESSIONS[-1], [sid])[0][:, 0]
+        # the close of the previous session, split 2:1 on SESSIONS[170]
+        self.assertAlmostEqual(closes[168], precomputed.for_trade_day(SESSIONS[169]).loc[sid, 'close'])
+        self.assertAlmostEqual(closes[169] / 2, precomputed.for_trade_day(SESSIONS[170]).loc[sid, 'close'])
+        self.assertAlmostEqual(closes[170], precomputed.for_trade_day(SESSIONS[171]).loc[sid, 'close'])
+
+    def test_precompute_pipelines(self):
+        short_maker, long_maker = PipelineMaker(), PipelineMaker()
+        for maker, period in ((short_maker, 5), (long_maker, 20)):
+            maker.add_universe(USEquityPricing.close.latest > 1)
+            maker.add_sma(period)
+            maker.add_atr(10)
+        start_day, end_day = SESSIONS[160], SESSIONS[-1]
+        short_pipeline, long_pipeline = precompute_pipelines(
+            self.bundle_data, [short_maker, long_maker], start_day, end_day)
+        self.assertEqual(['close', 'sma_5', 'atr_10'], list(short_pipeline.columns))
+        self.assertEqual(['close', 'sma_20', 'atr_10'], list(long_pipeline.columns))
+        # the shared column is computed once
+        self.assertIs(short_pipeline.columns['atr_10'], long_pipeline.columns['atr_10'])
+        for maker, pipeline in ((short_maker, short_pipeline), (long_maker, long_pipeline)):
+            expected = self.precompute(maker, start_day, end_day)
+            for name, values in expected.columns.items():
+                np.testing.assert_allclose(values, pipeline.columns[name], equal_nan=True)
+
+    def test_save_pipelines(self):
+        short_maker, long_maker = PipelineMaker(), PipelineMaker()
+        for maker, period in ((short_maker, 5), (long_maker, 20)):
+            maker.add_universe(USEquityPricing.close.latest > 1)
+            maker.add_sma(period)
+            maker.add_atr(10)
+        pipelines = precompute_pipelines(
+            self.bundle_data, [short_maker, long_maker], SESSIONS[160], SESSIONS[-1])
+        directory = os.path.join(self.tmp_dir.name, 'pipelines')
+        short_files, long_files = save_pipelines(pipelines, directory)
+        # close, atr_10 and the mask once, sma_5 and sma_20
+        self.assertEqual(short_files.columns['atr_10'], long_files.columns['atr_10'])
+        self.assertEqual(5, len([f for f in os.listdir(directory) if f[0].isdigit()]))
+
+        for pipeline, files in zip(pipelines, (short_files, long_files)):
+            loaded = files.load()
+            self.assertIsInstance(loaded.columns['atr_10'], np.memmap)
+            day = SESSIONS[200]
+            pd.testing.assert_frame_equal(pipeline.for_trade_day(day), loaded.for_trade_day(day))
+
+    def test_indicator_cache_with_different_universes(self):
+        makers = []
+        for min_close in (40, 50, 60):
+            maker = PipelineMaker()
+            maker.add_universe(USEquityPricing.close.latest > min_close)
+            maker.add_rsi(3)
+            maker.add_sma(5)
+            makers.append(maker)
+        start_day, end_day = SESSIONS[160], SESSIONS[-1]
+        cache = IndicatorCache.from_bundle(self.bundle_data, makers, start_day, end_day)
+        with mock.patch.object(cache.engine, '_compute_values', wraps=cache.engine._compute_values) as compute_values:
+            pipelines = cache.pipelines()
+        # rsi_3 and sma_5 once each, for all three universes
+        self.assertEqual(2, compute_values.call_count)
+        for maker, pipeline in zip(makers, pipelines):
+            expected = self.precompute(maker, start_day, end_day)
+            for name, values in expected.columns.items():
+                np.testing.assert_allclose(values, pipeline.columns[name], equal_nan=True)
+
+    def test_unsupported_term(self):
+        maker = PipelineMaker()
+        maker.columns['max_of_trend'] = factor_utils.MaxInWindowFactor(
+            inputs=[factor_utils.SMATrend(sma_len=5, window_length=10)], window_length=1)
+        with self.assertRaises(UnsupportedTermException):
+            self.precompute(maker, SESSIONS[160], SESSIONS[-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,188 @@
+from unittest.mock import Mock
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from zipbird.basic.types import Equity, LongShort
+from zipbird.replay.replay_engine import ReplayEngine, rank_weights, weight_grid
+from zipbird.replay.replay_order import ReplayOrder
+from zipbird.replay.replay_strategy import ReplayStrategy
+from zipbird.utils.timer_context import TimerContext
+
+SESSIONS = pd.DatetimeIndex(pd.bdate_range('2020-01-06', periods=6))
+
+
+def make_strategy(name):
+    strategy = Mock()
+    strategy.strategy.get_name.return_value = name
+    strategy.position_sizer.get_max_equity_per_position.return_value = 0.5
+    strategy.position_sizer.get_max_fraction_risk.return_value = 0.01
+    return strategy
+
+
+def make_order(asset, long_short, open_day, open_price, close_day=None, close_price=None,
+               percent=None, stop_diff=None, strategy_name='s1'):
+    order = ReplayOrder()
+    order.strategy_name = strategy_name
+    order.symbol = asset.symbol
+    order.asset = asset
+    order.long_short = long_short
+    order.open_date = SESSIONS[open_day].date()
+    order.open_price = open_price
+    order.open_sizer_percent = percent
+    order.open_sizer_stop_diff = stop_diff
+    order.close_date = SESSIONS[close_day].date() if close_day is not None else None
+    order.close_price = close_price
+    order.replay_shares = 0
+    return order
+
+
+class TestReplayEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.aaa = Equity('AAA')
+        self.bbb = Equity('BBB')
+        self.replayer = ReplayStrategy(
+            [make_strategy('s1')], [0.5], debug_logger=Mock(), timer_context=TimerContext())
+        closes = np.array([
+            [10., 20.],
+            [11., 21.],
+            [12., 22.],
+            [13., 11.5],
+            [14., 12.],
+            [15., np.nan],
+        ])
+        split_factors = np.ones_like(closes)
+        # BBB splits 2:1 on SESSIONS[3]
+        split_factors[:3, 1] = 0.5
+        self.engine = ReplayEngine(
+            self.replayer, SESSIONS, [self.aaa, self.bbb], closes, split_factors,
+            commission_per_share=0)
+        self.closes = closes
+        self.split_factors = split_factors
+
+    def add_orders(self, *orders):
+        for order in orders:
+            self.replayer.orders[order.open_date].append(order)
+            if order.close_date:
+                self.replayer.orders[order.close_date].append(order)
+
+    def test_percent_order(self):
+        order = make_order(self.aaa, LongShort.Long, 1, 10.5, 3, 12.5, percent=0.2)
+        self.add_orders(order)
+        perf = self.engine.run(10_000)
+        # 0.2 * weight 0.5 * 10,000 at the last close of 10
+        self.assertEqual(100, order.replay_shares)
+        np.testing.assert_allclose(
+            [10_000 + 50, 10_000 + 150, 10_000 + 200, 10_000 + 200, 10_000 + 200],
+            perf.portfolio_value)
+        np.testing.assert_allclose([8_950, 8_950, 10_200, 10_200, 10_200], perf.ending_cash)
+        self.assertAlmostEqual(0.005, perf.returns.iloc[0])
+        self.assertEqual(list(SESSIONS[1:].tz_localize('UTC')), list(perf.index))
+
+    def test_sized_with_portfolio_value(self):
+        first = make_order(self.aaa, LongShort.Long, 1, 10, 2, 12, percent=0.2)
+        second = make_order(self.aaa, LongShort.Short, 3, 12, percent=0.2)
+        self.add_orders(first, second)
+        perf = self.engine.run(10_000)
+        # portfolio is 10,200 after the first round trip, sized at the close of 12
+        self.assertEqual(int(0.1 * 10_200 / 12), second.replay_shares)
+        self.assertAlmostEqual(-second.replay_shares * 15, perf.short_value.iloc[-1])
+
+    def test_stop_diff_order_with_split(self):
+        order = make_order(self.bbb, LongShort.Long, 1, 20, 4, 12, stop_diff=2)
+        self.add_orders(order)
+        perf = self.engine.run(10_000)
+        # min(0.5 * 0.5 * 10,000 / 20, 0.01 * 0.5 * 10,000 / 2)
+        self.assertEqual(25, order.replay_shares)
+        # 50 shares after the split, closed at 12 on SESSIONS[4]
+        np.testing.assert_allclose(
+            [10_000 + 25, 10_000 + 50, 10_000 + 75, 10_000 + 100, 10_000 + 100],
+            perf.portfolio_value)
+        self.assertEqual(0, perf.long_value.iloc[-1])
+
+    def test_start_day(self):
+        before = make_order(self.aaa, LongShort.Long, 1, 10, 3, 12, percent=0.2)
+        after = make_order(self.aaa, LongShort.Long, 3, 13, percent=0.2)
+        self.add_orders(before, after)
+        perf = self.engine.run(10_000, start_day=SESSIONS[2])
+        self.assertEqual(0, before.replay_shares)
+        self.assertEqual(int(0.1 * 10_000 / 12), after.replay_shares)
+        self.assertEqual(10_000, perf.portfolio_value.iloc[0])
+
+    def test_dividends(self):
+        self.add_orders(
+            make_order(self.aaa, LongShort.Long, 1, 10.5, 3, 12.5, percent=0.2),
+            make_order(self.bbb, LongShort.Short, 1, 21, percent=0.2))
+        dividends = {
+            # ex on the open day, before the round trip holds the shares
+            SESSIONS[1]: [(self.aaa.sid, 1.0, SESSIONS[2])],
+            # ex on the close day, paid after it, and owed on the split shares
+            SESSIONS[3]: [(self.aaa.sid, 0.5, SESSIONS[4]), (self.bbb.sid, 0.25, SESSIONS[3])],
+        }
+        engine = ReplayEngine(
+            self.replayer, SESSIONS, [self.aaa, self.bbb], self.closes, self.split_factors,
+            commission_per_share=0, dividends=dividends)
+        with_dividends = engine.run(10_000)
+        perf = self.engine.run(10_000)
+        # 100 AAA shares long, 50 BBB shares short which split into 100
+        np.testing.assert_allclose(
+            [0, 0, -25, 25, 25], with_dividends.ending_cash - perf.ending_cash)
+
+
+class TestBatchReplay(unittest.TestCase):
+
+    def make_engine(self, weights):
+        aaa, bbb = Equity('AAA'), Equity('BBB')
+        replayer = ReplayStrategy(
+            [make_strategy('s1'), make_strategy('s2')], weights,
+            debug_logger=Mock(), timer_context=TimerContext())
+        orders = [
+            make_order(aaa, LongShort.Long, 1, 10.5, 3, 12.5, percent=0.3),
+            make_order(bbb, LongShort.Short, 2, 21, 4, 11, stop_diff=1, strategy_name='s2'),
+            make_order(aaa, LongShort.Long, 4, 14, percent=0.5, strategy_name='s2'),
+        ]
+        for order in orders:
+            replayer.orders[order.open_date].append(order)
+            if order.close_date:
+                replayer.orders[order.close_date].append(order)
+        closes = np.array([[10., 20.], [11., 21.], [12., 22.], [13., 11.5], [14., 12.], [15., 12.5]])
+        split_factors = np.ones_like(closes)
+        split_factors[:3, 1] = 0.5
+        dividends = {SESSIONS[3]: [(aaa.sid, 0.5, SESSIONS[4]), (bbb.sid, 0.25, SESSIONS[5])]}
+        return ReplayEngine(replayer, SESSIONS, [aaa, bbb], closes, split_factors, dividends=dividends)
+
+    def test_same_as_single_runs(self):
+        weights = np.array([[1, 0], [0.5, 0.5], [0.3, 0.7], [0, 1]])
+        portfolio_values = self.make_engine([1, 1]).run_batch(10_000, weights)
+        self.assertEqual((len(SESSIONS) - 1, len(weights)), portfolio_values.shape)
+        for i, vector in enumerate(weights):
+            perf = self.make_engine(list(vector)).run(10_000)
+            np.testing.assert_allclose(perf.portfolio_value, portfolio_values[:, i])
+
+    def test_weight_grid(self):
+        grid = weight_grid(3, 0.5)
+        np.testing.assert_allclose(
+            [[0, 0, 1], [0, 0.5, 0.5], [0, 1, 0], [0.5, 0, 0.5], [0.5, 0.5, 0], [1, 0, 0]], grid)
+
+    def test_rank_weights(self):
+        portfolio_values = np.array([[100., 100.], [90., 99.], [120., 118.]])
+        ranked = rank_weights(['s1', 's2'], np.array([[1, 0], [0, 1]]), portfolio_values)
+        # s1 has the higher CAGR with a much deeper drawdown
+        self.assertEqual([0, 1], list(ranked.s1))
+        self.assertAlmostEqual(-0.1, ranked.max_drawdown[1])
+        self.assertAlmostEqual(1.2 ** (252 / 3) - 1, ranked.cagr[1])
+
+    def test_rank_weights_without_drawdown(self):
+        portfolio_values = np.array([[100., 100., 100.], [90., 101., 100.], [120., 102., 100.]])
+        ranked = rank_weights(['s1', 's2', 's3'], np.eye(3), portfolio_values)
+        # a gain without drawdown ranks first, flat values last
+        self.assertEqual([1, 0, 0], list(ranked.s2))
+        self.assertEqual([0, 0, 1], list(ranked.s3))
+        self.assertEqual(np.inf, ranked.cagr_to_max_drawdown[0])
+        self.assertEqual(0.0, ranked.cagr_to_max_drawdown[2])
+
+
+if __name__ == '__main__':
+    unittest.main()
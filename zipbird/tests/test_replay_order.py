@@ -1,11 +1,13 @@
 from datetime import date
+import os
+import tempfile
 import unittest
 
 from zipbird.basic.order import ShareOrder
 from zipbird.basic.stop import FixStop, StopOrder
 from zipbird.basic.types import LongShort, Equity, OpenClose
-from zipbird.replay.replay_order import ReplayOrder
-from zipbird.replay.order_collector import round_price
+from zipbird.replay.replay_order import ReplayOrder, load_replay_orders, orders_from_array, orders_to_array
+from zipbird.replay.order_collector import OrderCollector, round_price
 
 DAY1 = date(2023, 1, 1)
 DAY2 = date(2024, 12, 31)
@@ -64,4 +66,103 @@ class TestReplayOrder(unittest.TestCase):
         ]
         for price, open_close, long_short, expected in test_data:
             self.assertEqual(
-                round_price(price, open_close, long_short), expected)
\ No newline at end of file
+                round_price(price, open_close, long_short), expected)
+
+    def make_round_trips(self):
+        long_order = ShareOrder.make_open_long(Equity('AAPL'), 100)
+        long_order.add_stop(StopOrder(
+            initial_stop=FixStop(long_or_short=LongShort.Long, diff_price=2.3)))
+        closed = ReplayOrder.make_from_open_order('s1', DAY1, 12.4, long_order)
+        closed.add_close_order(DAY2, 14.3)
+        open_order = ReplayOrder.make_from_open_order(
+            's22', DAY2, 101.25, ShareOrder.make_open_short(Equity('BRK.B-201203'), 10))
+        open_order.open_sizer_percent = 0.05
+        return [closed, open_order]
+
+    def test_convert_to_from_array(self):
+        orders = self.make_round_trips()
+        array = orders_to_array(orders)
+        self.assertEqual(2, len(array))
+        self.assertEqual(orders, orders_from_array(array))
+        loaded = orders_from_array(array)[1]
+        self.assertIsNone(loaded.close_date)
+        self.assertIsNone(loaded.close_price)
+        self.assertIsNone(loaded.open_sizer_stop_diff)
+        self.assertEqual(LongShort.Short, loaded.long_short)
+        self.assertEqual([], orders_from_array(orders_to_array([])))
+
+    def test_write_and_load_orders(self):
+        collector = OrderCollector('s1')
+        for order in reversed(self.make_round_trips()):
+            collector.add_round_trip(order)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for name in ('orders.npy', 'orders.csv'):
+                filename = os.path.join(tmp_dir, name)
+                collector.write_orders(filename)
+                # sorted by open date
+                self.assertEqual(self.make_round_trips(), load_replay_orders(filename))
+
+
+class TestOrderCollector(unittest.TestCase):
+
+    def test_open_and_close_orders(self):
+        collector = OrderCollector('s1')
+        long_order = ShareOrder.make_open_long(Equity('AAPL'), 100)
+        long_order.add_stop(StopOrder(
+            initial_stop=FixStop(long_or_short=LongShort.Long, diff_price=2.3)))
+        short_order = ShareOrder.make_open_short(Equity('IBM'), 10)
+        collector.add_open_order(DAY1, 12.3449, long_order)
+        collector.add_open_order(DAY1, 50.009, short_order)
+        collector.add_close_order(long_order.make_opposite_order(True, True), DAY2, 14.309)
+        self.assertEqual(2, len(collector))
+
+        orders = collector.get_orders()
+        expected = ReplayOrder.make_from_open_order('s1', DAY1, 12.35, long_order)
+        expected.add_close_order(DAY2, 14.30)
+        self.assertEqual(expected, orders[0])
+        self.assertEqual(ReplayOrder.make_from_open_order('s1', DAY1, 50.0, short_order), orders[1])
+
+    def test_to_dataframe(self):
+        collector = OrderCollector('s1')
+        trips = [
+            ('AAPL', LongShort.Long, date(2023, 1, 2), 10., date(2023, 1, 12), 12.),
+            ('IBM', LongShort.Short, date(2023, 5, 1), 20., date(2024, 1, 3), 16.),
+            ('AAPL', LongShort.Short, date(2024, 2, 1), 10., None, None),
+        ]
+        for symbol, long_short, open_date, open_price, close_date, close_price in trips:
+            order = ReplayOrder()
+            order.strategy_name = 's1'
+            order.symbol = symbol
+            order.long_short = long_short
+            order.open_date = open_date
+            order.open_price = open_price
+            order.open_sizer_percent = 0.1
+            order.open_sizer_stop_diff = None
+            order.close_date = close_date
+            order.close_price = close_price
+            collector.add_round_trip(order)
+
+        df = collector.to_dataframe()
+        # open round trips are left out
+        self.assertEqual(['AAPL', 'IBM'], list(df.symbol))
+        self.assertEqual([2023, 2024], list(df.year))
+        self.assertEqual([LongShort.Long, LongShort.Short], list(df.long_short))
+        self.assertEqual([0.2, 0.25], list(df.profit_pct.round(10)))
+        self.assertEqual([10, 247], list(df.trade_days))
+
+    def test_grows_past_capacity(self):
+        collector = OrderCollector('s1', capacity=4)
+        orders = []
+        for i in range(13):
+            order = ShareOrder.make_open_long(Equity(f'S{i % 7}'), 10)
+            collector.add_open_order(DAY1, 10. + i, order)
+            orders.append(order)
+        for i, order in enumerate(orders[::2]):
+            collector.add_close_order(order, DAY2, 20. + i)
+        self.assertEqual(len(orders), len(collector))
+        loaded = collector.get_orders()
+        self.assertEqual([10. + i for i in range(len(orders))], [o.open_price for o in loaded])
+        self.assertEqual(['S0', 'S1'], [o.symbol for o in loaded[:2]])
+        self.assertEqual(20., loaded[0].close_price)
+        self.assertIsNone(loaded[1].close_price)
+        self.assertEqual(len(orders[::2]), len(collector.to_dataframe()))
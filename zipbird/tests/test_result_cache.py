@@ -0,0 +1,105 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+import zipline
+
+from zipbird.position_manager.atr_position_sizer import ATRPositionSizer
+from zipbird.position_manager.split_target_position_sizer import SplitTargetPositionSizer
+from zipbird.replay.order_collector import OrderCollector
+from zipbird.strategies.s31_trend_50 import S31Trend50
+from zipbird.strategies.s32_200_cross import S32Cross200MA
+from zipbird.strategy.strategy_executor import StrategyExecutor
+from zipbird.utils.result_cache import (ResultCache, bundle_ingestion, code_version, result_key,
+                                        zipline_version)
+
+PARAMS = {'max_equity_per_position': 0.1, 'fraction_risk': 0.01}
+START = pd.Timestamp('2020-01-01')
+END = pd.Timestamp('2020-12-31')
+
+
+def make_executor(strategy_class=S31Trend50, sizer_class=ATRPositionSizer, params=PARAMS):
+    return StrategyExecutor(strategy_class('s', params), sizer_class(params))
+
+
+def key_of(executor, bundle='quandl', ingestion='2024-01-01 00:00:00', start=START, end=END,
+           capital=100_000, engine='pipeline'):
+    return result_key(executor, bundle, ingestion, start, end, capital, engine, 'v1', '3.1')
+
+
+class TestResultCache(unittest.TestCase):
+
+    def test_result_key(self):
+        key = key_of(make_executor())
+        self.assertEqual(key, key_of(make_executor(params=dict(PARAMS))))
+        changed = [
+            key_of(make_executor(params={**PARAMS, 'fraction_risk': 0.02})),
+            key_of(make_executor(strategy_class=S32Cross200MA)),
+            key_of(make_executor(sizer_class=SplitTargetPositionSizer)),
+            key_of(make_executor(), bundle='other'),
+            key_of(make_executor(), ingestion='2024-02-01 00:00:00'),
+            key_of(make_executor(), start=pd.Timestamp('2020-01-02')),
+            key_of(make_executor(), end=pd.Timestamp('2021-01-01')),
+            key_of(make_executor(), capital=50_000),
+            key_of(make_executor(), engine='fast'),
+            result_key(make_executor(), 'quandl', '2024-01-01 00:00:00', START, END, 100_000, 'pipeline',
+                       'v2', '3.1'),
+            result_key(make_executor(), 'quandl', '2024-01-01 00:00:00', START, END, 100_000, 'pipeline',
+                       'v1', '3.2'),
+        ]
+        self.assertNotIn(key, changed)
+        self.assertEqual(len(changed), len(set(changed)))
+
+    def test_bundle_ingestion(self):
+        with tempfile.TemporaryDirectory() as zipline_root:
+            environ = {'ZIPLINE_ROOT': zipline_root}
+            self.assertIsNone(bundle_ingestion('quandl', environ))
+            bundle_dir = os.path.join(zipline_root, 'data', 'quandl')
+            os.makedirs(os.path.join(bundle_dir, '2024-01-01T00;00;00.000000'))
+            os.makedirs(os.path.join(bundle_dir, '2024-03-01T00;00;00.000000'))
+            self.assertEqual('2024-03-01 00:00:00', bundle_ingestion('quandl', environ))
+
+    def test_zipline_version(self):
+        version = zipline_version()
+        self.assertTrue(version.startswith(zipline.__version__ + '-'))
+        self.assertEqual(version, zipline_version())
+
+    def test_code_version(self):
+        with tempfile.TemporaryDirectory() as package_dir:
+            def write(path, content):
+                os.makedirs(os.path.dirname(os.path.join(package_dir, path)), exist_ok=True)
+                with open(os.path.join(package_dir, path), 'w') as f:
+                    f.write(content)
+
+            write('basic/order.py', 'a = 1')
+            write('strategies/other_strategy.py', 'b = 1')
+            write('tests/test_order.py', 'c = 1')
+            executor = make_executor()
+            version = code_version(executor, package_dir)
+            self.assertEqual(version, code_version(executor, package_dir))
+            # other strategies and tests do not change the version
+            write('strategies/other_strategy.py', 'b = 2')
+            write('tests/test_order.py', 'c = 2')
+            self.assertEqual(version, code_version(executor, package_dir))
+            write('basic/order.py', 'a = 2')
+            self.assertNotEqual(version, code_version(executor, package_dir))
+            # the module of the strategy is part of the version
+            self.assertNotEqual(code_version(executor, package_dir),
+                                code_version(make_executor(strategy_class=S32Cross200MA), package_dir))
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = ResultCache(os.path.join(cache_dir, 'cache'))
+            self.assertIsNone(cache.load('key'))
+            perf = pd.DataFrame({'portfolio_value': [100.0, 101.0]})
+            replay_orders = OrderCollector('s')
+            cache.save('key', perf, replay_orders)
+            loaded_perf, loaded_orders = cache.load('key')
+            pd.testing.assert_frame_equal(perf, loaded_perf)
+            self.assertEqual('s', loaded_orders.strategy_name)
+            self.assertEqual(['key.pickle'], os.listdir(cache.cache_dir))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,7 +3,7 @@ import unittest
 import pandas as pd
 
 from zipbird.basic.order import PercentOrder
-from zipbird.basic.signal import Signal
+from zipbird.basic.signal import Signal, SignalBatch
 from zipbird.basic.types import ClosingInPositionSizerException, LongShort, OpenClose, Portfolio, Position
 from zipbird.position_manager.rotation_position_sizer import RotationPositionSizer
 
@@ -120,6 +120,13 @@ class TestRotationPositionSizer(unittest.TestCase):
         self.assertPercentOrder(result[1], PercentOrder.make_open_long('GOOG', 0.25, False))
         self.assertPercentOrder(result[2], PercentOrder.make_open_long('META', 0.25, True))
 
+        batch = SignalBatch.from_signals(signals, pipeline_data.index)
+        batch_result = sizer.get_orders(portfolio, batch, pipeline_data)
+        batch_result.sort(key=lambda x: x.stock)
+        self.assertEqual(len(batch_result), 3)
+        for order, expected in zip(batch_result, result):
+            self.assertPercentOrder(order, expected)
+
     def assertPercentOrder(self, order, expected):
         self.assertEqual(order.stock, expected.stock)
         self.assertEqual(order.open_close, expected.open_close)
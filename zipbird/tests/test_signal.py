@@ -1,6 +1,9 @@
 import unittest
 
-from zipbird.basic.signal import Signal
+import numpy as np
+import pandas as pd
+
+from zipbird.basic.signal import Signal, SignalBatch
 from zipbird.basic.types import LongShort, OpenClose
 
 class TestSignal(unittest.TestCase):
@@ -21,5 +24,59 @@ class TestSignal(unittest.TestCase):
         self.assertEqual(signal.long_short, LongShort.Short)
 
 
+class TestSignalBatch(unittest.TestCase):
+    index = pd.Index(['AAPL', 'GOOG', 'MSFT', 'META'])
+
+    def test_from_signals(self):
+        signals = [
+            Signal.make_close_long('MSFT'),
+            Signal.make_open_short('AAPL', 12.5),
+            Signal.make_adjust_long('META'),
+        ]
+        batch = SignalBatch.from_signals(signals, self.index)
+        self.assertEqual(3, len(batch))
+        self.assertEqual(['MSFT', 'AAPL', 'META'], list(batch.assets))
+        self.assertEqual(signals, batch.to_signals())
+        self.assertEqual([], SignalBatch.from_signals([], self.index).to_signals())
+
+    def test_from_signals_not_in_index(self):
+        with self.assertRaises(KeyError):
+            SignalBatch.from_signals([Signal.make_open_long('IBM')], self.index)
+
+    def test_from_mask(self):
+        batch = SignalBatch.from_mask(
+            self.index,
+            mask=np.array([True, False, True, True]),
+            open_close=OpenClose.Open,
+            long_short=LongShort.Long,
+            score=np.array([3., 1., 2., 2.]),
+            limit_price=np.array([10., 20., 30., 40.]))
+        self.assertEqual([
+            Signal.make_open_long('MSFT', 30.),
+            Signal.make_open_long('META', 40.),
+            Signal.make_open_long('AAPL', 10.),
+        ], batch.to_signals())
+
+    def test_from_assets(self):
+        closes = pd.Series([10., 20., 30., 40.], index=self.index)
+        batch = SignalBatch.from_assets(
+            self.index, ['META', 'GOOG'], OpenClose.Open, LongShort.Short, limit_price=closes * 1.5)
+        self.assertEqual([
+            Signal.make_open_short('META', 60.),
+            Signal.make_open_short('GOOG', 30.),
+        ], batch.to_signals())
+        np.testing.assert_array_equal([40., 20.], batch.values(closes))
+        # columns over another index are looked up by asset
+        np.testing.assert_array_equal([40., 20.], batch.values(closes[::-1]))
+
+    def test_concat_and_select(self):
+        opens = SignalBatch.from_assets(self.index, ['GOOG'], OpenClose.Open, LongShort.Long)
+        closes = SignalBatch.from_assets(self.index, ['AAPL', 'MSFT'], OpenClose.Close, LongShort.Long)
+        batch = SignalBatch.concat([closes, opens])
+        self.assertEqual(['AAPL', 'MSFT', 'GOOG'], list(batch.assets))
+        to_open = batch.select(batch.is_open_close(OpenClose.Open))
+        self.assertEqual([Signal.make_open_long('GOOG')], to_open.to_signals())
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
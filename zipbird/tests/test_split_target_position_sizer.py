@@ -0,0 +1,45 @@
+import unittest
+import pandas as pd
+
+from zipbird.basic.signal import Signal, SignalBatch
+from zipbird.basic.types import LongShort, Portfolio
+from zipbird.position_manager.split_target_position_sizer import SplitTargetPositionSizer
+
+class TestSplitTargetPositionSizer(unittest.TestCase):
+    def test_get_orders(self):
+        params = {
+            'atr_period': 10,
+            'stop_loss_atr_multiple': 3,
+            'stop_loss_days': 4,
+            'max_equity_per_position': 0.1,
+            'fraction_risk': 0.02,
+            'price_target_atr_multiple': 2,
+            'trailing_stop_percent': 0.2,
+        }
+        sizer = SplitTargetPositionSizer(params)
+        portfolio = Portfolio(portfolio_value=10000, positions={})
+        pipeline_data = pd.DataFrame({
+            'close': {'AAPL': 100., 'GOOG': 10., 'AMZN': 300.},
+            'atr_10': {'AAPL': 3., 'GOOG': 4., 'AMZN': 5.},
+        })
+        signals = [
+            Signal.make_open_long('AAPL'),
+            Signal.make_open_short('GOOG', 12.0),
+        ]
+        orders = sizer.get_orders(portfolio, signals, pipeline_data)
+        self.assertEqual(['AAPL', 'AAPL', 'GOOG', 'GOOG'], [o.stock for o in orders])
+        # AAPL 10 shares, GOOG 16 shares, split in a third and two thirds
+        self.assertEqual([3, 6, 5, 10], [o.amount for o in orders])
+        self.assertEqual([None, 6, None, 8],
+                         [o.stop.profit_target and o.stop.profit_target.diff for o in orders])
+        self.assertEqual(LongShort.Short, orders[3].stop.trailing_stop.long_or_short)
+        self.assertEqual(12.0, orders[3].limit_price)
+        self.assertIsNot(orders[0].stop.trailing_stop, orders[1].stop.trailing_stop)
+
+        batch_orders = sizer.get_orders(
+            portfolio, SignalBatch.from_signals(signals, pipeline_data.index), pipeline_data)
+        self.assertEqual([repr(o) for o in orders], [repr(o) for o in batch_orders])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from zipbird.basic.order import ShareOrder
+from zipbird.basic.stop import (
+    ATRTrailingStop, FixProfitTarget, FixStop, PercentProfitTarget, PercentTrailingStop,
+    ProfitTarget, StopOrder)
+from zipbird.basic.types import Equity, LongShort, StopOrderStatus
+from zipbird.position_manager.stop_engine import StopEngine
+
+
+def make_stop(i, long_short):
+    """A different combination of stops for each i"""
+    sign = 1 if long_short == LongShort.Long else -1
+    initial = FixStop(long_short, 3 + i % 4) if i % 2 == 0 else None
+    target = [None,
+              PercentProfitTarget(long_short, 0.05 + 0.01 * (i % 3)),
+              FixProfitTarget(long_short, 4 + i % 5)][i % 3]
+    trailing = [None,
+                PercentTrailingStop(long_short, 100 + sign * (i % 5), 0.05 + 0.01 * (i % 4)),
+                ATRTrailingStop(long_short, 100 + sign * (i % 3), 1 + i % 3),
+                None][i % 4]
+    return StopOrder(initial_stop=initial,
+                     time_stop=[0, 5, 12][i % 3],
+                     profit_target=target,
+                     trailing=trailing)
+
+
+def make_orders(n):
+    orders = {}
+    for i in range(n):
+        long_short = LongShort.Long if i % 5 else LongShort.Short
+        if long_short == LongShort.Long:
+            order = ShareOrder.make_open_long(Equity(f'S{i}'), 100)
+        else:
+            order = ShareOrder.make_open_short(Equity(f'S{i}'), 100)
+        order.add_stop(make_stop(i, long_short))
+        orders[str(i)] = order
+    return orders
+
+
+def stop_state(stop):
+    return (stop.bar_count,
+            stop.initial_stop and stop.initial_stop.stop_price,
+            stop.profit_target and stop.profit_target.target_price,
+            stop.trailing_stop and stop.trailing_stop.stop_price,
+            stop.trailing_stop and stop.trailing_stop.activated)
+
+
+class TestStopEngine(unittest.TestCase):
+
+    def test_same_as_stop_orders(self):
+        n = 60
+        expected_orders = make_orders(n)
+        orders = make_orders(n)
+        engine = StopEngine()
+        rng = np.random.default_rng(7)
+        closes = 100 + np.cumsum(rng.normal(0, 2, size=(15, n)), axis=0)
+        assets = [order.stock for order in orders.values()]
+        for day, day_closes in enumerate(closes):
+            data = pd.DataFrame({'close': day_closes, 'atr': 1 + day % 3 + np.arange(n) % 2},
+                                index=assets)
+            open_prices = 100 + np.arange(n) % 7
+            # one order closed half way
+            if day == 8:
+                orders.pop('3')
+                expected_orders.pop('3')
+            engine.sync(orders)
+            engine.do_maintenance(open_prices[[int(i) for i in orders]], data)
+            expected = []
+            for order_id, order in expected_orders.items():
+                order.stop.do_maintenance(open_prices[int(order_id)], data.loc[order.stock])
+                status = order.stop.get_status(data.loc[order.stock])
+                if status != StopOrderStatus.NOT_TRIGGER:
+                    expected.append((order_id, status))
+
+            self.assertEqual(expected, engine.get_triggered(data))
+            for order_id in orders:
+                self.assertEqual(stop_state(expected_orders[order_id].stop),
+                                 stop_state(orders[order_id].stop))
+        self.assertEqual(n - 1, len(engine))
+
+    def test_stops_of_other_classes(self):
+        class FixedTarget(ProfitTarget):
+            def __init__(self, long_or_short, target_price):
+                super().__init__(long_or_short)
+                self.target_price = target_price
+
+        aaa, bbb = Equity('AAA'), Equity('BBB')
+        orders = {
+            '1': ShareOrder.make_open_long(aaa, 100),
+            '2': ShareOrder.make_open_long(bbb, 100),
+        }
+        orders['1'].add_stop(StopOrder(profit_target=FixedTarget(LongShort.Long, 110)))
+        orders['2'].add_stop(StopOrder(initial_stop=FixStop(LongShort.Long, 5)))
+        engine = StopEngine()
+        engine.sync(orders)
+        data = pd.DataFrame({'close': [111, 94]}, index=[aaa, bbb])
+        engine.do_maintenance(np.array([100., 100.]), data)
+        self.assertEqual([1, 1], [orders[i].stop.bar_count for i in orders])
+        self.assertEqual(
+            [('1', StopOrderStatus.TARGET_REACHED), ('2', StopOrderStatus.INITIAL_STOP)],
+            engine.get_triggered(data))
+
+    def test_sync(self):
+        orders = make_orders(3)
+        orders['4'] = ShareOrder.make_open_long(Equity('NOSTOP'), 100)
+        engine = StopEngine()
+        engine.sync(orders)
+        self.assertEqual(['0', '1', '2'], engine.order_ids)
+        stops = engine.stops
+        engine.sync(orders)
+        self.assertIs(stops, engine.stops)
+        orders['1'].add_stop(StopOrder(time_stop=1))
+        engine.sync(orders)
+        self.assertIs(orders['1'].stop, engine.stops[1])
+
+    def test_missing_pipeline_data(self):
+        engine = StopEngine()
+        engine.sync(make_orders(2))
+        with self.assertRaises(KeyError):
+            engine.get_triggered(pd.DataFrame({'close': [10.]}, index=[Equity('S0')]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,10 +3,16 @@ import pandas as pd
 import unittest
 
 from zipbird.basic.order import ShareOrder
-from zipbird.basic.signal import Signal
+from zipbird.basic.signal import Signal, SignalBatch
 from zipbird.basic.types import CloseStockNotInPortfolioException, LongShort, OpenClose, Portfolio, Position
 from zipbird.strategy.strategy_executor import StrategyExecutor, _create_closing_orders, _get_extra_cash_after_closing, _split_signals
 
+
+def batch(signals):
+    return SignalBatch.from_signals(
+        signals, pd.Index(['AAPL', 'GOOG', 'MFST', 'META', 'AAPL1', 'GOOG1', 'MFST1']))
+
+
 class TestStrategyExecutor(unittest.TestCase):
     pipeline_data = pd.DataFrame({'close': {'AAPL': 100, 'GOOG': 200, 'MFST': 300}})
 
@@ -22,7 +28,7 @@ class TestStrategyExecutor(unittest.TestCase):
             Signal.make_close_long('GOOG'),
             Signal.make_close_short('MFST'),
         ]
-        expected_cash = _get_extra_cash_after_closing(portfolio.positions, to_close, self.pipeline_data)
+        expected_cash = _get_extra_cash_after_closing(portfolio.positions, batch(to_close), self.pipeline_data)
         # 100 * 100 + 200 * 200  - 300 * 300 = -40000
         self.assertEqual(expected_cash, -40000)
 
@@ -32,7 +38,7 @@ class TestStrategyExecutor(unittest.TestCase):
             Signal.make_close_long('AAPL'),
         ]
         with self.assertRaises(CloseStockNotInPortfolioException):
-            _get_extra_cash_after_closing(portfolio.positions, to_close, self.pipeline_data)
+            _get_extra_cash_after_closing(portfolio.positions, batch(to_close), self.pipeline_data)
 
     def test_get_cash_after_closing_with_no_close_signals(self):
         portfolio = Portfolio(portfolio_cash=10000, positions={
@@ -41,7 +47,7 @@ class TestStrategyExecutor(unittest.TestCase):
             'MFST': Position('MFST', -300),
         })
         to_close = []
-        expected_cash = _get_extra_cash_after_closing(portfolio.positions, to_close, self.pipeline_data)
+        expected_cash = _get_extra_cash_after_closing(portfolio.positions, batch(to_close), self.pipeline_data)
         self.assertEqual(expected_cash, 0)
 
     def test_split_signals(self):
@@ -53,13 +59,13 @@ class TestStrategyExecutor(unittest.TestCase):
             Signal.make_open_long('GOOG1'),
             Signal.make_open_short('MFST1'),
         ]
-        to_open, to_close = _split_signals(signals)
-        self.assertEqual(to_open, [
+        to_open, to_close = _split_signals(batch(signals))
+        self.assertEqual(to_open.to_signals(), [
             Signal.make_open_long('AAPL1'),
             Signal.make_open_long('GOOG1'),
             Signal.make_open_short('MFST1'),
         ])
-        self.assertEqual(to_close, [
+        self.assertEqual(to_close.to_signals(), [
             Signal.make_close_long('AAPL'),
             Signal.make_close_long('GOOG'),
             Signal.make_close_short('MFST'),
@@ -77,7 +83,7 @@ class TestStrategyExecutor(unittest.TestCase):
             Signal.make_close_long('GOOG'),
             Signal.make_close_short('META'),
         ]
-        orders = _create_closing_orders(positions, to_close)
+        orders = _create_closing_orders(positions, batch(to_close))
         self.assertEqual(orders, [
             ShareOrder('AAPL', OpenClose.Close, LongShort.Long, amount=100),
             ShareOrder('GOOG', OpenClose.Close, LongShort.Long, amount=200),
@@ -90,7 +96,7 @@ class TestStrategyExecutor(unittest.TestCase):
             Signal.make_close_long('AAPL'),
         ]
         with self.assertRaises(CloseStockNotInPortfolioException):
-            _create_closing_orders(positions, to_close)
+            _create_closing_orders(positions, batch(to_close))
 
     def test_create_closing_orders_with_no_close_signals(self):
         positions = {
@@ -100,7 +106,7 @@ class TestStrategyExecutor(unittest.TestCase):
             'META': Position('GOOG', -200),
         }
         to_close = []
-        orders = _create_closing_orders(positions, to_close)
+        orders = _create_closing_orders(positions, batch(to_close))
         self.assertEqual(orders, [])
 
     def test_run_strategy_executor(self):
@@ -0,0 +1,47 @@
+import unittest
+
+from zipbird.position_manager.atr_position_sizer import ATRPositionSizer
+from zipbird.strategies.s31_trend_50 import S31Trend50
+from zipbird.strategy.strategy_executor import StrategyExecutor
+from zipbird.strategy.sweep import (
+    InvalidParamGridException, make_sweep_executor, param_combinations, parse_param_values)
+
+
+class TestSweep(unittest.TestCase):
+
+    def test_parse_param_values(self):
+        self.assertEqual(('sma_period', [50, 100]), parse_param_values('sma_period=50,100'))
+        self.assertEqual(('fraction_risk', [0.01, 0.02]), parse_param_values('fraction_risk=0.01,.02'))
+        self.assertEqual(('balance_freq', ['weekly', 'monthly']),
+                         parse_param_values('balance_freq=weekly,monthly'))
+        self.assertEqual(('use_spx', [True, False]), parse_param_values('use_spx=True,False'))
+        with self.assertRaises(InvalidParamGridException):
+            parse_param_values('sma_period')
+
+    def test_param_combinations(self):
+        base = {'a': 1, 'b': 2, 'c': 3}
+        combinations = param_combinations(base, {'a': [10, 20], 'c': [30, 40]})
+        self.assertEqual([
+            {'a': 10, 'b': 2, 'c': 30},
+            {'a': 10, 'b': 2, 'c': 40},
+            {'a': 20, 'b': 2, 'c': 30},
+            {'a': 20, 'b': 2, 'c': 40},
+        ], combinations)
+        self.assertEqual([base], param_combinations(base, {}))
+        with self.assertRaises(InvalidParamGridException):
+            param_combinations(base, {'d': [1]})
+
+    def test_make_sweep_executor(self):
+        params = {'max_equity_per_position': 0.1, 'fraction_risk': 0.01}
+        base = StrategyExecutor(S31Trend50('s31', params), ATRPositionSizer(params))
+        new_params = {'max_equity_per_position': 0.2, 'fraction_risk': 0.02}
+        executor = make_sweep_executor(base, 's31-001', new_params)
+        self.assertIsInstance(executor.strategy, S31Trend50)
+        self.assertIsInstance(executor.position_sizer, ATRPositionSizer)
+        self.assertEqual('s31-001', executor.strategy.get_name())
+        self.assertEqual(0.2, executor.position_sizer.get_max_equity_per_position())
+        self.assertEqual('s31', base.strategy.get_name())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import sqlite3
+import unittest
+
+import pandas as pd
+
+from zipbird.basic.types import Equity
+from zipbird.strategy import pipleine_const as const
+from zipbird.strategy.pipeline_store import CompactSqlitePipelineStore, SqlitePipelineStore
+from zipbird.utils.transfer_db import (TransferDb, TransferVerificationException,
+                                       indicator_table_name, migrate_to_compact)
+
+AAPL = Equity('AAPL')
+AAPL.sid = 1
+TSLA = Equity('TSLA')
+TSLA.sid = 2
+
+DF1 = pd.DataFrame({'close': [20., 39.], 'adx_10': [1., 9.], 'i_S&P 500': [1., 0.]},
+                   index=[AAPL, TSLA])
+DF2 = pd.DataFrame({'close': [21., 40.], 'rsi_3': [50., None]}, index=[AAPL, TSLA])
+DAY1 = pd.Timestamp('2012-01-03')
+DAY2 = pd.Timestamp('2012-01-04')
+
+
+class Interrupted(Exception):
+    pass
+
+
+class TestTransferDb(unittest.TestCase):
+
+    def setUp(self):
+        self.old_db_conn = sqlite3.connect(':memory:')
+        self.new_db_conn = sqlite3.connect(':memory:')
+        store = SqlitePipelineStore(self.old_db_conn)
+        store.prepare(start_fresh=True)
+        store.upsert_metadata({'start_day': '2012-01-03', 'columns': 'close,adx_10'})
+        store.record(DAY1, DF1)
+        store.record(DAY2, DF2)
+        store.finish()
+
+    def tearDown(self):
+        self.old_db_conn.close()
+        self.new_db_conn.close()
+
+    def test_migrate_to_compact(self):
+        self.assertEqual(9, migrate_to_compact(self.old_db_conn, self.new_db_conn, batch_size=3))
+        store = CompactSqlitePipelineStore(self.new_db_conn)
+        self.assertEqual('close,adx_10', store.get_metadata('columns'))
+        self.assertEqual(9, self.new_db_conn.execute(
+            f'SELECT COUNT(*) FROM {const.COMPACT_TABLE_NAME}').fetchone()[0])
+
+        old_chunk = SqlitePipelineStore(self.old_db_conn).load_chunk(
+            DAY1, DAY2, ['close', 'adx_10', 'rsi_3'])
+        new_chunk = store.load_chunk(DAY1, DAY2, ['close', 'adx_10', 'rsi_3'])
+        for day in (DAY1, DAY2):
+            pd.testing.assert_frame_equal(
+                old_chunk.for_trade_day(day).sort_index(axis=1),
+                new_chunk.for_trade_day(day).sort_index(axis=1),
+                check_names=False)
+
+
+    def count_rows(self, ind_name):
+        return self.new_db_conn.execute(
+            f'SELECT COUNT(*) FROM {indicator_table_name(ind_name)}').fetchone()[0]
+
+    def test_transfer_to_new_db(self):
+        messages = []
+        transfer = TransferDb(self.old_db_conn, self.new_db_conn, batch_size=4,
+                              progress=messages.append)
+        self.assertEqual(9, transfer.transfer_to_new_db())
+        self.assertEqual(4, self.count_rows('close'))
+        self.assertEqual(2, self.count_rows('i_S&P 500'))
+        self.assertEqual(1, self.count_rows('rsi_3'))
+        self.assertTrue(messages[0].startswith('4/9 rows'))
+        self.assertEqual('Verified 4 indicators, 9 rows', messages[-1])
+        self.assertEqual([('2012-01-03', 'TSLA', 2, 9.)], self.new_db_conn.execute(
+            f"SELECT * FROM {indicator_table_name('adx_10')} WHERE ticker = 'TSLA'").fetchall())
+
+    def test_resume_after_interruption(self):
+        def interrupt(message):
+            raise Interrupted(message)
+        transfer = TransferDb(self.old_db_conn, self.new_db_conn, batch_size=4,
+                              progress=interrupt)
+        with self.assertRaises(Interrupted):
+            transfer.transfer_to_new_db()
+
+        transfer = TransferDb(self.old_db_conn, self.new_db_conn, batch_size=4,
+                              progress=lambda message: None)
+        self.assertEqual(5, transfer.transfer_to_new_db())
+        self.assertEqual(4, self.count_rows('close'))
+
+    def test_verification_fails(self):
+        transfer = TransferDb(self.old_db_conn, self.new_db_conn, progress=lambda message: None)
+        transfer.transfer_to_new_db()
+        self.new_db_conn.execute(f"DELETE FROM {indicator_table_name('rsi_3')}")
+        with self.assertRaisesRegex(TransferVerificationException, 'rsi_3: 1 rows'):
+            transfer.verify()
+        self.new_db_conn.execute(
+            f"UPDATE {indicator_table_name('close')} SET ind_value = 0 WHERE ticker = 'AAPL'")
+        with self.assertRaisesRegex(TransferVerificationException, 'close: checksum'):
+            transfer.verify()
+
+
+if __name__ == '__main__':
+    unittest.main()
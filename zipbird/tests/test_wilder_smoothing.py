@@ -0,0 +1,119 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+import talib
+from parameterized import parameterized
+
+from zipbird.utils import factor_utils, wilder_smoothing
+
+TOLERANCE = 1e-9
+
+
+def make_prices(n_rows=130, n_cols=40, seed=0):
+    rng = np.random.default_rng(seed)
+    closes = 50 * np.exp(np.cumsum(rng.normal(0, 0.02, (n_rows, n_cols)), axis=0))
+    highs = closes * (1 + rng.uniform(0, 0.03, (n_rows, n_cols)))
+    lows = closes * (1 - rng.uniform(0, 0.03, (n_rows, n_cols)))
+    # newly listed stocks have leading NaNs
+    for col in range(0, n_cols, 4):
+        start = rng.integers(0, n_rows - 10)
+        closes[:start, col] = np.nan
+        highs[:start, col] = np.nan
+        lows[:start, col] = np.nan
+    # no price movement at all
+    closes[:, 1] = highs[:, 1] = lows[:, 1] = 10.0
+    # no data at all
+    closes[:, 2] = highs[:, 2] = lows[:, 2] = np.nan
+    # missing bar in the middle
+    closes[90, 3] = np.nan
+    return highs, lows, closes
+
+
+class TestWilderSmoothing(unittest.TestCase):
+
+    def assert_same_as_talib(self, result, expected):
+        np.testing.assert_array_equal(np.isnan(result), np.isnan(expected))
+        np.testing.assert_allclose(result, expected, rtol=0, atol=TOLERANCE, equal_nan=True)
+
+    @parameterized.expand([2, 3, 7, 14, 40])
+    def test_rsi(self, period):
+        _, _, closes = make_prices()
+        expected = np.column_stack(
+            [talib.RSI(col, timeperiod=period) for col in closes.T])
+        self.assert_same_as_talib(wilder_smoothing.rsi(closes, period), expected)
+
+    @parameterized.expand([1, 3, 10, 20, 40])
+    def test_atr(self, period):
+        highs, lows, closes = make_prices()
+        expected = np.column_stack(
+            [talib.ATR(h, l, c, timeperiod=period) for h, l, c in zip(highs.T, lows.T, closes.T)])
+        self.assert_same_as_talib(wilder_smoothing.atr(highs, lows, closes, period), expected)
+
+    @parameterized.expand([3, 10, 20, 40])
+    def test_natr(self, period):
+        highs, lows, closes = make_prices()
+        expected = np.column_stack(
+            [talib.NATR(h, l, c, timeperiod=period) for h, l, c in zip(highs.T, lows.T, closes.T)])
+        self.assert_same_as_talib(wilder_smoothing.natr(highs, lows, closes, period), expected)
+
+    @parameterized.expand([2, 7, 10, 20])
+    def test_adx(self, period):
+        highs, lows, closes = make_prices()
+        expected = np.column_stack(
+            [talib.ADX(h, l, c, timeperiod=period) for h, l, c in zip(highs.T, lows.T, closes.T)])
+        self.assert_same_as_talib(wilder_smoothing.adx(highs, lows, closes, period), expected)
+
+    @parameterized.expand([3, 14])
+    def test_window_averages(self, period):
+        highs, lows, closes = make_prices()
+        # only the columns without NaN
+        cols = [c for c in range(4, closes.shape[1]) if c % 4]
+        highs, lows, closes = highs[:, cols], lows[:, cols], closes[:, cols]
+        tr = wilder_smoothing.true_range(highs, lows, closes)
+        length = period + 30
+        last_rows = np.arange(length - 1, len(closes))
+        expected = np.array([wilder_smoothing.atr(highs[e - length + 1:e + 1], lows[e - length + 1:e + 1],
+                                                  closes[e - length + 1:e + 1], period)[-1]
+                             for e in last_rows])
+        result = wilder_smoothing.window_averages(tr, last_rows, length, period)
+        self.assert_same_as_talib(result, expected)
+
+    @parameterized.expand([2, 7, 14])
+    def test_window_adx(self, period):
+        highs, lows, closes = make_prices()
+        # the columns without NaN. The flat column 1 has no DX, as do a few
+        # windows without directional movement, and window_adx leaves them NaN
+        cols = [1] + [c for c in range(4, closes.shape[1]) if c % 4]
+        highs, lows, closes = highs[:, cols], lows[:, cols], closes[:, cols]
+        length = 2 * period + 30
+        last_rows = np.arange(length - 1, len(closes))
+        expected = np.array([wilder_smoothing.adx(highs[e - length + 1:e + 1], lows[e - length + 1:e + 1],
+                                                  closes[e - length + 1:e + 1], period)[-1]
+                             for e in last_rows])
+        # the windows see the bars halved
+        scales = np.full(expected.shape, 2.0)
+        result = wilder_smoothing.window_adx(wilder_smoothing.adx_history(highs, lows, closes, period),
+                                             last_rows, length, period, scales)
+        computed = ~np.isnan(result)
+        self.assertFalse(computed[:, 0].any())
+        self.assertGreater(computed[:, 1:].mean(), 0.99)
+        np.testing.assert_allclose(result[computed], expected[computed], rtol=0, atol=TOLERANCE)
+
+    def test_window_shorter_than_period(self):
+        closes = np.arange(10.0, 20.0).reshape(5, 2)
+        self.assertTrue(np.isnan(wilder_smoothing.rsi(closes, 10)).all())
+
+    def test_factor_uses_same_values_as_talib(self):
+        highs, lows, closes = make_prices()
+        factor = factor_utils.ADXFactor(adx_len=10, window_length=len(closes))
+        out = np.empty(closes.shape[1])
+        out_talib = np.empty(closes.shape[1])
+        today = pd.Timestamp('2020-01-02')
+        factor.compute(today, None, out, closes, highs, lows, 10, False)
+        factor.compute(today, None, out_talib, closes, highs, lows, 10, True)
+        np.testing.assert_allclose(out, out_talib, rtol=0, atol=TOLERANCE)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,6 +9,8 @@ from zipline_norgatedata.pipelines import NorgateDataUnadjustedClose
 import talib
 import numpy as np
 
+from zipbird.utils import wilder_smoothing
+
 
 def get_universe_screen(
         min_price:float,
@@ -23,26 +25,42 @@ def get_universe_screen(
         (unadjusted_close > min_price))
     return universe_screen
 
+def average_dollar_volume(close, volume):
+    return zipline_math_utils.nansum(close * volume, axis=0) / len(close)
+
+
+def dollar_volume_rank(dollar_volume):
+    """Rank of each asset, the highest dollar volume first"""
+    return len(dollar_volume) - dollar_volume.argsort().argsort() + 1
+
+
 class DollarVolumeRankFactor(CustomFactor):
     inputs = (USEquityPricing.close, USEquityPricing.volume)
     window_length = 50
     
     def compute(self, today, assets, out, close, volume):
-        dollar_volume = zipline_math_utils.nansum(close * volume, axis=0) / len(close)
-        out[:] = len(dollar_volume) - dollar_volume.argsort().argsort() + 1
+        out[:] = dollar_volume_rank(average_dollar_volume(close, volume))
 
 
 class RSIFactor(CustomFactor):
+    """Wilder RSI.
+
+    Computed for all assets at once with wilder_smoothing. Set use_talib
+    to fall back to calling talib per asset.
+    """
     inputs = (USEquityPricing.close,)  
-    params = {'rsi_len' : 3,}
+    params = {'rsi_len' : 3, 'use_talib': False}
     window_length = 100
 
-    def compute(self, today, assets, out, closes, rsi_len):
-        def rsi_func(ts):
-            return talib.RSI(ts, timeperiod=rsi_len)[-1]
-        if closes.size > 0:
-            rsi = np.apply_along_axis(func1d=rsi_func, axis=0, arr=closes)
-            out[:] = rsi
+    def compute(self, today, assets, out, closes, rsi_len, use_talib):
+        if closes.size == 0:
+            return
+        if use_talib:
+            def rsi_func(ts):
+                return talib.RSI(ts, timeperiod=rsi_len)[-1]
+            out[:] = np.apply_along_axis(func1d=rsi_func, axis=0, arr=closes)
+        else:
+            out[:] = wilder_smoothing.rsi(closes, rsi_len)[-1]
 
 
 def _high_low_close_loop(highs, lows, closes, timeperiod, func):
@@ -66,30 +84,39 @@ def _close_loop(closes, timeperiod, func):
 
 class ATRFactor(CustomFactor):
     inputs = (USEquityPricing.close, USEquityPricing.high, USEquityPricing.low,)  
-    params = ('atr_len',)
+    params = {'atr_len': 14, 'use_talib': False}
     window_length = 100
 
-    def compute(self, today, assets, out, closes, highs, lows, atr_len):
-        out[:] = _high_low_close_loop(highs, lows, closes, atr_len, talib.ATR)
+    def compute(self, today, assets, out, closes, highs, lows, atr_len, use_talib):
+        if use_talib:
+            out[:] = _high_low_close_loop(highs, lows, closes, atr_len, talib.ATR)
+        else:
+            out[:] = wilder_smoothing.atr(highs, lows, closes, atr_len)[-1]
 
 
 
 class ATRPFactor(CustomFactor):
     inputs = (USEquityPricing.close, USEquityPricing.high, USEquityPricing.low,)  
-    params = ('atr_len',)
+    params = {'atr_len': 14, 'use_talib': False}
     window_length = 100
 
-    def compute(self, today, assets, out, closes, highs, lows, atr_len):
-        out[:] = _high_low_close_loop(highs, lows, closes, atr_len, talib.NATR)
+    def compute(self, today, assets, out, closes, highs, lows, atr_len, use_talib):
+        if use_talib:
+            out[:] = _high_low_close_loop(highs, lows, closes, atr_len, talib.NATR)
+        else:
+            out[:] = wilder_smoothing.natr(highs, lows, closes, atr_len)[-1]
 
 
 class ADXFactor(CustomFactor):
     inputs = (USEquityPricing.close, USEquityPricing.high, USEquityPricing.low,)  
-    params = ('adx_len',)
+    params = {'adx_len': 14, 'use_talib': False}
     window_length = 100
 
-    def compute(self, today, assets, out, closes, highs, lows, adx_len):
-        out[:] = _high_low_close_loop(highs, lows, closes, adx_len, talib.ADX)
+    def compute(self, today, assets, out, closes, highs, lows, adx_len, use_talib):
+        if use_talib:
+            out[:] = _high_low_close_loop(highs, lows, closes, adx_len, talib.ADX)
+        else:
+            out[:] = wilder_smoothing.adx(highs, lows, closes, adx_len)[-1]
 
 
 class ROCFactor(CustomFactor):
@@ -100,13 +127,24 @@ class ROCFactor(CustomFactor):
         out[:] = _close_loop(closes, timeperiod=roc_len, func=talib.ROCP)
 
 
+def std_percent(closes):
+    std = zipline_math_utils.nanstd(closes, axis=0)
+    close_sma = zipline_math_utils.nanmean(closes, axis=0)
+    return (std / close_sma) * 100
+
+
+def percentile_rank(volatility):
+    # Calculate percentile ranks
+    # This gives a value between 0 and 1, where 1 is the highest volatility
+    percentile_ranks = (volatility.argsort().argsort() + 1) / len(volatility)
+    return percentile_ranks * 100
+
+
 class StdFactorPercent(CustomFactor):
     inputs = (USEquityPricing.close,)
     window_length = 50
     def compute(self, today, assets, out, closes):
-        std = zipline_math_utils.nanstd(closes, axis=0)
-        close_sma = zipline_math_utils.nanmean(closes, axis=0)
-        out[:] = (std / close_sma) * 100
+        out[:] = std_percent(closes)
 
 
 class StdPercentileFactor(CustomFactor):
@@ -114,15 +152,7 @@ class StdPercentileFactor(CustomFactor):
     window_length = 50
     
     def compute(self, today, assets, out, closes):
-        std = zipline_math_utils.nanstd(closes, axis=0)
-        close_sma = zipline_math_utils.nanmean(closes, axis=0)
-        volatility = (std / close_sma) * 100
-        
-        # Calculate percentile ranks
-        # This gives a value between 0 and 1, where 1 is the highest volatility
-        percentile_ranks = (volatility.argsort().argsort() + 1) / len(volatility)
-        
-        out[:] = percentile_ranks * 100
+        out[:] = percentile_rank(std_percent(closes))
 
 class ConsecutiveUpFactor(CustomFactor):
     """Consecutive up days.
@@ -0,0 +1,311 @@
+"""Factors that carry indicator state from one session to the next.
+
+The factors in factor_utils recompute their indicator over the full window
+every session. The factors here keep per asset state (running sums, Wilder
+averages, running max) and advance it by one bar per session, so the work
+per session does not grow with the window length.
+
+The window is still requested from zipline and is used to seed the state
+when an asset has none: on the first session, for an asset entering the
+universe, after a gap, or when split/dividend adjustments rewrote its price
+history (detected by the bar seen last session no longer matching the
+second to last bar of today's window).
+
+SMA, std, max and ROC give the same values as their windowed counterparts
+(up to rounding of the running sums). The Wilder indicators keep smoothing
+over the whole history instead of restarting at the beginning of the
+window, so they differ from talib over a period + EXTRA_LENGTH window by the
+remaining weight of the window seed, which decays as (1 - 1/period)^100.
+"""
+from abc import abstractmethod
+
+import numpy as np
+import pandas as pd
+
+from zipline.pipeline.data import USEquityPricing
+from zipline.pipeline.factors import CustomFactor
+
+from zipbird.utils import wilder_smoothing
+
+# Last update day of assets without state
+_NO_DAY = np.iinfo(np.int64).min
+
+
+class IncrementalFactor(CustomFactor):
+    """Base class of factors that advance per asset state by one bar.
+
+    Subclasses set state_names and implement
+      seed(windows, **params): state computed from full windows
+      step(state, rows, **params): state advanced by today's bar
+      output(state, rows, **params): factor values
+    where rows holds, for every input, the rows of the window listed by
+    update_rows(). update_rows() must end with the last two rows.
+    """
+    state_names = ()
+
+    def update_rows(self, **params):
+        """Rows of the window a one bar update reads"""
+        return [-2, -1]
+
+    def ready(self, state, **params):
+        """Returns which assets have state that step() can advance"""
+        return np.logical_and.reduce([np.isfinite(values) for values in state])
+
+    @abstractmethod
+    def seed(self, windows, **params):
+        pass
+
+    @abstractmethod
+    def step(self, state, rows, **params):
+        pass
+
+    @abstractmethod
+    def output(self, state, rows, **params):
+        pass
+
+    def _format_inputs(self, windows, column_mask):
+        # Pass full width windows to compute(), which only copies the masked
+        # columns of the rows it reads instead of whole windows every session.
+        self._column_mask = column_mask
+        return [next(window) for window in windows]
+
+    def _reset(self):
+        self._last_day = _NO_DAY
+        self._updated_on = np.full(0, _NO_DAY)
+        self._last_inputs = np.full((len(self.inputs), 0), np.nan)
+        self._state = {name: np.full(0, np.nan) for name in self.state_names}
+
+    def _reserve(self, size):
+        grow = size - len(self._updated_on)
+        if grow <= 0:
+            return
+        self._updated_on = np.concatenate([self._updated_on, np.full(grow, _NO_DAY)])
+        self._last_inputs = np.concatenate(
+            [self._last_inputs, np.full((len(self.inputs), grow), np.nan)], axis=1)
+        for name, values in self._state.items():
+            self._state[name] = np.concatenate([values, np.full(grow, np.nan)])
+
+    def compute(self, today, assets, out, *inputs, **params):
+        # compute() is also called directly with already masked windows
+        column_mask = self.__dict__.pop('_column_mask', None)
+        if column_mask is None:
+            columns = np.arange(len(assets))
+        else:
+            columns = np.flatnonzero(column_mask)
+        day = pd.Timestamp(today).value
+        if not hasattr(self, '_last_day') or day <= self._last_day:
+            # a new run over the same (interned) term starts from scratch
+            self._reset()
+
+        sids = np.asarray(assets, dtype=np.int64)
+        self._reserve(sids.max() + 1 if len(sids) else 0)
+        rows = [window[self.update_rows(**params)][:, columns] for window in inputs]
+
+        last_inputs = self._last_inputs[:, sids]
+        seen_inputs = np.array([input_rows[-2] for input_rows in rows])
+        same_inputs = (last_inputs == seen_inputs) | (np.isnan(last_inputs) & np.isnan(seen_inputs))
+        continues = (self._updated_on[sids] == self._last_day) & same_inputs.all(axis=0)
+
+        state = tuple(self._state[name][sids] for name in self.state_names)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            stale = ~(continues & self.ready(state, **params))
+            if self.state_names:
+                state = tuple(self.step(state, rows, **params))
+                if stale.any():
+                    windows = [window[:, columns[stale]] for window in inputs]
+                    for values, seeded in zip(state, self.seed(windows, **params)):
+                        values[stale] = seeded
+            out[:] = self.output(state, rows, **params)
+
+        for name, values in zip(self.state_names, state):
+            self._state[name][sids] = values
+        self._last_inputs[:, sids] = [input_rows[-1] for input_rows in rows]
+        self._updated_on[sids] = day
+        self._last_day = day
+
+
+class IncrementalSMAFactor(IncrementalFactor):
+    """Simple moving average from a running sum.
+
+    Needs window_length = sma_len + 1 to see the bar leaving the average.
+    """
+    inputs = (USEquityPricing.close,)
+    params = ('sma_len',)
+    state_names = ('total', 'count')
+
+    def update_rows(self, sma_len):
+        return [-sma_len - 1, -2, -1]
+
+    def seed(self, windows, sma_len):
+        closes = windows[0][-sma_len:]
+        return np.nansum(closes, axis=0), np.sum(~np.isnan(closes), axis=0)
+
+    def step(self, state, rows, sma_len):
+        total, count = state
+        leaving, _, entering = rows[0]
+        total = total + np.nan_to_num(entering) - np.nan_to_num(leaving)
+        count = count + ~np.isnan(entering) - ~np.isnan(leaving)
+        return total, count
+
+    def output(self, state, rows, sma_len):
+        total, count = state
+        return np.where(count > 0, total / count, np.nan)
+
+
+class IncrementalStdPercentFactor(IncrementalFactor):
+    """Std of close as percent of the mean close, from running sums.
+
+    Same as StdFactorPercent over std_len bars. Needs window_length =
+    std_len + 1 to see the bar leaving the window.
+    """
+    inputs = (USEquityPricing.close,)
+    params = ('std_len',)
+    state_names = ('total', 'total_squares', 'count')
+
+    def update_rows(self, std_len):
+        return [-std_len - 1, -2, -1]
+
+    def seed(self, windows, std_len):
+        closes = windows[0][-std_len:]
+        return (np.nansum(closes, axis=0),
+                np.nansum(closes * closes, axis=0),
+                np.sum(~np.isnan(closes), axis=0))
+
+    def step(self, state, rows, std_len):
+        total, total_squares, count = state
+        leaving, _, entering = (np.nan_to_num(r) for r in rows[0])
+        total = total + entering - leaving
+        total_squares = total_squares + entering * entering - leaving * leaving
+        count = count + ~np.isnan(rows[0][-1]) - ~np.isnan(rows[0][0])
+        return total, total_squares, count
+
+    def output(self, state, rows, std_len):
+        total, total_squares, count = state
+        mean = total / count
+        std = np.sqrt(np.maximum(total_squares / count - mean * mean, 0.0))
+        return np.where(count > 0, (std / mean) * 100, np.nan)
+
+
+class IncrementalMaxInWindowFactor(IncrementalFactor):
+    """Max close in the window, from a running max.
+
+    Same as MaxInWindowFactor: NaN if any close in the window is NaN. The
+    running max is seeded again from the window only when it is about to
+    leave the window.
+    """
+    inputs = (USEquityPricing.close,)
+    window_length = 50
+    # age is the number of bars since the max / the latest NaN
+    state_names = ('max', 'age', 'nan_age')
+
+    def ready(self, state, **params):
+        max_value, age, _ = state
+        return np.isfinite(max_value) & (age + 1 < self.window_length)
+
+    def seed(self, windows):
+        closes = windows[0]
+        reversed_closes = closes[::-1]
+        missing = np.isnan(reversed_closes)
+        filled = np.where(missing, -np.inf, reversed_closes)
+        nan_age = np.where(missing.any(axis=0), missing.argmax(axis=0), len(closes))
+        return np.fmax.reduce(closes, axis=0), filled.argmax(axis=0), nan_age
+
+    def step(self, state, rows):
+        max_value, age, nan_age = state
+        closes = rows[0][-1]
+        newer = closes >= max_value
+        return (np.where(newer, closes, max_value),
+                np.where(newer, 0, age + 1),
+                np.where(np.isnan(closes), 0, nan_age + 1))
+
+    def output(self, state, rows):
+        max_value, _, nan_age = state
+        return np.where(nan_age < self.window_length, np.nan, max_value)
+
+
+class IncrementalROCFactor(IncrementalFactor):
+    """Rate of change over roc_len bars, same as talib.ROCP.
+
+    Needs no state, only the first and last bar of a roc_len + 1 window.
+    """
+    inputs = (USEquityPricing.close,)
+    params = ('roc_len',)
+
+    def update_rows(self, roc_len):
+        return [-roc_len - 1, -2, -1]
+
+    def ready(self, state, **params):
+        return True
+
+    def seed(self, windows, roc_len):
+        return ()
+
+    def step(self, state, rows, roc_len):
+        return state
+
+    def output(self, state, rows, roc_len):
+        prev_closes, _, closes = rows[0]
+        return np.where(prev_closes != 0, (closes - prev_closes) / prev_closes, 0.0)
+
+
+class IncrementalRSIFactor(IncrementalFactor):
+    """Wilder RSI carried across sessions"""
+    inputs = (USEquityPricing.close,)
+    params = ('rsi_len',)
+    state_names = ('avg_gain', 'avg_loss')
+
+    def seed(self, windows, rsi_len):
+        avg_gain, avg_loss = wilder_smoothing.rsi_averages(windows[0], rsi_len)
+        return avg_gain[-1], avg_loss[-1]
+
+    def step(self, state, rows, rsi_len):
+        prev_closes, closes = rows[0]
+        return wilder_smoothing.rsi_step(*state, prev_closes, closes, rsi_len)
+
+    def output(self, state, rows, rsi_len):
+        avg_gain, avg_loss = state
+        return wilder_smoothing.rsi_from_averages(avg_gain.copy(), avg_loss.copy())
+
+
+class IncrementalATRFactor(IncrementalFactor):
+    """Wilder ATR carried across sessions"""
+    inputs = (USEquityPricing.close, USEquityPricing.high, USEquityPricing.low,)
+    params = ('atr_len',)
+    state_names = ('avg_tr',)
+
+    def seed(self, windows, atr_len):
+        closes, highs, lows = windows
+        return (wilder_smoothing.atr(highs, lows, closes, atr_len)[-1],)
+
+    def step(self, state, rows, atr_len):
+        closes, highs, lows = rows
+        return (wilder_smoothing.atr_step(state[0], highs[-1], lows[-1], closes[-2], atr_len),)
+
+    def output(self, state, rows, atr_len):
+        return state[0]
+
+
+class IncrementalATRPFactor(IncrementalATRFactor):
+    """Wilder ATR as percent of close, carried across sessions"""
+
+    def output(self, state, rows, atr_len):
+        return wilder_smoothing.natr_from_atr(state[0].copy(), rows[0][-1])
+
+
+class IncrementalADXFactor(IncrementalFactor):
+    """Wilder ADX carried across sessions"""
+    inputs = (USEquityPricing.close, USEquityPricing.high, USEquityPricing.low,)
+    params = ('adx_len',)
+    state_names = ('sum_plus_dm', 'sum_minus_dm', 'sum_tr', 'adx')
+
+    def seed(self, windows, adx_len):
+        closes, highs, lows = windows
+        return wilder_smoothing.adx_state(highs, lows, closes, adx_len)
+
+    def step(self, state, rows, adx_len):
+        closes, highs, lows = rows
+        return wilder_smoothing.adx_step(
+            state, highs[-2], lows[-2], closes[-2], highs[-1], lows[-1], adx_len)
+
+    def output(self, state, rows, adx_len):
+        return state[-1]
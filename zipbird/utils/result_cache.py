@@ -0,0 +1,120 @@
+"""Cache of backtest results keyed by a hash of everything that affects them.
+
+The key covers the strategy and position sizer classes and params, the
+bundle and the time of its latest ingestion, the date range, the capital,
+the engine, a code version and the zipline version. The code version hashes
+the zipbird sources a run depends on: the shared packages and the module of
+the strategy itself, so editing one strategy does not invalidate the cached
+runs of the others.
+"""
+import hashlib
+import inspect
+import json
+import os
+import pickle
+
+import pandas as pd
+import zipline
+from zipline.data import bundles
+from zipline.finance import slippage
+
+from zipbird.replay.order_collector import OrderCollector
+from zipbird.strategy.strategy_executor import StrategyExecutor
+
+DEFAULT_CACHE_DIR = 'results/cache'
+
+_PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# strategies only depend on their own module, the others do not affect runs
+_EXCLUDED_DIRS = ('strategies', 'notebook', 'tests')
+
+
+def code_version(strategy_executor:StrategyExecutor, package_dir:str=_PACKAGE_DIR) -> str:
+    """Hash of the zipbird sources a run of the strategy depends on"""
+    paths = []
+    for root, dirs, files in os.walk(package_dir):
+        if root == package_dir:
+            dirs[:] = [d for d in dirs if d not in _EXCLUDED_DIRS]
+        dirs[:] = [d for d in dirs if d != '__pycache__']
+        paths.extend(os.path.join(root, f) for f in files if f.endswith('.py'))
+    paths.append(inspect.getsourcefile(type(strategy_executor.strategy)))
+    digest = hashlib.sha256()
+    for path in sorted(set(paths)):
+        digest.update(os.path.relpath(path, package_dir).encode())
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def zipline_version() -> str:
+    """Version of the installed zipline and a hash of its slippage module,
+    which the locally patched zipline changes without a new version"""
+    with open(inspect.getsourcefile(slippage), 'rb') as f:
+        return f'{zipline.__version__}-{hashlib.sha256(f.read()).hexdigest()}'
+
+
+def bundle_ingestion(bundle:str, environ:dict=None) -> str | None:
+    """Time of the latest ingestion of the bundle, None if it was never ingested"""
+    try:
+        ingestions = bundles.ingestions_for_bundle(bundle, environ)
+    except FileNotFoundError:
+        return None
+    return str(ingestions[0]) if ingestions else None
+
+
+def result_key(strategy_executor:StrategyExecutor,
+               bundle:str,
+               ingestion:str | None,
+               start_date:pd.Timestamp,
+               end_date:pd.Timestamp,
+               capital:float,
+               engine:str,
+               version:str,
+               zipline_version:str) -> str:
+    strategy = strategy_executor.strategy
+    position_sizer = strategy_executor.position_sizer
+    config = {
+        'strategy': _class_name(strategy),
+        'strategy_name': strategy.get_name(),
+        'params': strategy.get_params(),
+        'position_sizer': _class_name(position_sizer),
+        'position_sizer_params': getattr(position_sizer, 'params', None),
+        'bundle': bundle,
+        'ingestion': ingestion,
+        'start': str(pd.Timestamp(start_date)),
+        'end': str(pd.Timestamp(end_date)),
+        'capital': float(capital),
+        'engine': engine,
+        'code_version': version,
+        'zipline_version': zipline_version,
+    }
+    encoded = json.dumps(config, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def _class_name(obj) -> str:
+    return f'{type(obj).__module__}.{type(obj).__qualname__}'
+
+
+class ResultCache:
+    """Perf frames and replay orders of runs, one pickle per result key"""
+    def __init__(self, cache_dir:str=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def _path(self, key:str) -> str:
+        return os.path.join(self.cache_dir, f'{key}.pickle')
+
+    def load(self, key:str) -> tuple[pd.DataFrame, OrderCollector] | None:
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            cached = pickle.load(f)
+        return cached['perf'], cached['replay_orders']
+
+    def save(self, key:str, perf:pd.DataFrame, replay_orders:OrderCollector):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # write then rename, so an interrupted run leaves no partial entry
+        path = self._path(key)
+        with open(f'{path}.tmp', 'wb') as f:
+            pickle.dump({'perf': perf, 'replay_orders': replay_orders}, f)
+        os.replace(f'{path}.tmp', path)
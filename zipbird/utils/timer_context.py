@@ -6,6 +6,7 @@ from contextlib import contextmanager
 class TimerContext:
     def __init__(self):
         self.timings = defaultdict(list)
+        self.counts = defaultdict(int)
         self._start_times = {}
     
     @contextmanager
@@ -34,6 +35,13 @@ class TimerContext:
         self.timings[section_name].append(duration)
         del self._start_times[section_name]
     
+    def add_count(self, section_name: str, count: int):
+        """Add to the number of items processed by a section.
+
+        The report shows the throughput of sections with counts.
+        """
+        self.counts[section_name] += count
+
     def report(self, decimals: int = 4) -> None:
         """Print a summary report of all timings.
         
@@ -58,4 +66,8 @@ class TimerContext:
             print(f"{'Total:':{max_name_len}} {total_time:.{decimals}f} seconds")
             if runs > 1:
                 print(f"{'Min:':{max_name_len}} {min(times):.{decimals}f} seconds")
-                print(f"{'Max:':{max_name_len}} {max(times):.{decimals}f} seconds")
\ No newline at end of file
+                print(f"{'Max:':{max_name_len}} {max(times):.{decimals}f} seconds")
+            if name in self.counts:
+                count = self.counts[name]
+                per_second = count / total_time if total_time > 0 else float('inf')
+                print(f"{'Items:':{max_name_len}} {count} ({per_second:,.0f} per second)")
\ No newline at end of file
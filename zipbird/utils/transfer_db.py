@@ -6,21 +6,59 @@ Convert this to a different format:
 Each indicator gets it's own table t_<ind_name>
 with columns
 trade_day, ticker, sid, ind_value
+
+The old table is read in rowid order, one batch at a time. Each batch is
+written together with a checkpoint (the last rowid copied) in one
+transaction, so an interrupted transfer resumes after the last committed
+batch. When done, row counts and value checksums of every indicator are
+compared between the two dbs.
 """
+import argparse
+import math
 import sqlite3
+import time
 from collections import defaultdict
 
 from zipbird.strategy import pipleine_const as const
+from zipbird.strategy.pipeline_store import METADATA_TABLE, CompactSqlitePipelineStore
 
 READ_BATCH_SIZE = 100_000
+CHECKPOINT_TABLE = 'transfer_checkpoint'
+INDICATOR_TABLE_PREFIX = 't_'
+# relative tolerance of the value checksums, sums are taken in a different order
+CHECKSUM_TOLERANCE = 1e-9
+
+
+class TransferVerificationException(Exception):
+    pass
+
+
+def indicator_table_name(ind_name: str) -> str:
+    """Quoted table name, indicator names like 'i_S&P 500' are not identifiers"""
+    return '"' + (INDICATOR_TABLE_PREFIX + ind_name).replace('"', '""') + '"'
+
 
 class TransferDb:
-    def __init__(self, old_db_conn: sqlite3.Connection, new_db_conn:sqlite3.Connection):
+    def __init__(self,
+                 old_db_conn: sqlite3.Connection,
+                 new_db_conn:sqlite3.Connection,
+                 batch_size: int = READ_BATCH_SIZE,
+                 progress=print):
         self.old_db_conn = old_db_conn
         self.new_db_conn = new_db_conn
+        self.batch_size = batch_size
+        self.progress = progress
+        self._created_tables = set()
+
+    def transfer_to_new_db(self) -> int:
+        """Copies all rows not copied yet, then verifies the new db.
 
-    def transfer_to_new_db(self):
-        old_cursor = self.old_db_conn.cursor()
+        Returns the number of rows copied by this call.
+        """
+        self._init_new_db()
+        last_rowid = self._get_checkpoint()
+        total = self.old_db_conn.execute(
+            f'SELECT COUNT(*) FROM {const.TABLE_NAME} WHERE rowid > ?', (last_rowid,)).fetchone()[0]
         columns = [
             const.IND_NAME,
             const.TRADE_DAY,
@@ -28,20 +66,131 @@ class TransferDb:
             const.SID,
             const.IND_VALUE
         ]
-        old_cursor.execute(
-            f"""SELECT {','.join(columns)} from {const.TABLE_NAME}""")
-        
-        new_cursor = self.new_db_conn.cursor()
+        query = f"""
+            SELECT rowid, {','.join(columns)} FROM {const.TABLE_NAME}
+            WHERE rowid > ? ORDER BY rowid LIMIT ?"""
+        copied = 0
+        start_time = time.perf_counter()
         while True:
-            rows = old_cursor.fetchmany(READ_BATCH_SIZE)
+            rows = self.old_db_conn.execute(query, (last_rowid, self.batch_size)).fetchall()
             if not rows:
                 break
             data_by_ind = defaultdict(list)
             for row in rows:
-                ind_name = row[0]
-                data_by_ind[ind_name].append(row[1:])
+                data_by_ind[row[1]].append(row[2:])
             for ind_name, ind_data in data_by_ind.items():
                 self._insert_to_new_db(ind_name, ind_data)
-            
+            last_rowid = rows[-1][0]
+            self._set_checkpoint(last_rowid)
+            self.new_db_conn.commit()
+
+            copied += len(rows)
+            elapsed = time.perf_counter() - start_time
+            self.progress(f'{copied}/{total} rows, {copied / elapsed:,.0f} rows/sec')
+        self.verify()
+        return copied
+
+    def _init_new_db(self):
+        self.new_db_conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE}
+            (name text PRIMARY KEY, value integer)""")
+        self.new_db_conn.commit()
+
+    def _get_checkpoint(self) -> int:
+        result = self.new_db_conn.execute(
+            f"SELECT value FROM {CHECKPOINT_TABLE} WHERE name = 'last_rowid'").fetchone()
+        return result[0] if result else 0
+
+    def _set_checkpoint(self, last_rowid: int):
+        self.new_db_conn.execute(
+            f"INSERT OR REPLACE INTO {CHECKPOINT_TABLE} (name, value) VALUES ('last_rowid', ?)",
+            (last_rowid,))
+
+    def _insert_to_new_db(self, ind_name: str, ind_data: list[tuple]):
+        table_name = indicator_table_name(ind_name)
+        if table_name not in self._created_tables:
+            self.new_db_conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table_name} (
+                  {const.TRADE_DAY} text,
+                  {const.TICKER} text,
+                  {const.SID} INTEGER,
+                  {const.IND_VALUE} REAL,
+                  PRIMARY KEY ({const.TRADE_DAY}, {const.TICKER})
+                ) WITHOUT ROWID""")
+            self._created_tables.add(table_name)
+        self.new_db_conn.executemany(f"""
+            INSERT OR REPLACE INTO {table_name}
+            ({const.TRADE_DAY}, {const.TICKER}, {const.SID}, {const.IND_VALUE})
+            VALUES (?, ?, ?, ?)""", ind_data)
+
+    def verify(self):
+        """Compares row count and value checksum of every indicator"""
+        old_stats = self.old_db_conn.execute(f"""
+            SELECT {const.IND_NAME}, COUNT(*), TOTAL({const.IND_VALUE})
+            FROM {const.TABLE_NAME} GROUP BY {const.IND_NAME}""").fetchall()
+        for ind_name, old_count, old_checksum in old_stats:
+            try:
+                new_count, new_checksum = self.new_db_conn.execute(f"""
+                    SELECT COUNT(*), TOTAL({const.IND_VALUE})
+                    FROM {indicator_table_name(ind_name)}""").fetchone()
+            except sqlite3.OperationalError:
+                raise TransferVerificationException(f'{ind_name}: table missing')
+            if new_count != old_count:
+                raise TransferVerificationException(
+                    f'{ind_name}: {old_count} rows in old db, {new_count} in new db')
+            if not math.isclose(old_checksum, new_checksum, rel_tol=CHECKSUM_TOLERANCE):
+                raise TransferVerificationException(
+                    f'{ind_name}: checksum {old_checksum} in old db, {new_checksum} in new db')
+        self.progress(f'Verified {len(old_stats)} indicators, '
+                      f'{sum(count for _, count, _ in old_stats)} rows')
+
+
+def migrate_to_compact(old_db_conn: sqlite3.Connection,
+                       new_db_conn: sqlite3.Connection,
+                       batch_size: int = READ_BATCH_SIZE) -> int:
+    """Copies the old 'pipeline_data' table and metadata into the compact schema
+    of CompactSqlitePipelineStore. Returns the number of rows copied."""
+    store = CompactSqlitePipelineStore(new_db_conn)
+    store.prepare(start_fresh=True)
+    old_cursor = old_db_conn.cursor()
+    store.upsert_metadata(dict(
+        old_cursor.execute(f'SELECT name, value FROM {METADATA_TABLE}').fetchall()))
+
+    old_cursor.execute(f"""
+        SELECT {const.TRADE_DAY}, {const.TICKER}, {const.SID}, {const.IND_NAME}, {const.IND_VALUE}
+        FROM {const.TABLE_NAME}""")
+    copied = 0
+    while True:
+        rows = old_cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        copied += store.record_rows(rows)
+        new_db_conn.commit()
+    store.finish()
+    return copied
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Convert the pipeline_data table of a pipeline db to another format')
+    parser.add_argument('old_db_name')
+    parser.add_argument('new_db_name')
+    parser.add_argument('--format', default='tables', choices=['tables', 'compact'],
+                        help='tables: a table per indicator, resumable. '
+                             'compact: the schema of CompactSqlitePipelineStore')
+    parser.add_argument('--batch_size', type=int, default=READ_BATCH_SIZE)
+    args = parser.parse_args()
+    old_db_conn = sqlite3.connect(f'file:{args.old_db_name}?mode=ro', uri=True)
+    new_db_conn = sqlite3.connect(args.new_db_name)
+    if args.format == 'compact':
+        copied = migrate_to_compact(old_db_conn, new_db_conn, args.batch_size)
+        new_db_conn.execute('VACUUM')
+    else:
+        copied = TransferDb(old_db_conn, new_db_conn, args.batch_size).transfer_to_new_db()
+    print(f'Copied {copied} rows to {args.new_db_name}')
+    new_db_conn.close()
+    old_db_conn.close()
 
 
+if __name__ == '__main__':
+    main()
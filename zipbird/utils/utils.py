@@ -1,6 +1,7 @@
 from datetime import date
 import pandas as pd
 import numpy as np
+import os
 import pickle
 import math
 
@@ -44,18 +45,28 @@ def dump_pickle(
             },
             file)
 
-def replay_filename(prefix:str, start_date:pd.Timestamp, end_date:pd.Timestamp, label:str=''):
-    return f'results/replay-{filename(prefix, start_date, end_date, label)}.csv'
+def replay_filename(prefix:str, start_date:pd.Timestamp, end_date:pd.Timestamp, label:str='', extension:str='csv'):
+    return f'results/replay-{filename(prefix, start_date, end_date, label)}.{extension}'
+
+def find_replay_filename(prefix:str, start_date:pd.Timestamp, end_date:pd.Timestamp, label:str=''):
+    """The .npy replay orders if they exist, the csv ones otherwise"""
+    npy_filename = replay_filename(prefix, start_date, end_date, label, 'npy')
+    if os.path.exists(npy_filename):
+        return npy_filename
+    return replay_filename(prefix, start_date, end_date, label)
 
 def dump_replay_orders(
         prefix:str,
         start_date:pd.Timestamp,
         end_date:pd.Timestamp,
         strategy,
-        label=''):
-    """Dump a csv file that contains replay orders"""
-    filename = replay_filename(prefix, start_date, end_date, label)
-    strategy.replay_order_container.write_orders(filename)
+        label='',
+        export_csv=False):
+    """Dump a .npy file that contains replay orders, and a csv file if export_csv"""
+    orders = strategy.replay_order_container
+    orders.write_orders(replay_filename(prefix, start_date, end_date, label, 'npy'))
+    if export_csv:
+        orders.write_orders(replay_filename(prefix, start_date, end_date, label))
 
 def compare_object(o1, o2):
     return (
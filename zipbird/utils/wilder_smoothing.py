@@ -0,0 +1,442 @@
+"""Batched Wilder smoothing kernels.
+
+These compute RSI, ATR, NATR and ADX for every asset column of a
+(days x assets) window at once, instead of calling talib once per column.
+Seeds are summed for all columns that start on the same row, and the Wilder
+recursion then walks the time axis updating all columns in place.
+
+The recursions follow talib's C implementation (same seed, same smoothing
+order, same zero guards), so results agree with talib run on the same window
+to within 1e-9 (absolute, on a 0..100 scale for RSI/ADX). As in talib's
+python wrapper, leading NaNs of a column are skipped and the lookback starts
+at the first row where all inputs are present. A NaN after that row is
+carried through the recursion the same way talib carries it.
+
+All kernels return an array of the same shape as the input, with NaN where
+the lookback is not yet satisfied. Factors use the last row. The *_step
+functions advance the state left after the last row by one more bar, for
+factors that carry state from one session to the next.
+
+window_averages and window_adx compute the value at the end of many
+overlapping windows from one pass over the whole history, for windows
+without NaN.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Same tolerance as talib's TA_IS_ZERO macro
+_ZERO_TOLERANCE = 0.00000001
+
+
+def _is_zero(values: np.ndarray) -> np.ndarray:
+    return (-_ZERO_TOLERANCE < values) & (values < _ZERO_TOLERANCE)
+
+
+def first_valid_row(*arrays: np.ndarray) -> np.ndarray:
+    """Returns, per column, the first row where all arrays are not NaN.
+
+    Columns without any such row get the number of rows.
+    """
+    valid = ~np.isnan(arrays[0])
+    for array in arrays[1:]:
+        valid &= ~np.isnan(array)
+    first = valid.argmax(axis=0)
+    first[~valid.any(axis=0)] = arrays[0].shape[0]
+    return first
+
+
+def _bar_true_range(highs: np.ndarray, lows: np.ndarray, prev_closes: np.ndarray,
+                    out: np.ndarray) -> np.ndarray:
+    """True range of bars with their previous closes, same as talib's TRUE_RANGE.
+
+    fmax keeps the current value when a difference is NaN, like talib's
+    `diff > tr` comparison does after a missing close.
+    """
+    np.subtract(highs, lows, out=out)
+    diff = np.subtract(highs, prev_closes)
+    np.fmax(out, np.abs(diff, out=diff), out=out)
+    np.subtract(lows, prev_closes, out=diff)
+    np.fmax(out, np.abs(diff, out=diff), out=out)
+    return out
+
+
+def true_range(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray) -> np.ndarray:
+    """True range of each bar. Row 0 has no previous close and is NaN."""
+    result = np.empty(closes.shape)
+    result[0] = np.nan
+    _bar_true_range(highs[1:], lows[1:], closes[:-1], out=result[1:])
+    return result
+
+
+def _seed_sums(values: np.ndarray, start: np.ndarray, count: int):
+    """Sums values[start + 1 .. start + count] for each column.
+
+    Returns (seed_rows, columns, sums) for the columns that have enough rows.
+    Columns sharing a start row are summed together, row by row in the same
+    order as talib, so a NaN inside the range makes the sum NaN.
+    """
+    seed_rows = start + count
+    columns = np.flatnonzero(seed_rows < values.shape[0])
+    seed_rows = seed_rows[columns]
+    start = start[columns]
+    sums = np.empty(len(columns))
+    for row in np.unique(start):
+        selected = start == row
+        sums[selected] = values[row + 1:row + count + 1, columns[selected]].sum(axis=0)
+    return seed_rows, columns, sums
+
+
+def _group_by_row(seed_rows: np.ndarray, columns: np.ndarray, seeds: np.ndarray):
+    """Returns {row: (columns, seeds)} so a recursion can plant seeds row by row"""
+    groups = {}
+    for row in np.unique(seed_rows):
+        selected = seed_rows == row
+        groups[row] = (columns[selected], seeds[selected])
+    return groups
+
+
+def _wilder_recursion(values: np.ndarray, seed_rows: np.ndarray, columns: np.ndarray,
+                      seeds: np.ndarray, update) -> np.ndarray:
+    """Runs a Wilder recursion over values in place and returns values.
+
+    Column columns[i] is set to seeds[i] on row seed_rows[i] and to NaN
+    before it. Each later row holds the input of that row when
+    update(row, prev, cur, scratch) is called and is overwritten with the
+    result. Columns without a seed are all NaN.
+    """
+    if len(columns) == 0:
+        values[:] = np.nan
+        return values
+    seeds = _group_by_row(seed_rows, columns, seeds)
+    first_row = seed_rows.min()
+    # columns seeded on a later row stay NaN until then as their prev is NaN
+    values[:first_row + 1] = np.nan
+    scratch = np.empty(values.shape[1])
+    prev = values[first_row]
+    for row in range(first_row, len(values)):
+        cur = values[row]
+        if row > first_row:
+            update(row, prev, cur, scratch)
+        if row in seeds:
+            seed_columns, seed_values = seeds[row]
+            cur[seed_columns] = seed_values
+        prev = cur
+    return values
+
+
+def _wilder_average(values: np.ndarray, start: np.ndarray, period: int) -> np.ndarray:
+    """Wilder moving average, seeded with a simple average. Overwrites values.
+
+    For a column starting at row s, the first output is at row s + period and
+    is the mean of values[s + 1 .. s + period]. Each following row is
+    (prev * (period - 1) + value) / period.
+    """
+    def update(row, prev, cur, scratch):
+        np.multiply(prev, period - 1, out=scratch)
+        cur += scratch
+        cur /= period
+
+    seed_rows, columns, sums = _seed_sums(values, start, period)
+    return _wilder_recursion(values, seed_rows, columns, sums / period, update)
+
+
+def _wilder_sum(values: np.ndarray, start: np.ndarray, period: int) -> np.ndarray:
+    """Wilder running sum as used by talib's ADX. Overwrites values.
+
+    Seeded at row s + period - 1 with the sum of values[s + 1 .. s + period - 1],
+    then each row is prev - prev / period + value.
+    """
+    def update(row, prev, cur, scratch):
+        np.divide(prev, period, out=scratch)
+        np.subtract(prev, scratch, out=scratch)
+        cur += scratch
+
+    seed_rows, columns, sums = _seed_sums(values, start, period - 1)
+    return _wilder_recursion(values, seed_rows, columns, sums, update)
+
+
+def _decayed_sums(values: np.ndarray, decay: float) -> np.ndarray:
+    """prev * decay + value over all rows, starting from 0, with NaN values as 0.
+
+    Windows without NaN only use differences of these sums within the window.
+    """
+    result = np.nan_to_num(values)
+    for row in range(1, len(result)):
+        cur = result[row]
+        cur += result[row - 1] * decay
+    return result
+
+
+def window_averages(values: np.ndarray, last_rows: np.ndarray, window_length: int,
+                    period: int) -> np.ndarray:
+    """Wilder average at the end of windows of values, as _wilder_average
+    computes it on each window of window_length rows on its own.
+
+    last_rows are the last rows of the windows, which must have no NaN after
+    their first row. The recursion runs once over all rows: within a window,
+    its difference to the window average decays by (period - 1) / period a
+    row, so the window average is the running average plus the decayed
+    difference at the row the window is seeded.
+    """
+    steps = window_length - 1 - period
+    if steps < 0:
+        return np.full((len(last_rows), values.shape[1]), np.nan)
+    seed_rows = last_rows - steps
+    seeds = sliding_window_view(values, period, axis=0)[seed_rows - period + 1].sum(axis=-1)
+    seeds /= period
+    running = _decayed_sums(values / period, (period - 1) / period)
+    return ((period - 1) / period) ** steps * (seeds - running[seed_rows]) + running[last_rows]
+
+
+def _price_change(values: np.ndarray) -> np.ndarray:
+    """values[row] - values[row - 1], NaN on row 0"""
+    result = np.empty(values.shape)
+    result[0] = np.nan
+    np.subtract(values[1:], values[:-1], out=result[1:])
+    return result
+
+
+def _split_change(change: np.ndarray):
+    """Splits price changes into (gain, loss). The gain overwrites change."""
+    with np.errstate(invalid='ignore'):
+        falling = change < 0
+    loss = np.negative(change)
+    np.copyto(loss, 0.0, where=~falling)
+    # talib counts a NaN change as a gain
+    np.copyto(change, 0.0, where=falling)
+    return change, loss
+
+
+def gains_and_losses(closes: np.ndarray):
+    """Price change of each bar split into (gain, loss), row 0 has no change"""
+    return _split_change(_price_change(closes))
+
+
+def rsi_averages(closes: np.ndarray, period: int):
+    """Wilder average gain and loss of each bar, as (avg_gain, avg_loss)"""
+    start = first_valid_row(closes)
+    gain, loss = gains_and_losses(closes)
+    return _wilder_average(gain, start, period), _wilder_average(loss, start, period)
+
+
+def rsi_from_averages(avg_gain: np.ndarray, avg_loss: np.ndarray) -> np.ndarray:
+    """RSI from Wilder averages, NaN where they are not seeded.
+
+    Overwrites both inputs.
+    """
+    not_ready = np.isnan(avg_loss)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # talib outputs 0 unless the total movement is positive, which
+        # also turns a NaN total into 0
+        total = np.add(avg_gain, avg_loss, out=avg_loss)
+        out = np.divide(avg_gain, total, out=avg_gain)
+        out *= 100.0
+        np.copyto(out, 0.0, where=~(total > 0))
+    out[not_ready] = np.nan
+    return out
+
+
+def rsi_step(avg_gain: np.ndarray, avg_loss: np.ndarray,
+             prev_closes: np.ndarray, closes: np.ndarray, period: int):
+    """Advances Wilder average gain and loss by one bar"""
+    gain, loss = _split_change(closes - prev_closes)
+    return ((avg_gain * (period - 1) + gain) / period,
+            (avg_loss * (period - 1) + loss) / period)
+
+
+def rsi(closes: np.ndarray, period: int) -> np.ndarray:
+    """Wilder RSI, equivalent to talib.RSI applied to each column"""
+    return rsi_from_averages(*rsi_averages(closes, period))
+
+
+def atr(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, period: int) -> np.ndarray:
+    """Wilder ATR, equivalent to talib.ATR applied to each column"""
+    start = first_valid_row(highs, lows, closes)
+    return _wilder_average(true_range(highs, lows, closes), start, period)
+
+
+def atr_step(avg_tr: np.ndarray, highs: np.ndarray, lows: np.ndarray,
+             prev_closes: np.ndarray, period: int) -> np.ndarray:
+    """Advances Wilder ATR by one bar"""
+    tr = _bar_true_range(highs, lows, prev_closes, out=np.empty(avg_tr.shape))
+    return (avg_tr * (period - 1) + tr) / period
+
+
+def natr_from_atr(avg_tr: np.ndarray, closes: np.ndarray) -> np.ndarray:
+    """ATR as percentage of close. Overwrites avg_tr."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        avg_tr /= closes
+        avg_tr *= 100.0
+    np.copyto(avg_tr, 0.0, where=_is_zero(closes))
+    return avg_tr
+
+
+def natr(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, period: int) -> np.ndarray:
+    """ATR as percentage of close, equivalent to talib.NATR"""
+    return natr_from_atr(atr(highs, lows, closes, period), closes)
+
+
+def _directional_movement(plus_dm: np.ndarray, minus_dm: np.ndarray):
+    """Keeps only the dominant of the up move (plus_dm) and down move (minus_dm).
+
+    Overwrites both inputs.
+    """
+    with np.errstate(invalid='ignore'):
+        is_minus = (minus_dm > 0) & (plus_dm < minus_dm)
+        is_plus = ~is_minus & (plus_dm > 0) & (plus_dm > minus_dm)
+    np.copyto(minus_dm, 0.0, where=~is_minus)
+    np.copyto(plus_dm, 0.0, where=~is_plus)
+    return plus_dm, minus_dm
+
+
+def _dx(sum_plus_dm: np.ndarray, sum_minus_dm: np.ndarray, sum_tr: np.ndarray):
+    """DX from the Wilder sums, as (dx, has_dx). Overwrites all inputs.
+
+    talib skips the ADX update when either denominator is zero, has_dx is
+    False there.
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        has_dx = ~_is_zero(sum_tr)
+        minus_di = np.divide(sum_minus_dm, sum_tr, out=sum_minus_dm)
+        minus_di *= 100.0
+        plus_di = np.divide(sum_plus_dm, sum_tr, out=sum_plus_dm)
+        plus_di *= 100.0
+        di_total = np.add(minus_di, plus_di, out=sum_tr)
+        has_dx &= ~_is_zero(di_total)
+        dx = np.subtract(minus_di, plus_di, out=minus_di)
+        np.abs(dx, out=dx)
+        dx /= di_total
+        dx *= 100.0
+    return dx, has_dx
+
+
+def _adx(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, period: int):
+    """Returns the ADX of each bar and the last row of the Wilder sums"""
+    start = first_valid_row(highs, lows, closes)
+    rows = np.arange(len(closes))[:, np.newaxis]
+
+    minus_dm = _price_change(lows)
+    np.negative(minus_dm, out=minus_dm)
+    plus_dm, minus_dm = _directional_movement(_price_change(highs), minus_dm)
+    with np.errstate(invalid='ignore'):
+        sum_plus_dm = _wilder_sum(plus_dm, start, period)
+        sum_minus_dm = _wilder_sum(minus_dm, start, period)
+        sum_tr = _wilder_sum(true_range(highs, lows, closes), start, period)
+    sums = (sum_plus_dm[-1].copy(), sum_minus_dm[-1].copy(), sum_tr[-1].copy())
+
+    dx, has_dx = _dx(sum_plus_dm, sum_minus_dm, sum_tr)
+    has_dx &= rows >= start + period
+    no_dx = ~has_dx
+    np.copyto(dx, 0.0, where=no_dx)
+
+    def update(row, prev, cur, scratch):
+        np.multiply(prev, period - 1, out=scratch)
+        cur += scratch
+        cur /= period
+        np.copyto(cur, prev, where=no_dx[row])
+
+    seed_rows, columns, seed_sums = _seed_sums(dx, start + period - 1, period)
+    return _wilder_recursion(dx, seed_rows, columns, seed_sums / period, update), sums
+
+
+def adx(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, period: int) -> np.ndarray:
+    """Wilder ADX, equivalent to talib.ADX applied to each column
+
+    talib keeps Wilder *sums* of +DM, -DM and TR (not averages). The sums
+    are seeded with the first period - 1 bars, then the next period bars
+    produce the DX values averaged into the first ADX, which is output
+    2 * period - 1 bars after the first valid bar.
+    """
+    return _adx(highs, lows, closes, period)[0]
+
+
+def adx_history(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, period: int):
+    """Bar values and running sums of all rows, for window_adx.
+
+    DX only depends on the difference and the total of the +DM and -DM sums.
+    Their running Wilder sums are transposed to (assets x days), so the sums
+    of a window are contiguous. TR is only needed for talib's zero checks,
+    which use the cumulative TR and the cumulative count of bars whose TR is
+    less than their DM, which only happens with a close outside the high
+    and low of its bar.
+    """
+    minus_dm = _price_change(lows)
+    np.negative(minus_dm, out=minus_dm)
+    plus_dm, minus_dm = _directional_movement(_price_change(highs), minus_dm)
+    values = (plus_dm - minus_dm, plus_dm + minus_dm)
+    running = tuple(np.ascontiguousarray(_decayed_sums(bars, (period - 1) / period).T)
+                    for bars in values)
+    tr = true_range(highs, lows, closes)
+    return values, running, np.nancumsum(tr, axis=0), np.cumsum(tr < values[1], axis=0)
+
+
+def window_adx(history, last_rows: np.ndarray, window_length: int, period: int,
+               scales: np.ndarray) -> np.ndarray:
+    """ADX at the end of windows, as adx computes it on each window of
+    window_length rows on its own.
+
+    history is adx_history of all rows and last_rows are the consecutive last
+    rows of the windows, which must have no NaN after their first row. The
+    bars of the window ending on last_rows[i] are seen divided by scales[i].
+    As in window_averages, the Wilder sums of a window are the running sums
+    plus a decaying difference, which gives the DX of every row of the
+    windows without a recursion per window. The ADX is then a weighted sum
+    of the DX with the same weights for all windows. It is NaN for the
+    windows where talib may skip a DX, where the weights do not hold.
+    """
+    steps = window_length - 2 * period
+    if period < 2 or steps < 0:
+        return np.full(scales.shape, np.nan)
+    values, running, cumulative_tr, cumulative_small_tr = history
+    decay = (period - 1) / period
+    # the sums are seeded on sum_rows, the DX follow on the dx_count rows after
+    sum_rows = last_rows - window_length + period
+    dx_count = window_length - period
+    decays = decay ** np.arange(1, dx_count + 1)
+    sums = []
+    for bars, running_sums in zip(values, running):
+        seeds = sliding_window_view(bars, period - 1, axis=0)[sum_rows - period + 2].sum(axis=-1)
+        # (assets x windows x dx_count)
+        windows = (seeds.T - running_sums[:, sum_rows])[..., np.newaxis] * decays
+        windows += sliding_window_view(running_sums, dx_count, axis=1)[:, sum_rows[0] + 1:sum_rows[-1] + 2]
+        sums.append(windows)
+    diff, total = sums
+
+    # talib skips a DX where the TR sum or the sum of the DIs, 100 * total / tr,
+    # is zero. The TR sums are at least the total, unless a bar has less TR
+    # than DM, and at most the sum of the TR of the window.
+    first_rows = last_rows - window_length + 1
+    least_total = total.min(axis=-1).T
+    skipped = ((least_total < _ZERO_TOLERANCE * scales)
+               | (least_total * 100.0 < _ZERO_TOLERANCE
+                  * (cumulative_tr[last_rows] - cumulative_tr[first_rows]))
+               | (cumulative_small_tr[last_rows] > cumulative_small_tr[first_rows]))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        dx = np.abs(diff, out=diff)
+        dx /= total
+    weights = np.empty(dx_count)
+    weights[:period] = decay ** steps / period
+    weights[period:] = decay ** np.arange(steps - 1, -1, -1) / period
+    result = (dx @ (weights * 100.0)).T
+    result[skipped] = np.nan
+    return result
+
+
+def adx_state(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, period: int):
+    """ADX state after the last bar, as (sum_plus_dm, sum_minus_dm, sum_tr, adx)"""
+    values, sums = _adx(highs, lows, closes, period)
+    return sums + (values[-1].copy(),)
+
+
+def adx_step(state, prev_highs: np.ndarray, prev_lows: np.ndarray, prev_closes: np.ndarray,
+             highs: np.ndarray, lows: np.ndarray, period: int):
+    """Advances ADX state (see adx_state) by one bar"""
+    sum_plus_dm, sum_minus_dm, sum_tr, prev_adx = state
+    plus_dm, minus_dm = _directional_movement(highs - prev_highs, prev_lows - lows)
+    tr = _bar_true_range(highs, lows, prev_closes, out=np.empty(prev_adx.shape))
+    sums = (sum_plus_dm - sum_plus_dm / period + plus_dm,
+            sum_minus_dm - sum_minus_dm / period + minus_dm,
+            sum_tr - sum_tr / period + tr)
+    dx, has_dx = _dx(*(values.copy() for values in sums))
+    new_adx = np.where(has_dx, (prev_adx * (period - 1) + dx) / period, prev_adx)
+    return sums + (new_adx,)